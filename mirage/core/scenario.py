@@ -6,7 +6,12 @@ class Scenario:
 	'''
 	This class defines a scenario. A Scenario is a Mirage entity allowing to customize the behaviour of a module without 
 	modifying its code, and can be compared to a list of callbacks called when a specific event (or signal) happens.
+
+	The callbacks are stored in a table linking every signal to the corresponding bound method, built when the scenario is instantiated.
+	If some callbacks are added dynamically, the table must be updated using ``refreshSignals``.
 	'''
+	signals = None
+
 	def __init__(self,name="",module=None):
 		'''
 		This constructor allows to define the main attributes of a scenario, especially :
@@ -24,26 +29,56 @@ class Scenario:
 		self.description = "A generic collection of callbacks"
 		self.module = module
 		self.args = module.args
-		
+		self.refreshSignals()
+
+	def refreshSignals(self):
+		'''
+		This method builds the table linking every signal to the corresponding method of the scenario.
+		It is called by the constructor, and must be called again if some callbacks are added or removed dynamically.
+		'''
+		self.signals = {}
+		for name in dir(self):
+			if "__" not in name:
+				handler = getattr(self,name,None)
+				if callable(handler):
+					self.signals[name] = handler
+
+	def getSignalHandler(self,signal):
+		'''
+		This method returns the method of the scenario linked to the provided signal.
 
+		:param signal: signal name
+		:type signal: str
+		:return: bound method linked to the signal (or None if the scenario doesn't handle it)
+		:rtype: method
+		'''
+		if self.signals is None:
+			self.refreshSignals()
+		return self.signals.get(signal)
 
 	def receiveSignal(self,signal,*args, **kwargs):
 		'''
 		This method is called when a signal is received, and calls the corresponding method in the scenario if it exists.
 		'''
-		if signal in [i for i in dir(self) if "__" not in i]:
-			try:
-				defaultBehaviour = getattr(self,signal)(*args,**kwargs)
-				return defaultBehaviour
-			except Exception as e:
-				if not hasattr(self,signal):
-					io.fail("Non matching method in scenario "+self.name)
-				else:
-					io.fail("An error occured in scenario "+self.name+" !")
-					if app.App.Instance.debugMode:
-							traceback.print_exception(type(e), e, e.__traceback__)
-		else:
+		handler = self.getSignalHandler(signal)
+		if handler is None:
 			return True
+		return self.callSignalHandler(handler,*args,**kwargs)
+
+	def callSignalHandler(self,handler,*args,**kwargs):
+		'''
+		This method calls a method of the scenario linked to a signal, and displays the errors occuring in this method.
+
+		:param handler: bound method linked to the signal
+		:type handler: method
+		:return: value returned by the method (or None if an error occured)
+		'''
+		try:
+			return handler(*args,**kwargs)
+		except Exception as e:
+			io.fail("An error occured in scenario "+self.name+" !")
+			if app.App.Instance.debugMode:
+					traceback.print_exception(type(e), e, e.__traceback__)
 
 def scenarioSignal(argument):
 	'''
@@ -54,8 +89,10 @@ def scenarioSignal(argument):
 	'''
 	def signalDecorator(function):
 		def wrapper(self,*args, **kwargs):
-			if hasattr(self,"scenario"):
-				defaultBehaviour = self.scenario.receiveSignal(argument,*args,**kwargs)
+			scenario = getattr(self,"scenario",None)
+			handler = scenario.getSignalHandler(argument) if scenario is not None else None
+			if handler is not None:
+				defaultBehaviour = scenario.callSignalHandler(handler,*args,**kwargs)
 			else:
 				defaultBehaviour = True
 			if defaultBehaviour is None or defaultBehaviour:
@@ -11,6 +11,7 @@ from mirage.libs.ble_utils.butterfly import *
 from mirage.libs.ble_utils.adb import *
 from mirage.libs.ble_utils.hcidump import *
 from mirage.libs.ble_utils.hackrf import *
+from mirage.libs.common.sdr.sources import FileSource
 from mirage.libs.ble_utils.sniffle import *
 from mirage.libs.ble_utils.pcap import *
 from mirage.libs.ble_utils.helpers import *
@@ -520,7 +521,7 @@ class BLEEmitter(wireless.Emitter):
 			deviceClass = ADBDevice
 		elif "nrfsniffer" in interface:
 			deviceClass = NRFSnifferDevice
-		elif "hackrf" in interface:
+		elif "hackrf" in interface or FileSource.isIQFile(interface):
 			deviceClass = BLEHackRFDevice
 		elif "sniffle" in interface:
 			deviceClass = SniffleDevice
@@ -857,7 +858,7 @@ class BLEReceiver(wireless.Receiver):
 			deviceClass = BLEUbertoothDevice
 		elif "microbit" in interface:
 			deviceClass = BTLEJackDevice
-		elif "hackrf" in interface:
+		elif "hackrf" in interface or FileSource.isIQFile(interface):
 			deviceClass = BLEHackRFDevice
 		elif "adb" in interface:
 			deviceClass = ADBDevice
@@ -887,9 +888,12 @@ class BLEReceiver(wireless.Receiver):
 			self.device._exitListening()
 
 	def convert(self,packet):
-		if "hackrf" in self.interface:
+		if "hackrf" in self.interface or FileSource.isIQFile(self.interface):
 			packet, iqSamples = packet
 		cryptoInstance = BLELinkLayerCrypto.getInstance()
+		if cryptoInstance is not None and BTLE_DATA in packet:
+			# the crypto state (session key, counters) is specific to every connection
+			cryptoInstance = BLELinkLayerCrypto.getInstance(packet.access_addr)
 		if cryptoInstance is not None and cryptoInstance.ready and BTLE_DATA in packet and packet.LLID > 1:
 			plain, success = cryptoInstance.tryToDecrypt(raw(packet[BTLE_DATA:]))
 			if success:
@@ -1218,6 +1222,7 @@ class BLEReceiver(wireless.Receiver):
 				else:
 					return None
 		elif (	"hackrf" in self.interface or
+				FileSource.isIQFile(self.interface) or
 				"butterfly" in self.interface or
 				"ubertooth" in self.interface or
  				"microbit" in self.interface or
@@ -1486,14 +1491,18 @@ class BLEReceiver(wireless.Receiver):
 							data = bytes(packet[BTLE_CTRL:])[1:]
 						except:
 							data = b""
-						if controlType == "LL_TERMINATE_IND" and packet.code == 0x24:
-							return BLEDisconnect()
+						if controlType == "LL_TERMINATE_IND":
+							BLELinkLayerCrypto.removeInstance(packet.access_addr)
+							if packet.code == 0x24:
+								return BLEDisconnect()
 						if controlType == "LL_ENC_REQ":
 							#packet.show()
+							cryptoInstance = BLELinkLayerCrypto.getInstance(packet.access_addr,create=True)
 							if cryptoInstance is not None:
 								cryptoInstance.setMasterValues(packet.skd,packet.iv)
 						elif controlType == "LL_ENC_RSP":
 							#packet.show()
+							cryptoInstance = BLELinkLayerCrypto.getInstance(packet.access_addr,create=True)
 							if cryptoInstance is not None:
 								cryptoInstance.setSlaveValues(packet.skd,packet.iv)
 
@@ -1526,7 +1535,7 @@ class BLEReceiver(wireless.Receiver):
 									clkn_high = packet.btle_clkn_high,
 									channel = packet.btle_channel
 									)
-			elif "hackrf" in self.interface:
+			elif "hackrf" in self.interface or FileSource.isIQFile(self.interface):
 
 				new.additionalInformations = BLESniffingParameters(
 									rssi = packet.rssi_avg,
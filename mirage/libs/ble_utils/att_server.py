@@ -1,6 +1,8 @@
 from mirage.libs.ble_utils.dissectors import *
 from mirage.libs.ble_utils.constants import *
 from mirage.libs import utils,io
+from bisect import bisect_left,bisect_right,insort
+from functools import lru_cache
 
 class ATT_Attribute:
 	'''
@@ -47,14 +49,39 @@ class ATT_Database:
 	'''
 	This class describes an ATT Database.
 	It acts as a classic Database, and offer multiple primitives in order to manipulate the attributes.
-	The internal representation is just a list containing some ``ATT_Attribute``.
+	The internal representation is a list containing some ``ATT_Attribute`` (indexed by handle), completed by two indexes maintained by ``setAttribute`` :
+
+	  * a sorted list of the used handles
+	  * a dictionary linking every type of attribute (128 bits UUID) to the sorted list of the corresponding handles
+
+	The range queries (e.g. ``readByType`` or ``readByGroupType``) use these indexes, so their cost depends on the number of returned attributes instead of the size of the database.
 
 	'''
 	def __init__(self):
 		self.attributes = []
-
-	def _getRType(self,type):
-		if isinstance(type, int):
+		self.handles = []
+		self.types = {}
+
+	@classmethod
+	def _getUUIDKey(cls,uuid):
+		return bytes(uuid.UUID128) if uuid.UUID128 is not None else bytes(uuid.data)
+
+	def _getTypeKey(self,type):
+		if isinstance(type,UUID):
+			return ATT_Database._getUUIDKey(type)
+		return ATT_Database._convertType(type)
+
+	@classmethod
+	@lru_cache(maxsize=256)
+	def _convertType(cls,type):
+		# the requested types are provided by the peer : only the last conversions are cached
+		return cls._getUUIDKey(cls._getRType(type))
+
+	@classmethod
+	def _getRType(cls,type):
+		if isinstance(type, int) and type > 0xFFFF:
+			rtype = UUID(UUID128=type.to_bytes(16,"big"))
+		elif isinstance(type, int):
 			rtype = UUID(UUID16=type)
 		elif utils.isHexadecimal(type) and len(type)<=6:
 			rtype = UUID(UUID16=int(type, 16))
@@ -214,22 +241,19 @@ class ATT_Database:
 			└──────────────────┴────────────────────────────────────────────┴────────────────────────────────────────┘
 
 		'''
-		if handle is not None:
-			if handle >= len(self.attributes):
-				for i in range(handle):
-					if i >= len(self.attributes):
-						self.attributes.append(None)
-				self.attributes.append(ATT_Attribute(	handle=handle,
-										value=value,
-										type=type,
-										permissions=permissions
-									))
-			else:
-				self.attributes[handle] = ATT_Attribute(handle=handle, value=value,type=type,permissions=permissions)
+		if handle is None:
+			handle = max(len(self.attributes),1)
+		attribute = ATT_Attribute(handle=handle,value=value,type=type,permissions=permissions)
+		if handle >= len(self.attributes):
+			self.attributes.extend([None]*(handle + 1 - len(self.attributes)))
+		previous = self.attributes[handle]
+		if previous is not None:
+			handles = self.types[ATT_Database._getUUIDKey(previous.type)]
+			del handles[bisect_left(handles,handle)]
 		else:
-			if len(self.attributes) == 0:
-				self.attributes.append(None)
-			self.attributes.append(ATT_Attribute(handle=handle, value=value,type=type,permissions=permissions))
+			insort(self.handles,handle)
+		insort(self.types.setdefault(ATT_Database._getUUIDKey(attribute.type),[]),handle)
+		self.attributes[handle] = attribute
 
 	def getNextHandle(self):
 		'''
@@ -243,11 +267,7 @@ class ATT_Database:
 			>>> db.getNextHandle()
 			25
 		'''
-		highestHandle = 0x0000
-		for att in self.attributes:
-			if att is not None and att.handle >= highestHandle:
-				highestHandle = att.handle
-		return highestHandle + 1
+		return (self.handles[-1] if len(self.handles) > 0 else 0x0000) + 1
 
 	def read(self,handle):
 		'''
@@ -272,7 +292,7 @@ class ATT_Database:
 			(False, False, None)
 
 		'''
-		exist = handle < len(self.attributes) and self.attributes[handle] is not None
+		exist = 0 <= handle < len(self.attributes) and self.attributes[handle] is not None
 		authorized = exist and 'Read' in self.attributes[handle].permissions
 		if not exist or not authorized:
 			return (exist,authorized,None)
@@ -305,14 +325,24 @@ class ATT_Database:
 			(True, True, b'\x01\x18')
 
 		'''
-		exist = handle < len(self.attributes) and self.attributes[handle] is not None
+		exist = 0 <= handle < len(self.attributes) and self.attributes[handle] is not None
 		authorized =  exist and "Write" in self.attributes[handle].permissions
 		if exist and authorized:
 			self.attributes[handle].value = value
 		return (exist,authorized)
 
 
-	def readByType(self,start,end,type):
+	def _getHandles(self,start,end,handles=None):
+		handles = self.handles if handles is None else handles
+		return handles[bisect_left(handles,start):bisect_right(handles,end)]
+
+	def _getGroupEnd(self,handle,end,handles):
+		# a group ends before the next attribute of the same type
+		index = bisect_right(handles,handle)
+		groupEnd = handles[index] - 1 if index < len(handles) else self.handles[-1]
+		return min(groupEnd,end,self.handles[-1])
+
+	def readByType(self,start,end,type,limit=None):
 		'''
 		This method allows to read a set of attributes according to the handles and type provided.
 
@@ -322,6 +352,8 @@ class ATT_Database:
 		:type end: int
 		:param type: type of attributes
 		:type type: int or str
+		:param limit: maximal number of attributes to return (optional)
+		:type limit: int
 		:return: list of attributes (represented as a dictionary of two fields : *attributeHandle* and *value*)
 		:rtype: list of dict
 
@@ -339,14 +371,10 @@ class ATT_Database:
 			[{'attributeHandle': 2, 'value': b'\x00\x18'}, {'attributeHandle': 5, 'value': b'\x00\x18'}]
 
 		'''
-		rtype = self._getRType(type)
-		response = []
-		for att in self.attributes[start:end+1]:
-			if att is not None and att.type == rtype:
-				response.append({"attributeHandle":att.handle,"value":att.value})
-		return response
+		handles = self._getHandles(start,end,self.types.get(self._getTypeKey(type),[]))[:limit]
+		return [{"attributeHandle":handle,"value":self.attributes[handle].value} for handle in handles]
 
-	def findInformation(self, start, end):
+	def findInformation(self, start, end, limit=None):
 		'''
 		This method allows to get a set of attributes' types according to the handles provided.
 
@@ -354,6 +382,8 @@ class ATT_Database:
 		:type start: int
 		:param end: end handle
 		:type end: int
+		:param limit: maximal number of attributes to return (optional)
+		:type limit: int
 		:return: list of attributes' types (represented as a dictionary of two fields : *attributeHandle* and *type*)
 		:rtype: list of dict
 
@@ -372,17 +402,12 @@ class ATT_Database:
 
 
 		'''
-		response = []
-
-		for att in self.attributes[start:end+1]:
-			if att is not None:
-				response.append({"attributeHandle":att.handle,"type":att.type.data})
+		return [{"attributeHandle":handle,"type":self.attributes[handle].type.data} for handle in self._getHandles(start,end)[:limit]]
 
-		return response
-
-	def readByGroupType(self,start,end,type):
+	def readByGroupType(self,start,end,type,limit=None):
 		'''
 		This method allows to read a set of groups of attributes according to the handles and type provided.
+		A group ends before the next attribute of the same type.
 
 		:param start: start handle
 		:type start: int
@@ -390,32 +415,20 @@ class ATT_Database:
 		:type end: int
 		:param type: type of attributes
 		:type type: int or str
+		:param limit: maximal number of groups to return (optional)
+		:type limit: int
 		:return: list of attributes (represented as a dictionary of three fields : *attributeHandle*,*endGroupHandle* and *value*)
 		:rtype: list of dict
 
 		'''
-		rtype = self._getRType(type)
-		response = []
-		for i in range(start, end+1):
-			try:
-				att = self.attributes[i]
-				if att is not None and att.type == rtype:
-					maxhandle = i
-					try:
-						for j in range(i+1,end+1):
-							if self.attributes[j] is not None and self.attributes[j].type == rtype:
-								break
-							maxhandle = j
-					except:
-						pass
-				response.append({"attributeHandle":i,"endGroupHandle":maxhandle,"value":att.value})
-			except:
-				pass
-		return response
+		handles = self.types.get(self._getTypeKey(type),[])
+		return [{"attributeHandle":handle,"endGroupHandle":self._getGroupEnd(handle,end,handles),"value":self.attributes[handle].value}
+			for handle in self._getHandles(start,end,handles)[:limit]]
 
-	def findByTypeValue(self,start,end,type,value):
+	def findByTypeValue(self,start,end,type,value,limit=None):
 		'''
 		This method allows to read a set of groups of attributes according to the handles, type and value provided.
+		A group ends before the next attribute of the same type.
 
 		:param start: start handle
 		:type start: int
@@ -425,27 +438,19 @@ class ATT_Database:
 		:type type: int or str
 		:param value: value of attributes
 		:type value: bytes
+		:param limit: maximal number of groups to return (optional)
+		:type limit: int
 		:return: list of attributes (represented as a dictionary of two fields : *attributeHandle* and *endGroupHandle*)
 		:rtype: list of dict
 
 		'''
-		rtype = self._getRType(type)
+		handles = self.types.get(self._getTypeKey(type),[])
 		response = []
-		for i in range(start, end+1):
-			try:
-				att = self.attributes[i]
-				if att is not None and att.type == rtype and att.value == value:
-					maxhandle = i
-					try:
-						for j in range(i+1,end+1):
-							if self.attributes[j] is not None and self.attributes[j].type == rtype:
-								break
-							maxhandle = j
-					except:
-						pass
-				response.append({"attributeHandle":i,"endGroupHandle":maxhandle})
-			except:
-				pass
+		for handle in self._getHandles(start,end,handles):
+			if limit is not None and len(response) >= limit:
+				break
+			if self.attributes[handle].value == value:
+				response.append({"attributeHandle":handle,"endGroupHandle":self._getGroupEnd(handle,end,handles)})
 		return response
 
 class ATT_Server:
@@ -459,6 +464,22 @@ class ATT_Server:
 		self.database = database if database is not None else ATT_Database()
 		self.mtu = mtu
 
+	def _packResponse(self,elements,field,handleSize,maxValueSize=None):
+		# the response (opcode, length and list of elements of the same size) must fit in the MTU
+		body = []
+		totalSize = 2
+		valueSize = None
+		for element in elements:
+			if maxValueSize is not None and len(element[field]) > maxValueSize:
+				element[field] = element[field][:maxValueSize]
+			if valueSize is None:
+				valueSize = len(element[field])
+			if len(element[field]) != valueSize or totalSize + handleSize + valueSize > self.mtu:
+				break
+			body.append(element)
+			totalSize += handleSize + valueSize
+		return body
+
 	def addAttribute(self,handle=None, value=None,type=None,permissions=None):
 		'''
 		This method allows to add a new attribute to the ATT Server's database.
@@ -602,26 +623,14 @@ class ATT_Server:
 			  * *body* : this field is the response's body (list of dict - see output of ``ATT_Database.readByType``) if the request was successful or an error code (int) if the request was not successful
 
 		'''
-		response = self.database.readByType(start,end,type)
+		response = self.database.readByType(start,end,type,limit=(self.mtu-2)//2)
 		error_code = ATT_ERR_ATTR_NOT_FOUND
 		if len(response) == 0:
 			success = False
 			body = error_code
 		else:
-			total_size = 1
-			last_size_value = None
 			success = True
-			body = []
-			for elmt in response:
-				size_handle = 2
-				size_value = len(elmt["value"])
-				if ((last_size_value is None or last_size_value == size_value) and 
-				    total_size + size_handle + size_value < self.mtu):
-					body.append(elmt)
-					total_size += size_handle + size_value
-					last_size_value = size_value
-				else:
-					break
+			body = self._packResponse(response,"value",2,min(253,self.mtu-4))
 		return (success,body)
 
 	def readByGroupType(self,start,end,type):
@@ -645,26 +654,14 @@ class ATT_Server:
 			  * *body* : this field is the response's body (list of dict - see output of ``ATT_Database.readByGroupType``) if the request was successful or an error code (int) if the request was not successful
 
 		'''
-		reponse = self.database.readByGroupType(start,end,type)
+		response = self.database.readByGroupType(start,end,type,limit=(self.mtu-2)//4)
 		error_code = ATT_ERR_ATTR_NOT_FOUND
-		if len(reponse) == 0:
+		if len(response) == 0:
 			success = False
 			body = error_code
 		else:
-			total_size = 0
-			last_size_value = None
 			success = True
-			body = []
-			for elmt in reponse:
-				size_handle = 4
-				size_value = len(elmt["value"])
-				if ((last_size_value is None or last_size_value == size_value) and 
-				     total_size + size_handle + size_value <  self.mtu - 1):
-					body.append(elmt)
-					total_size += size_handle + size_value
-					last_size_value = size_value
-				else:
-					break
+			body = self._packResponse(response,"value",4,min(251,self.mtu-6))
 		return (success,body)
 
 	def findInformation(self,start,end):
@@ -686,26 +683,14 @@ class ATT_Server:
 			  * *body* : this field is the response's body (list of dict - see output of ``ATT_Database.findInformation``) if the request was successful or an error code (int) if the request was not successful
 
 		'''
-		response = self.database.findInformation(start,end)
+		response = self.database.findInformation(start,end,limit=(self.mtu-2)//4)
 		error_code = ATT_ERR_ATTR_NOT_FOUND
 		if len(response) == 0:
 			success = False
 			body = error_code
 		else:
-			total_size = 0
-			last_size_type = None
 			success = True
-			body = []
-			for elmt in response:
-				size_handle = 2
-				size_type = len(elmt["type"])
-				if ((last_size_type is None or last_size_type == size_type) and 
-				     total_size + size_handle + size_type <  self.mtu - 1):
-					body.append(elmt)
-					size_type += size_handle + size_type
-					last_size_type = size_type
-				else:
-					break
+			body = self._packResponse(response,"type",2)
 		return (success,body)
 
 
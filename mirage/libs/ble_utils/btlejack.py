@@ -441,15 +441,31 @@ class BTLEJackDevice(wireless.Device):
 		self.microbit.write(raw(packet))
 		self.lock.release()
 
-	def send(self,packet):
+	def _buildSendCommand(self,packet):
 		command = None
 		if BTLE_DATA in packet:
 			command = BTLEJack_Hdr()/BTLEJack_Send_Packet_Command(ble_payload=packet[BTLE_DATA:])
-		if self.isConnected() and CtrlPDU in command.ble_payload and command.ble_payload.optcode == 0x02:
+		if command is not None and self.isConnected() and CtrlPDU in command.ble_payload and command.ble_payload.optcode == 0x02:
 			self.hijacked = False
+		return command
+
+	def send(self,packet):
+		command = self._buildSendCommand(packet)
 		if command is not None :
 			self._send(raw(command))
 
+	def sendMany(self,packets):
+		'''
+		This method sends multiple packets using a single serial write.
+
+		:param packets: packets to send
+		:type packets: list of scapy frames
+		'''
+		commands = [self._buildSendCommand(packet) for packet in packets]
+		data = b"".join([raw(command) for command in commands if command is not None])
+		if len(data) > 0:
+			self._send(data)
+
 	# New Connection Sniffing methods
 
 	def sniffNewConnections(self,address="FF:FF:FF:FF:FF:FF",channel=None):
@@ -764,6 +780,14 @@ class BTLEJackDevice(wireless.Device):
 	def isUp(self):
 		return self.microbit is not None
 
+	def fileno(self):
+		'''
+		This method returns the file descriptor of the serial port, allowing the Receiver to wait for incoming datas.
+		'''
+		if self.microbit is not None:
+			return self.microbit.fileno()
+		return None
+
 	def setCRCChecking(self,enable=True):
 		'''
 		This method enables CRC Checking.
@@ -1,7 +1,8 @@
 from Cryptodome.Cipher import AES
 from os import urandom
-from multiprocessing import Process, Manager,cpu_count
+from multiprocessing import Pool,Event,cpu_count
 import time,struct
+import numpy as np
 from mirage.libs import io
 
 class BLECrypto:
@@ -10,29 +11,27 @@ class BLECrypto:
 
 	.. note::
 
-		The ``temporaryKeys`` class attribute is used in order to precalculate the possible temporary keys. It allows to avoid some time consuming calculations during the cracking process.
+		The possible temporary keys are derived on the fly from the PIN codes (see ``temporaryKey``) : no table is built when the module is imported.
 
 	'''
 
-	temporaryKeys = [bytes.fromhex((32-len(hex(i)[2:]))*"0"+hex(i)[2:]) for i in range(1000000)]	
-
 	@classmethod
-	def _findKey(cls,L,pMin,pMax,r,pres,preq,iat,ia,rat,ra,confirm):
-		i = pMin
-		p1 = pres + preq + rat + iat
-		p2 = b"\x00\x00\x00\x00" + ia + ra
-		a = cls.xor128(p1,r)
-		
-		while i < pMax:
-			aes = AES.new(cls.temporaryKeys[i],AES.MODE_ECB)
-			res1 = aes.encrypt(a)
-			b = cls.xor128(res1,p2)
-			res2 = aes.encrypt(b)
-			if res2 == confirm:
-				L.append(i)
-				break
-			else:
-				i+=1
+	def temporaryKey(cls,pin):
+		'''
+		This class method returns the temporary key corresponding to the provided PIN code.
+
+		:param pin: PIN code
+		:type pin: int
+		:return: temporary key (16 bytes, big endian)
+		:rtype: bytes
+
+		:Example:
+
+			>>> BLECrypto.temporaryKey(123456).hex()
+			'0000000000000000000000000001e240'
+
+		'''
+		return pin.to_bytes(16,"big")
 
 	@classmethod
 	def crackTemporaryKey(cls,r,preq,pres,iat,initiatorAddress,rat,responderAddress,confirm):
@@ -73,39 +72,13 @@ class BLECrypto:
 
 		.. warning::
 
-			This method uses multi processes in order to optimize the time consumption of the required operation.
+			This method uses multi processes in order to optimize the time consumption of the required operation (see ``BLETemporaryKeyCracker``).
 
 		'''
-		iAddr = b''.join([bytes.fromhex(i) for i in initiatorAddress.split(":")])
-		rAddr = b''.join([bytes.fromhex(i) for i in responderAddress.split(":")])
-		with Manager() as manager:
-			L = manager.list()
-			processes = []
-			n = cpu_count()
-			step = int(1000000 / n)
-			for i in range(n):
-				p = Process(target=cls._findKey, args=(
-									L,
-									i*step,
-									(i+1)*step,
-									r,
-									pres,
-									preq,
-									iat,
-									iAddr,
-									rat,
-									rAddr,
-									confirm
-									)
-						)
-				p.start()
-				processes.append(p)
-
-			while list(L) == []:
-				time.sleep(0.01)
-			for p in processes:
-				p.terminate()
-			return L[0]
+		cracker = BLETemporaryKeyCracker.getInstance()
+		cracker.clear()
+		cracker.addPairing(preq,pres,iat,initiatorAddress,rat,responderAddress,masterRand=r,masterConfirm=confirm)
+		return cracker.crack()[0]
 
 	@classmethod
 	def generateRandom(cls,size=16):
@@ -280,6 +253,204 @@ class BLECrypto:
 
 
 
+_crackingStopEvent = None
+
+def _initCrackingWorker(stopEvent):
+	global _crackingStopEvent
+	_crackingStopEvent = stopEvent
+
+def _crackTemporaryKeys(task):
+	pinMin,pinMax,targets = task
+	found = []
+	pin = pinMin
+	while pin < pinMax and not _crackingStopEvent.is_set():
+		for pin in range(pin,min(pin+1024,pinMax)):
+			aes = AES.new(pin.to_bytes(16,"big"),AES.MODE_ECB)
+			for index,a,p2,confirm in targets:
+				if aes.encrypt((int.from_bytes(aes.encrypt(a),"big") ^ p2).to_bytes(16,"big")) == confirm:
+					found.append((index,pin))
+		pin += 1
+	return (pin - pinMin,found)
+
+class BLETemporaryKeyCracker:
+	'''
+	This class implements a parallel cracker of the temporary keys used by the LE Legacy Pairing.
+
+	The PIN codes are split into chunks, distributed to a persistent pool of processes : an idle process takes the next chunk, and the temporary keys are derived from the PIN codes inside the processes.
+	Multiple pairings can be cracked in one pass, each of them being identified using the master and / or the slave confirm values. The cracking stops as soon as every pairing has been cracked.
+
+	:Example:
+
+		>>> cracker = BLETemporaryKeyCracker()
+		>>> cracker.addPairing(pairingRequest, pairingResponse, b"\x00", "08:3E:8E:E1:0B:3E", b"\x00", "78:C5:E5:6E:DD:E8", masterRand=random, masterConfirm=confirm)
+		0
+		>>> cracker.crack()
+		[0]
+		>>> cracker.getStatistics()["keysPerSecondPerCore"]
+		105432.1
+
+	'''
+	instance = None
+
+	@classmethod
+	def getInstance(cls):
+		'''
+		This class method returns a shared instance of the cracker, allowing to reuse its pool of processes.
+
+		:return: instance of this class
+		:rtype: BLETemporaryKeyCracker
+
+		'''
+		if cls.instance is None:
+			cls.instance = cls()
+		return cls.instance
+
+	def __init__(self,processes=None,chunkSize=5000):
+		self.processes = processes if processes is not None else cpu_count()
+		self.chunkSize = chunkSize
+		self.pool = None
+		self.stopEvent = Event()
+		self.pairings = []
+		self.statistics = {"keys":0,"duration":0.0,"keysPerSecond":0.0,"keysPerSecondPerCore":0.0}
+
+	def start(self):
+		'''
+		This method starts the pool of processes (it is automatically called by ``crack``).
+		'''
+		if self.pool is None:
+			self.pool = Pool(self.processes,initializer=_initCrackingWorker,initargs=(self.stopEvent,))
+
+	def stop(self):
+		'''
+		This method stops the pool of processes.
+		'''
+		if self.pool is not None:
+			self.pool.terminate()
+			self.pool.join()
+			self.pool = None
+
+	def addPairing(self,payloadRequest,payloadResponse,initiatorAddressType,initiatorAddress,responderAddressType,responderAddress,masterRand=None,masterConfirm=None,slaveRand=None,slaveConfirm=None):
+		'''
+		This method adds a captured pairing to crack. At least one couple of random and confirm values (master or slave) must be provided.
+
+		:param payloadRequest: pairing request's payload
+		:type payloadRequest: bytes
+		:param payloadResponse: pairing response's payload
+		:type payloadResponse: bytes
+		:param initiatorAddressType: initiator address type
+		:type initiatorAddressType: bytes
+		:param initiatorAddress: initiator address (format : *"1A:2B:3C:4D:5E:6F"*)
+		:type initiatorAddress: str
+		:param responderAddressType: responder address type
+		:type responderAddressType: bytes
+		:param responderAddress: responder address (format : *"1A:2B:3C:4D:5E:6F"*)
+		:type responderAddress: str
+		:param masterRand: master random value
+		:type masterRand: bytes
+		:param masterConfirm: master confirm value
+		:type masterConfirm: bytes
+		:param slaveRand: slave random value
+		:type slaveRand: bytes
+		:param slaveConfirm: slave confirm value
+		:type slaveConfirm: bytes
+		:return: index of the pairing in the list returned by ``crack``
+		:rtype: int
+
+		'''
+		iAddr = b''.join([bytes.fromhex(i) for i in initiatorAddress.split(":")])
+		rAddr = b''.join([bytes.fromhex(i) for i in responderAddress.split(":")])
+		p1 = payloadResponse + payloadRequest + responderAddressType + initiatorAddressType
+		p2 = int.from_bytes(b"\x00\x00\x00\x00" + iAddr + rAddr,"big")
+		couples = []
+		for rand,confirm in ((masterRand,masterConfirm),(slaveRand,slaveConfirm)):
+			if rand is not None and confirm is not None and rand != b"" and confirm != b"":
+				couples.append((BLECrypto.xor128(p1,rand),p2,confirm))
+		self.pairings.append(couples)
+		return len(self.pairings) - 1
+
+	def clear(self):
+		'''
+		This method removes the pairings to crack.
+		'''
+		self.pairings = []
+
+	def crack(self,progress=None,maxPin=1000000):
+		'''
+		This method cracks the pairings previously added, and returns the corresponding PIN codes.
+
+		:param progress: function called after every chunk with the number of tested PIN codes and the total number of PIN codes (optional)
+		:type progress: function
+		:param maxPin: upper bound (excluded) of the PIN codes to test
+		:type maxPin: int
+		:return: list of PIN codes (None if a pairing has not been cracked), ordered as the pairings
+		:rtype: list of int
+
+		'''
+		pins = [None for _ in self.pairings]
+		targets = [(index,a,p2,confirm) for index,couples in enumerate(self.pairings) for a,p2,confirm in couples]
+		if len(targets) == 0:
+			return pins
+		self.start()
+		self.stopEvent.clear()
+		tasks = [(pin,min(pin+self.chunkSize,maxPin),targets) for pin in range(0,maxPin,self.chunkSize)]
+		remaining = set(index for index,_,_,_ in targets)
+		tested = 0
+		startTime = time.time()
+		for count,found in self.pool.imap_unordered(_crackTemporaryKeys,tasks):
+			tested += count
+			for index,pin in found:
+				if pins[index] is None or pin < pins[index]:
+					pins[index] = pin
+				remaining.discard(index)
+			if len(remaining) == 0:
+				# the remaining chunks are immediately skipped by the processes
+				self.stopEvent.set()
+			if progress is not None and count > 0:
+				progress(tested,maxPin)
+		duration = time.time() - startTime
+		self.statistics = {
+			"keys":tested,
+			"duration":duration,
+			"keysPerSecond":tested/duration if duration > 0 else 0.0,
+			"keysPerSecondPerCore":tested/duration/self.processes if duration > 0 else 0.0
+		}
+		return pins
+
+	def getStatistics(self):
+		'''
+		This method returns some statistics about the last cracking operation.
+
+		:return: dictionary describing the number of tested keys ("keys"), the duration ("duration"), and the number of keys tested per second ("keysPerSecond") and per second per core ("keysPerSecondPerCore")
+		:rtype: dict
+
+		'''
+		return self.statistics
+
+	def benchmark(self,keys=200000):
+		'''
+		This method measures the cracking speed, using a pairing which can't be cracked.
+
+		:param keys: number of keys to test
+		:type keys: int
+		:return: dictionary of statistics (see ``getStatistics``)
+		:rtype: dict
+
+		:Example:
+
+			>>> BLETemporaryKeyCracker.getInstance().benchmark()["keysPerSecondPerCore"]
+			105432.1
+
+		'''
+		pairings = self.pairings
+		self.pairings = [[(b"\x00"*16,0,b"\x00"*16)]]
+		self.start()
+		try:
+			self.crack(maxPin=keys)
+		finally:
+			self.pairings = pairings
+		return self.statistics
+
+
 class BLELinkLayerCrypto(object):
 	'''
 	This class provides an API allowing to manipulate the Link Layer Cryptographic functions used by Bluetooth Low Energy.
@@ -288,30 +459,72 @@ class BLELinkLayerCrypto(object):
 
 		This class is used by the receiver ``BLEReceiver`` (``mirage.libs.ble.BLEReceiver``) and should not be used directly by an user. 
 
+	An instance is associated to every connection (identified by its access address), allowing to follow the counters of multiple encrypted connections.
+	The instance of a connection is only created when its encryption procedure is observed (``LL_ENC_REQ`` or ``LL_ENC_RSP``) and it is removed when the connection is terminated, at most ``maxInstances`` instances are kept.
+	The AES key schedule of the session key is computed once, and the AES-CCM operations are implemented on top of it : the possible counters of a received packet are checked in a single batched pass (see ``tryToDecrypt``).
+
 	'''
 	instance = None
+	instances = {}
+
+	recoveryWindow = 30
+	'''
+	This class attribute indicates the number of counters' values tested in each direction if a packet can't be decrypted using the expected counters.
+	'''
+
+	maxInstances = 32
+	'''
+	This class attribute indicates the maximal number of connections followed simultaneously : if a new connection is encrypted, the instance of the oldest one is removed.
+	'''
 
 	@classmethod
-	def provideLTK(cls,ltk):
+	def provideLTK(cls,ltk,accessAddress=None):
 		'''
-		This class method initializes a singleton's instance of the current class.
-		It allows to provide a Long Term Key.
+		This class method initializes an instance of the current class.
+		It allows to provide a Long Term Key, used by the connection identified by the provided access address or by every connection if no access address is provided.
 
 		:param ltk: Long Term Key
 		:type ltk: bytes
+		:param accessAddress: access address of the connection (optional)
+		:type accessAddress: int
 		'''
-		cls.instance = cls(ltk=ltk)
+		if accessAddress is None:
+			cls.instance = cls(ltk=ltk)
+			cls.instances = {}
+		else:
+			cls.instances[accessAddress] = cls(ltk=ltk)
 
 	@classmethod
-	def getInstance(cls):
+	def getInstance(cls,accessAddress=None,create=False):
 		'''
-		This class method returns the singleton's instance of the current class.
+		This class method returns the instance of the current class associated to the provided connection.
+		If no access address is provided, the instance linked to the Long Term Key shared by every connection is returned.
 
-		:return: instance of this class
+		:param accessAddress: access address of the connection (optional)
+		:type accessAddress: int
+		:param create: indicates if an instance using the shared Long Term Key should be created if the connection has no instance (it should only be used when the encryption procedure of the connection is observed)
+		:type create: bool
+		:return: instance of this class (or None if no instance is associated to the connection)
 		:rtype: BLELinkLayerCrypto
 
 		'''
-		return cls.instance
+		if accessAddress is None:
+			return cls.instance
+		if create and accessAddress not in cls.instances and cls.instance is not None:
+			while len(cls.instances) >= cls.maxInstances:
+				del cls.instances[next(iter(cls.instances))]
+			cls.instances[accessAddress] = cls(ltk=cls.instance.ltk[::-1])
+		return cls.instances.get(accessAddress)
+
+	@classmethod
+	def removeInstance(cls,accessAddress):
+		'''
+		This class method removes the instance associated to the provided connection (e.g. when the connection is terminated).
+
+		:param accessAddress: access address of the connection
+		:type accessAddress: int
+		'''
+		cls.instances.pop(accessAddress,None)
 
 	def __init__(self,ltk):
 		self.ltk = ltk[::-1]
@@ -322,6 +535,7 @@ class BLELinkLayerCrypto(object):
 		self.skd = None
 		self.iv = None
 		self.sessionKey = None
+		self.cipher = None
 		self.ready = False
 		self.masterCounter = 0
 		self.slaveCounter = 0
@@ -334,8 +548,8 @@ class BLELinkLayerCrypto(object):
 			io.chart(["Name","Value"],[
 							["Master SKD",self.masterSkd.hex()],
 							["Master IV",self.masterIv.hex()],
-							["Slave SKD",self.masterSkd.hex()],
-							["Slave IV",self.masterIv.hex()],
+							["Slave SKD",self.slaveSkd.hex()],
+							["Slave IV",self.slaveIv.hex()],
 							["SKD",self.skd.hex()],
 							["IV",self.iv.hex()],
 							["Session Key",self.sessionKey.hex()]
@@ -395,6 +609,7 @@ class BLELinkLayerCrypto(object):
 		successIv = self.generateIv()
 		if successSkd and successIv:
 			self.sessionKey = BLECrypto.e(self.ltk,self.skd)
+			self.cipher = AES.new(self.sessionKey,AES.MODE_ECB)
 			self.ready = True
 			self.masterCounter = self.slaveCounter = 0
 			io.success("Session key successfully generated !")
@@ -414,9 +629,51 @@ class BLELinkLayerCrypto(object):
 		:return: generated nonce
 		:rtype: bytes
 		'''
-		counter = struct.pack("i",self.masterCounter if masterToSlave else self.slaveCounter)
-		direction = b"\x00" if masterToSlave else b"\x80"
-		return counter + direction + self.iv
+		return self._generateNonce(self.masterCounter if masterToSlave else self.slaveCounter,masterToSlave)
+
+	def _generateNonce(self,counter,masterToSlave):
+		return struct.pack("<I",counter & 0xFFFFFFFF) + (b"\x00" if masterToSlave else b"\x80") + self.iv
+
+	def _encryptBlocks(self,blocks):
+		return np.frombuffer(bytearray(self.cipher.encrypt(blocks.tobytes())),dtype=np.uint8).reshape(blocks.shape)
+
+	def _decryptCandidates(self,payload,candidates):
+		# AES-CCM (4 bytes MIC, 2 bytes length field) applied to every candidate (counter, direction) at once :
+		# each AES operation processes one block of every candidate using a single ECB call
+		header = payload[0] & 0xe3
+		ciphertext = np.frombuffer(payload[2:-4],dtype=np.uint8)
+		mic = payload[-4:]
+		length = len(ciphertext)
+		count = (length + 15) // 16
+		nonces = np.frombuffer(b"".join(self._generateNonce(counter,masterToSlave) for counter,masterToSlave in candidates),dtype=np.uint8).reshape(len(candidates),13)
+
+		counterBlocks = np.zeros((len(candidates),count+1,16),dtype=np.uint8)
+		counterBlocks[:,:,0] = 0x01
+		counterBlocks[:,:,1:14] = nonces[:,None,:]
+		counterBlocks[:,:,14] = np.arange(count+1) >> 8
+		counterBlocks[:,:,15] = np.arange(count+1) & 0xFF
+		keystream = self._encryptBlocks(counterBlocks.reshape(-1,16)).reshape(len(candidates),count+1,16)
+
+		plaintexts = np.zeros((len(candidates),count*16),dtype=np.uint8)
+		plaintexts[:,:length] = keystream[:,1:,:].reshape(len(candidates),-1)[:,:length] ^ ciphertext
+
+		state = np.zeros((len(candidates),16),dtype=np.uint8)
+		state[:,0] = 0x49
+		state[:,1:14] = nonces
+		state[:,14] = length >> 8
+		state[:,15] = length & 0xFF
+		state = self._encryptBlocks(state)
+		state[:,1] ^= 0x01
+		state[:,2] ^= header
+		state = self._encryptBlocks(state)
+		for i in range(count):
+			state = self._encryptBlocks(state ^ plaintexts[:,16*i:16*(i+1)])
+
+		mics = state[:,:4] ^ keystream[:,0,:4]
+		for index in range(len(candidates)):
+			if mics[index].tobytes() == mic:
+				return (index,payload[:2] + plaintexts[index,:length].tobytes())
+		return (None,payload[:2] + plaintexts[0,:length].tobytes())
 
 	def encrypt(self,payload,masterToSlave=True):
 		'''
@@ -451,42 +708,26 @@ class BLELinkLayerCrypto(object):
 		.. note:: 
 			If the operation fails, the decrypted payload field of the tuple is replaced by None
 		'''
-		plain,masterToSlave = self.decrypt(payload,masterToSlave=True)
+		if not self.ready or len(payload) < 6:
+			return (None,False)
+		# expected counters
+		candidates = [(self.masterCounter,True),(self.slaveCounter,False)]
+		index,plain = self._decryptCandidates(payload,candidates)
+		if index is None:
+			io.info("We have missed something, trying to recover counters' values ...")
+			candidates = [candidate for i in range(1,self.recoveryWindow+1) for candidate in ((self.masterCounter+i,True),(self.slaveCounter+i,False))]
+			index,plain = self._decryptCandidates(payload,candidates)
+			if index is None:
+				return (None,False)
+			io.success(("Master" if candidates[index][1] else "Slave")+" counter recovered !")
+
+		counter,masterToSlave = candidates[index]
 		if masterToSlave:
-			self.incrementMasterCounter()	
-			return (plain,True)		
+			self.masterCounter = counter + 1
 		else:
-			plain,slaveToMaster = self.decrypt(payload,masterToSlave=False)
-			if slaveToMaster:
-				self.incrementSlaveCounter()
-				return (plain,True)
-		
-		if not masterToSlave and not slaveToMaster:
-			masterCounter = self.masterCounter
-			slaveCounter = self.slaveCounter
-			found = False
-			iteration = 0	
-			io.info("We have missed something, trying to recover counters' values ...")
-			while not found and iteration < 30:
-				iteration += 1
-				self.incrementMasterCounter()
-				plain,masterToSlave = self.decrypt(payload,masterToSlave=True)
-				if masterToSlave:
-					io.success("Master counter recovered !")
-					found = True
-					self.slaveCounter = slaveCounter
-					self.incrementMasterCounter()						
-				else:
-					self.incrementSlaveCounter()
-					plain,slaveToMaster = self.decrypt(payload,masterToSlave=False)
-					if slaveToMaster:
-						io.success("Slave counter recovered !")
-						found = True
-						self.masterCounter = masterCounter
-						self.incrementSlaveCounter()
-		
-			return (plain,True) if found else (None, False)			
-		
+			self.slaveCounter = counter + 1
+		return (plain,True)
+
 	def decrypt(self,payload,masterToSlave=True):
 		'''
 		This method decrypts the provided payload, according to the direction provided.
@@ -499,19 +740,9 @@ class BLELinkLayerCrypto(object):
 		:rtype: tuple of (bytes,bool)		
 		'''
 		if self.ready:
-			hdr = bytes([payload[0] & 0xe3])
-			ciphertext = payload[2:-4]
-			mic = payload[-4:]
-			nonce = self.generateNonce(masterToSlave)
-			cipher = AES.new(self.sessionKey, AES.MODE_CCM, nonce=nonce, mac_len=4, assoc_len=len(hdr))
-			cipher.update(hdr)
-			plaintext = cipher.decrypt(ciphertext)	
-			try:
-				cipher.verify(mic)
-				return (payload[:2] + plaintext, True)
-			except ValueError:
-				return (payload[:2] + plaintext,False)				
-		
+			index,plain = self._decryptCandidates(payload,[(self.masterCounter if masterToSlave else self.slaveCounter,masterToSlave)])
+			return (plain,index is not None)
+
 	def incrementMasterCounter(self):
 		'''
 		This method increments the master's counter.
@@ -50,9 +50,9 @@ class BLEDecoder(SDRDecoder):
 		:param demodulatedData: data to decode
 		:type demodulatedData: str
 		:param iqSamples: IQ samples corresponding with the demodulated data
-		:type iqSamples: list of complex
+		:type iqSamples: ``numpy.ndarray`` of complex
 		:return: tuple composed of the decoded data and the correspond IQ samples
-		:rtype: (bytes, list of complex)
+		:rtype: (bytes, ``numpy.ndarray`` of complex)
 		'''
 		bytesData = bytes.fromhex(''.join(["{:02x}".format(int(demodulatedData[i:i+8][::-1],2)) for i in range(0, len(demodulatedData), 8)]))
 		size = ((dewhiten(bytesData[4:],self.channel)[1]) & 0b00111111)
@@ -10,10 +10,12 @@ import time
 class BLEHackRFDevice(wireless.SDRDevice):
 	'''
 	This device allows to communicate with a HackRF Device in order to interact with Bluetooth Low Energy protocol.
-	HackRF support is **experimental**, the demodulator is slow and it can only deal with advertisements.
+	HackRF support is **experimental** and it can only deal with advertisements.
 
 	The corresponding interfaces are : ``hackrfX`` (e.g. "hackrf0")
 
+	A raw IQ recording (e.g. "capture.iq", see ``mirage.libs.common.sdr.sources.FileSource``) can also be provided as interface : the received samples are then read from the file, and the transmitted samples are written in "<name>-tx.iq".
+
 	The following capabilities are actually supported :
 
 	+-------------------------------------------+----------------+
@@ -67,6 +69,9 @@ class BLEHackRFDevice(wireless.SDRDevice):
 			"setScan",
 			"setScanInterval",
 			"getMode",
+			"setSourceRate",
+			"getSourceStatistics",
+
 			"getFirmwareVersion",
 			"getSerial",
 			"getAPIVersion",
@@ -93,8 +98,55 @@ class BLEHackRFDevice(wireless.SDRDevice):
 		self.experimentalDemodulatorEnabled = False
 		super().__init__(interface=interface)
 
+	def setSourceRate(self,rate):
+		'''
+		This method sets the rate used to provide the samples if the device reads an IQ file : "max" (as fast as possible, by default) or "realtime" (according to the sample rate).
+		The "max" rate allows to measure the throughput of the demodulator (see ``getSourceStatistics``) without losing samples.
+
+		:param rate: rate ("realtime" or "max")
+		:type rate: str
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+
+		:Example:
+
+			>>> device.setSourceRate("realtime")
+			True
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+
+		'''
+		if not isinstance(self.source,sources.FileSource):
+			io.fail("The rate can only be modified if the device reads an IQ file !")
+			return False
+		return self.source.setRate(rate)
+
+	def getSourceStatistics(self):
+		'''
+		This method returns the statistics of the IQ file read by the device : number of samples processed by the demodulator, duration (in seconds), throughput (in samples per second) and number of samples lost.
+		It returns None if the device doesn't read an IQ file.
+
+		:return: dictionary of statistics
+		:rtype: dict
+
+		:Example:
+
+			>>> device.getSourceStatistics()
+			{'samples': 40000000, 'duration': 4.13, 'samplesPerSecond': 9685230.02, 'overflows': 0}
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+
+		'''
+		if not isinstance(self.source,sources.FileSource):
+			return None
+		return self.source.getStatistics()
+
 	def isUp(self):
-		return self.sink.isReady() and self.sink.isReady()
+		return self.source.isReady() and self.sink.isReady()
 
 	def init(self):
 		if self.source.isReady() and self.sink.isReady():
@@ -126,7 +178,7 @@ class BLEHackRFDevice(wireless.SDRDevice):
 			return None
 
 	def buildReceivePipeline(self,interface):
-		self.source = sources.HackRFSource(interface)
+		self.source = sources.FileSource(interface) if sources.FileSource.isIQFile(interface) else sources.HackRFSource(interface)
 		if self.source.isReady():
 			self.source.setFrequency(channelToFrequency(self.channel) * 1000 * 1000)
 			self.source.setSampleRate(2 * 1000 * 1000)
@@ -164,7 +216,7 @@ class BLEHackRFDevice(wireless.SDRDevice):
 				self.receivePipeline.start()
 
 	def buildTransmitPipeline(self,interface):
-		self.sink = sinks.HackRFSink(interface)
+		self.sink = sinks.FileSink.fromRecording(interface) if sources.FileSource.isIQFile(interface) else sinks.HackRFSink(interface)
 		if self.sink.isReady():
 			self.sink.setFrequency(channelToFrequency(self.channel) * 1000 * 1000)
 			self.sink.setSampleRate(2 * 1000 * 1000)
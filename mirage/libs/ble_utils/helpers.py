@@ -65,6 +65,23 @@ def channelToFrequency(channel):
 def _swapBits(value):
 	return (value * 0x0202020202 & 0x010884422010) % 1023
 
+def _reverse24(value):
+	return int("{:024b}".format(value & 0xFFFFFF)[::-1],2)
+
+def _generateCrc24Table():
+	table = []
+	for byte in range(256):
+		value = byte
+		for _ in range(8):
+			value = (value >> 1) ^ (0xDA6000 if value & 1 else 0)
+		table.append(value)
+	return table
+
+CRC24_TABLE = _generateCrc24Table()
+'''
+This table contains the reflected CRC24 value of every byte (polynomial x^24 + x^10 + x^9 + x^6 + x^4 + x^3 + x + 1).
+'''
+
 def crc24(data, length, init=0x555555):
 	'''
 	This function calculates the 24 bits CRC corresponding to the data provided.
@@ -84,34 +101,11 @@ def crc24(data, length, init=0x555555):
 		>>> crc24(data=data,length=len(data)).hex()
 		'545d96'
 	'''
-	ret = [(init >> 16) & 0xff, (init >> 8) & 0xff, init & 0xff]
-
+	crc = _reverse24(init)
+	table = CRC24_TABLE
 	for d in data[:length]:
-		for v in range(8):
-			t = (ret[0] >> 7) & 1;
-
-			ret[0] <<= 1
-			if ret[1] & 0x80:
-				ret[0] |= 1
-
-			ret[1] <<= 1
-			if ret[2] & 0x80:
-				ret[1] |= 1
-
-			ret[2] <<= 1
-
-			if d & 1 != t:
-				ret[2] ^= 0x5b
-				ret[1] ^= 0x06
-
-			d >>= 1
-
-	ret[0] = _swapBits((ret[0] & 0xFF))
-	ret[1] = _swapBits((ret[1] & 0xFF))
-	ret[2] = _swapBits((ret[2] & 0xFF))
-
-	return bytes(ret)
-
+		crc = (crc >> 8) ^ table[(crc ^ d) & 0xFF]
+	return crc.to_bytes(3,"little")
 
 def isAccessAddressValid(aa):
 	'''
@@ -185,6 +179,29 @@ def rssiToDbm(rssi):
 		return 0
 
 
+def _generateWhiteningKeystream(channel):
+	# the whitening LFSR (x^7 + x^4 + 1) has a period of 127 bits : the keystream is periodic with a period of 127 bytes
+	keystream = bytearray()
+	lfsr = _swapBits(channel) | 2
+	for _ in range(127):
+		key = 0
+		for j in range(8):
+			if lfsr & 0x80:
+				lfsr ^= 0x11
+				key |= (1 << j)
+			lfsr <<= 1
+		keystream.append(key)
+	return bytes(keystream)
+
+WHITENING_KEYSTREAMS = [_generateWhiteningKeystream(channel) for channel in range(40)]
+'''
+This list contains the whitening keystream (one period of 127 bytes) of every BLE channel.
+'''
+
+def _getWhiteningKeystream(channel,length):
+	keystream = WHITENING_KEYSTREAMS[channel] if 0 <= channel < 40 else _generateWhiteningKeystream(channel)
+	return (keystream * (length // 127 + 1))[:length]
+
 def dewhiten(data,channel):
 	'''
 	This function allows to dewhiten a given raw data according to the channel value.
@@ -196,21 +213,6 @@ def dewhiten(data,channel):
 	:return: dewhitened data
 	:rtype: bytes
 	'''
-	def _swap_bits(b):
-		o = 0
-		i = 0
-		for i in range(8):
-			o = o << 1
-			o |= 1 if (b & (1<<i)) else 0
-		return o
-	buffer = b""
-	lfsr = _swap_bits(channel) | 2
-	for i in range(len(data)):
-		c = _swap_bits(data[i])
-		for j in range(7,-1,-1):
-			if lfsr & 0x80:
-				lfsr ^= 0x11
-				c ^= (1<<j)
-			lfsr <<= 1
-		buffer+=bytes([_swap_bits(c)])
-	return buffer
+	length = len(data)
+	keystream = _getWhiteningKeystream(channel,length)
+	return (int.from_bytes(data,"little") ^ int.from_bytes(keystream,"little")).to_bytes(length,"little")
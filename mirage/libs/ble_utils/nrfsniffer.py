@@ -363,6 +363,14 @@ class NRFSnifferDevice(wireless.Device):
 	def isUp(self):
 		return self.nrfsniffer is not None and self.ready
 
+	def fileno(self):
+		'''
+		This method returns the file descriptor of the serial port, allowing the Receiver to wait for incoming datas.
+		'''
+		if self.nrfsniffer is not None:
+			return self.nrfsniffer.fileno()
+		return None
+
 	def init(self):
 		if self.nrfsniffer is not None:
 			self.capabilities = ["SNIFFING_ADVERTISEMENTS", "SNIFFING_NEW_CONNECTION","SCANNING"]
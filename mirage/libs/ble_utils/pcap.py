@@ -72,7 +72,14 @@ class BLEPCAPDevice(wireless.PCAPDevice):
 				"getHopInterval",
 				"getHopIncrement",
 				"isSynchronized",
-				"getMode"
+				"getMode",
+				"setReplaySpeed",
+				"getReplaySpeed",
+				"seekPacket",
+				"seekTimestamp",
+				"getPacketsCount",
+				"setIndexStorage",
+				"setWriterOptions"
 			]
 	def init(self):
 		self.capabilities = ["SNIFFING_ADVERTISEMENTS", "SNIFFING_NEW_CONNECTION"]
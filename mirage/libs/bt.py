@@ -83,6 +83,14 @@ class BtHCIDevice(wireless.Device):
 	def isUp(self):
 		return self.ready
 
+	def fileno(self):
+		'''
+		This method returns the file descriptor of the HCI socket, allowing the Receiver to wait for incoming datas.
+		'''
+		if hasattr(self,"socket") and self.socket is not None:
+			return self.socket.fileno()
+		return None
+
 	def send(self,data):
 		'''
 		This method allows to send raw HCI packet to the HCI device.
@@ -99,7 +99,41 @@ def _int2bin(s):
 class AssignedNumbers:
 	'''
 	This class provides some helpers to get some specific values used by the Bluetooth and Bluetooth Low Energy protocols.
+
+	.. note::
+
+		The lookups use some indexes (number, name and Uniform Type Identifier of every assigned number, company IDs), built once during the first lookup.
+
 	'''
+	indexes = None
+
+	@classmethod
+	def getIndexes(cls):
+		'''
+		This class method returns the indexes used by the lookups, and builds them if needed.
+		If multiple entries share the same key, the first one is indexed.
+
+		:return: dictionary of indexes ("number", "name", "uti" and "company")
+		:rtype: dict
+
+		'''
+		if cls.indexes is None:
+			indexes = {"number":{},"name":{},"uti":{},"company":{}}
+			for k,v in ASSIGNED_NUMBERS.items():
+				entry = (int(k),v['name'],v['uniform_type_identifier'])
+				indexes["number"].setdefault(entry[0],entry)
+				indexes["name"].setdefault(entry[1],entry)
+				indexes["uti"].setdefault(entry[2],entry)
+			for k,v in COMPANY_ID.items():
+				indexes["company"].setdefault(int(k),v)
+			cls.indexes = indexes
+		return cls.indexes
+
+	@classmethod
+	def _lookup(cls,index,key,field):
+		entry = cls.getIndexes()[index].get(key)
+		return entry[field] if entry is not None else None
+
 	@classmethod
 	def getStringsbyFlags(cls,flags):
 		'''
@@ -136,10 +170,7 @@ class AssignedNumbers:
 			'Seers Technology Co., Ltd.'
 
 		'''
-		for k,v in COMPANY_ID.items():
-			if int(k) == int(number):
-				return v
-		return None
+		return cls.getIndexes()["company"].get(int(number))
 	@classmethod
 	def getNumberByName(cls,name):
 		'''
@@ -158,10 +189,7 @@ class AssignedNumbers:
 			6159
 
 		'''
-		for k,v in ASSIGNED_NUMBERS.items():
-			if v['name']==name:
-				return int(k)
-		return None
+		return cls._lookup("name",name,0)
 	@classmethod
 	def getUTIByName(cls,name):
 		'''
@@ -180,10 +208,7 @@ class AssignedNumbers:
 			'org.bluetooth.service.battery_service'
 
 		'''
-		for k,v in ASSIGNED_NUMBERS.items():
-			if v['name']==name:
-				return v['uniform_type_identifier']
-		return None
+		return cls._lookup("name",name,2)
 	@classmethod
 	def getNameByNumber(cls,number):
 		'''
@@ -202,10 +227,7 @@ class AssignedNumbers:
 			'Battery Service'
 
 		'''
-		for k,v in ASSIGNED_NUMBERS.items():
-			if int(k)==number:
-				return v['name']
-		return None
+		return cls._lookup("number",number,1)
 	@classmethod
 	def getUTIByNumber(cls,number):
 		'''
@@ -224,10 +246,7 @@ class AssignedNumbers:
 			'org.bluetooth.service.battery_service'
 
 		'''
-		for k,v in ASSIGNED_NUMBERS.items():
-			if int(k)==number:
-				return v['uniform_type_identifier']
-		return None
+		return cls._lookup("number",number,2)
 	@classmethod
 	def getNumberByUTI(cls,uti):
 		'''
@@ -246,10 +265,7 @@ class AssignedNumbers:
 			6159
 
 		'''
-		for k,v in ASSIGNED_NUMBERS.items():
-			if v['uniform_type_identifier']==uti:
-				return int(k)
-		return None
+		return cls._lookup("uti",uti,0)
 	@classmethod
 	def getNameByUTI(cls,uti):
 		'''
@@ -268,10 +284,7 @@ class AssignedNumbers:
 			'Battery Service'
 
 		'''
-		for k,v in ASSIGNED_NUMBERS.items():
-			if v['uniform_type_identifier']==uti:
-				return v['name']
-		return None
+		return cls._lookup("uti",uti,1)
 	@classmethod
 	def getPermissionsByNumber(cls,number):
 		'''
@@ -0,0 +1,199 @@
+from mirage.libs.common.sdr.sources import SDRSource
+from mirage.libs import utils,io
+import threading
+import numpy as np
+
+'''
+This component implements the Software Defined Radio channelizers, allowing to split a wideband IQ stream into multiple narrowband IQ streams.
+'''
+
+class ChannelSource(SDRSource):
+	'''
+	This class defines a virtual Source providing the narrowband IQ stream of a channel extracted by a channelizer (``SDRChannelizer``). It inherits from ``SDRSource``.
+	It can be connected to a demodulator like any other source.
+	'''
+	def __init__(self,channel,frequency,sampleRate):
+		super().__init__(interface="channel"+str(channel))
+		self.channel = channel
+		self.frequency = frequency
+		self.sampleRate = sampleRate
+
+	def isReady(self):
+		return True
+
+	def getChannel(self):
+		'''
+		This method returns the channel associated to this source.
+
+		:return: channel
+		:rtype: int
+		'''
+		return self.channel
+
+class SDRChannelizer:
+	'''
+	This class implements a Software Defined Radio channelizer: every specific channelizer has to inherit from this class and implement the ``run`` method.
+	When the channelizer is started, it processes the wideband IQ stream received from the ``SDRSource`` and writes the narrowband IQ stream of every channel in the corresponding ``ChannelSource``.
+	'''
+	def __init__(self,centerFrequency,sampleRate,outputSampleRate):
+		self.source = None
+		self.centerFrequency = centerFrequency
+		self.sampleRate = sampleRate
+		self.outputSampleRate = outputSampleRate
+		self.channels = {}
+		self.running = False
+		self.thread = None
+
+	def setSource(self,source):
+		'''
+		This method associates a ``SDRSource`` to the channelizer.
+
+		:param source: source to associate
+		:type source: ``SDRSource``
+
+		'''
+		if isinstance(source,SDRSource):
+			self.source = source
+
+	def addChannel(self,channel,frequency):
+		'''
+		This method adds a channel to extract, and returns the corresponding source.
+
+		:param channel: channel identifier (e.g. BLE or Zigbee channel number)
+		:type channel: int
+		:param frequency: center frequency of the channel (in Hz)
+		:type frequency: int
+		:return: source providing the IQ stream of the channel
+		:rtype: ``ChannelSource``
+
+		'''
+		if abs(frequency - self.centerFrequency) + self.outputSampleRate / 2 > self.sampleRate / 2:
+			io.warning("Channel "+str(channel)+" ("+str(frequency)+" Hz) is outside of the captured band !")
+		self.channels[channel] = ChannelSource(channel,frequency,self.outputSampleRate)
+		return self.channels[channel]
+
+	def getChannelSource(self,channel):
+		'''
+		This method returns the source providing the IQ stream of the provided channel.
+
+		:param channel: channel identifier
+		:type channel: int
+		:return: source of the channel
+		:rtype: ``ChannelSource``
+
+		'''
+		return self.channels.get(channel)
+
+	def getChannels(self):
+		'''
+		This method returns the list of extracted channels.
+
+		:return: list of channels
+		:rtype: list of int
+
+		'''
+		return list(self.channels.keys())
+
+	def start(self):
+		'''
+		This method starts the channelizer.
+
+		:Example:
+
+			>>> channelizer.start()
+
+		'''
+		self.thread = threading.Thread(target=self.run,daemon=True)
+		self.running = True
+		self.thread.start()
+
+	def stop(self):
+		'''
+		This method stops the channelizer.
+
+		:Example:
+
+			>>> channelizer.stop()
+
+		'''
+		self.running = False
+		if self.thread is not None and self.thread is not threading.current_thread():
+			self.thread.join()
+
+	def run(self):
+		pass
+
+class FFTChannelizer(SDRChannelizer):
+	'''
+	This class implements a channelizer based on fast convolution (FFT overlap-save filter bank).
+
+	The wideband stream is split into overlapping blocks of *fftSize* samples, transformed using a single FFT.
+	For every channel, the bins around the channel frequency are selected and shaped by the channel filter, then an inverse FFT of *fftSize / decimation* points directly provides the decimated narrowband stream.
+	Multiple blocks are processed at once, so the cost per sample is dominated by the FFTs.
+
+	The input sample rate must be a multiple of the output sample rate, and every channel must be included in the captured band.
+
+	:Example:
+
+		>>> channelizer = FFTChannelizer(centerFrequency=2412500000, sampleRate=20000000, outputSampleRate=2000000)
+		>>> pipeline = source >> channelizer
+		>>> pipeline.addChannel(11, 2405000000, FSK2Demodulator(...), ZigbeeDecoder(...))
+		>>> pipeline.addChannel(12, 2410000000, FSK2Demodulator(...), ZigbeeDecoder(...))
+
+	'''
+	def __init__(self,centerFrequency,sampleRate,outputSampleRate,outputBlockLength=512,passband=0.7):
+		super().__init__(centerFrequency,sampleRate,outputSampleRate)
+		if sampleRate % outputSampleRate != 0:
+			io.fail("The sample rate must be a multiple of the output sample rate !")
+		self.decimation = int(sampleRate // outputSampleRate)
+		self.outputBlockLength = outputBlockLength
+		self.fftSize = outputBlockLength * self.decimation
+		# 25% overlap : the first quarter of every output block is affected by the circular convolution and discarded
+		self.discarded = outputBlockLength // 4
+		self.step = self.fftSize - self.discarded * self.decimation
+		self.filter = self._generateFilter(outputBlockLength,passband)
+		self.bins = {}
+		self.blockIndex = 0
+
+	def _generateFilter(self,length,passband):
+		# flat response in the passband, raised cosine transition up to the edges of the output band
+		frequencies = np.abs(np.fft.fftfreq(length))
+		edge = passband / 2
+		response = np.ones(length)
+		transition = frequencies > edge
+		response[transition] = np.cos(np.pi/2 * (frequencies[transition] - edge) / (0.5 - edge))**2
+		return response / self.decimation
+
+	def addChannel(self,channel,frequency):
+		source = super().addChannel(channel,frequency)
+		offset = int(round((frequency - self.centerFrequency) * self.fftSize / self.sampleRate))
+		self.bins[channel] = (offset,(offset + np.round(np.fft.fftfreq(self.outputBlockLength) * self.outputBlockLength).astype(int)) % self.fftSize)
+		return source
+
+	def _process(self,samples):
+		blocks = (len(samples) - (self.fftSize - self.step)) // self.step
+		if blocks <= 0:
+			return samples
+		frames = np.lib.stride_tricks.sliding_window_view(samples,self.fftSize)[::self.step][:blocks]
+		spectrum = np.fft.fft(frames,axis=1)
+		blockIndexes = self.blockIndex + np.arange(blocks)
+		for channel,(offset,bins) in self.bins.items():
+			output = np.fft.ifft(spectrum[:,bins] * self.filter,axis=1)[:,self.discarded:]
+			# the bins selection is a frequency shift relative to the beginning of each block : the phase is corrected to keep a continuous stream
+			phase = np.exp(-2j * np.pi * ((offset * self.step * blockIndexes) % self.fftSize) / self.fftSize)
+			self.channels[channel].iqStream.write((output * phase[:,None]).astype(np.complex64).ravel())
+		self.blockIndex += blocks
+		return samples[blocks*self.step:]
+
+	def run(self):
+		self.blockIndex = 0
+		samples = np.zeros(self.fftSize - self.step,dtype=np.complex64)
+		if self.source.running:
+			while self.running:
+				block = self.source.iqStream.read()
+				if len(block) == 0:
+					utils.wait(seconds=0.001)
+					continue
+				samples = self._process(np.concatenate((samples,block)))
+		else:
+			self.running = False
@@ -16,9 +16,9 @@ class SDRDecoder:
 		:param demodulatedData: data to decode
 		:type demodulatedData: str
 		:param iqSamples: IQ samples corresponding with the demodulated data
-		:type iqSamples: list of complex
+		:type iqSamples: ``numpy.ndarray`` of complex
 		:return: tuple composed of the decoded data and the correspond IQ samples
-		:rtype: (bytes, list of complex)
+		:rtype: (bytes, ``numpy.ndarray`` of complex)
 		'''
 		data = bytes.fromhex("".join(["{:02x}".format(j) for j in [int(demodulatedData[i:i+8],2) for i in range(0,len(demodulatedData),8)]]))
 		return (data,iqSamples)
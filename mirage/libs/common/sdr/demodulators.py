@@ -1,7 +1,8 @@
 from mirage.libs.common.sdr.sources import SDRSource
 from mirage.libs.common.sdr.decoders import SDRDecoder
 from mirage.libs import utils,io
-import queue,threading,math
+import queue,threading
+import numpy as np
 
 '''
 This component implements multiple Software Defined Radio demodulators allowing to demodulate an IQ stream to recover packet's data.
@@ -58,7 +59,7 @@ class SDRDemodulator:
 		:param demodulatedData: demodulated data
 		:type demodulatedData: bytes
 		:param iqSamples: IQ samples linked to the demodulated data
-		:type iqSamples: list of complex
+		:type iqSamples: ``numpy.ndarray`` of complex
 
 		'''
 		for d in self.decoders:
@@ -71,7 +72,7 @@ class SDRDemodulator:
 		This method returns the next demodulated and decoded element from the output queue.
 
 		:return: tuple of demodulated data and the correspond IQ samples
-		:rtype: (bytes, list of complex)
+		:rtype: (bytes, ``numpy.ndarray`` of complex)
 
 		'''
 		if not self.output.empty():
@@ -114,6 +115,9 @@ class SDRDemodulator:
 class FSK2Demodulator(SDRDemodulator):
 	'''
 	This demodulator allows to demodulate a 2-Frequency Shift Keying (2-FSK) stream.
+
+	The IQ stream is processed by blocks using NumPy : the instantaneous frequency is estimated for a whole block by computing the phase difference between consecutive samples, then the preamble is searched using a bit-packed matching (the bits following every sample are packed in an integer compared to the packed preamble).
+	The available samples are read from the ring buffer of the source once per block, and the demodulator only keeps the samples needed to extract the IQ of the next packet.
 	'''
 	def __init__(self,samplesPerSymbol=1,samplesBefore=60 , samplesAfter=60,size=8*40,preamble = "01101011011111011001000101110001"):
 		super().__init__()
@@ -123,43 +127,72 @@ class FSK2Demodulator(SDRDemodulator):
 		self.size = size
 		self.preamble = preamble
 		self.numberOfBuffers = samplesPerSymbol
-		self.demodBuffer = ["" for i in range(samplesPerSymbol)]
+		self.preambleBits = np.array([int(b) for b in preamble],dtype=np.uint8)
+		self.packedLength = min(len(preamble),64)
+		self.packedPreamble = np.uint64(int(preamble[:self.packedLength],2))
+		self.samples = np.zeros(0,dtype=np.complex64)
+		self.bits = np.zeros(0,dtype=np.uint8)
+		self.searchStart = 0
+
+	def _demodulate(self,samples):
+		# the sign of the phase difference between consecutive samples gives the transmitted bit
+		previous = self.samples[-1] if len(self.samples) > 0 else samples[0]
+		difference = samples * np.conj(np.concatenate(([previous],samples[:-1])))
+		bits = ((difference.imag > 0) | ((difference.imag == 0) & (difference.real < 0))).astype(np.uint8)
+		self.samples = np.concatenate((self.samples,samples))
+		self.bits = np.concatenate((self.bits,bits))
+
+	def _findPreambles(self):
+		span = (len(self.preamble) - 1) * self.samplesPerSymbol
+		count = len(self.bits) - self.searchStart - span
+		if count <= 0:
+			return []
+		packed = np.zeros(count,dtype=np.uint64)
+		for j in range(self.packedLength):
+			offset = self.searchStart + j*self.samplesPerSymbol
+			packed = (packed << np.uint64(1)) | self.bits[offset:offset+count]
+		positions = [self.searchStart + int(candidate) for candidate in np.flatnonzero(packed == self.packedPreamble)]
+		self.searchStart += count
+		return [position for position in positions if np.array_equal(self.bits[position:position+span+1:self.samplesPerSymbol],self.preambleBits)]
+
+	def _processBlock(self):
+		end = 0
+		for position in self._findPreambles():
+			if position < end:
+				# this preamble is included in the previous packet
+				continue
+			last = position + (self.size - 1) * self.samplesPerSymbol
+			if last + self.samplesAfter > len(self.bits):
+				# the packet (or its trailing samples) is not complete, it will be demodulated with the next block
+				self.searchStart = position
+				break
+			demodulatedBlock = (self.bits[position:last+1:self.samplesPerSymbol] + ord("0")).tobytes().decode()
+			iqBlock = self.samples[max(0,position-1-self.samplesBefore):last+self.samplesAfter].copy()
+			self.generateOutput(demodulatedBlock,iqBlock)
+			self.count += 1
+			end = last + 1
+		else:
+			self.searchStart = max(self.searchStart,end)
 
-	def run(self):
-
-		i = 0
-		step = 0
+		# only keep the samples needed to extract the IQ of the next packet
+		drop = max(0,self.searchStart - 1 - self.samplesBefore)
+		if drop > 0:
+			self.samples = self.samples[drop:]
+			self.bits = self.bits[drop:]
+			self.searchStart -= drop
 
+	def run(self):
+		self.samples = np.zeros(0,dtype=np.complex64)
+		self.bits = np.zeros(0,dtype=np.uint8)
+		self.searchStart = 0
 		if self.source.running:
-			while i >= len(self.source.iqStream) and self.running:
-				utils.wait(seconds=0.001)
 			while self.running:
-
-				if  i < len(self.source.iqStream):
-					i0 = self.source.iqStream[i-1].real
-					q0 = self.source.iqStream[i-1].imag
-					i1 = self.source.iqStream[i].real
-					q1 = self.source.iqStream[i].imag
-
-					self.demodBuffer[step] += "1" if math.atan2(i0*q1 - q0*i1,i0*i1+q0*q1) > 0 else "0"
-					if len(self.demodBuffer[step]) >= len(self.preamble):
-						if self.preamble != self.demodBuffer[step][:len(self.preamble)]:
-							self.demodBuffer[step] = self.demodBuffer[step][1:]
-						else:
-							if len(self.demodBuffer[step]) == self.size:
-								demodulatedBlock = self.demodBuffer[step]
-								iqBlock = self.source.iqStream[(i-1)-((self.size-1)*self.numberOfBuffers)-self.samplesBefore:i+self.samplesAfter]
-								self.generateOutput(demodulatedBlock,iqBlock)
-								self.source.iqStream = self.source.iqStream[i+1:]
-								i = 1
-								self.count += 1
-								for j in range(self.numberOfBuffers):
-									self.demodBuffer[j] = ""
-
-
-						step = (step + 1) % self.numberOfBuffers
-						i += 1
-
+				block = self.source.iqStream.read()
+				if len(block) == 0:
+					utils.wait(seconds=0.001)
+					continue
+				self._demodulate(block)
+				self._processBlock()
 		else:
 			self.running = False
 
@@ -168,6 +201,7 @@ class FasterFSK2Demodulator(SDRDemodulator):
 	This **experimental** demodulator allows to demodulate a 2-Frequency Shift Keying stream.
 	It is an experimental demodulator based on a amplitude filter, which tries to estimate the noise level to demodulate the stream only if the amplitude is above the noise thresold.
 	The main objective of this implementation is to increase the demodulator's speed, however it may miss some packets if the noise thresold is wrong.
+	As for ``FSK2Demodulator``, the IQ stream is kept in a NumPy array and the bit following every sample is computed for a whole block when it is read from the ring buffer of the source.
 
 	'''
 	def __init__(self,samplesPerSymbol=1,samplesBefore=60 , samplesAfter=60,size=8*40,preamble = "01101011011111011001000101110001"):
@@ -182,7 +216,18 @@ class FasterFSK2Demodulator(SDRDemodulator):
 		self.noiseLevel = 0
 		self.noiseState = []
 		self.demodBuffer = ["" for i in range(samplesPerSymbol)]
-
+		self.iqStream = np.zeros(0,dtype=np.complex64)
+		self.bits = np.zeros(0,dtype=np.uint8)
+
+	def _fetch(self):
+		block = self.source.iqStream.read()
+		if len(block) > 0:
+			# the sign of the phase difference between consecutive samples gives the transmitted bit
+			previous = self.iqStream[-1] if len(self.iqStream) > 0 else block[0]
+			difference = block * np.conj(np.concatenate(([previous],block[:-1])))
+			bits = ((difference.imag > 0) | ((difference.imag == 0) & (difference.real < 0))).astype(np.uint8)
+			self.iqStream = np.concatenate((self.iqStream,block))
+			self.bits = np.concatenate((self.bits,bits))
 
 	def stop(self):
 		self.running = False
@@ -194,26 +239,28 @@ class FasterFSK2Demodulator(SDRDemodulator):
 		step = 0
 		demodulating = False
 		demodulatingCount = 0
+		self.iqStream = np.zeros(0,dtype=np.complex64)
+		self.bits = np.zeros(0,dtype=np.uint8)
 		if self.source.running:
-			while i >= len(self.source.iqStream) and self.running:
+			while i >= len(self.iqStream) and self.running:
+				self._fetch()
 				utils.wait(seconds=0.00001)
 
 			while self.running:
-				if i < len(self.source.iqStream):
+				if i >= len(self.iqStream):
+					self._fetch()
+				if i < len(self.iqStream):
 
 					if not demodulating:
 							increment = (self.size*self.numberOfBuffers) // 2
 							if self.noiseThresold is None:
-								values = []
-								for j in range(increment,self.source.blockLength // 2,increment):
-									values += [self.source.iqStream[j].imag*self.source.iqStream[j].imag+self.source.iqStream[j].real*self.source.iqStream[j].real]
-
-								self.noiseThresold = sum(values)/len(values)
+								values = self.iqStream[increment:self.source.blockLength // 2:increment]
+								self.noiseThresold = float(np.mean(values.real*values.real+values.imag*values.imag))
 								#io.info("<Experimental Demodulator> Noise thresold: "+str(self.noiseThresold))
 
 
 							else:
-								amplitude = self.source.iqStream[i].real*self.source.iqStream[i].real+self.source.iqStream[i].imag*self.source.iqStream[i].imag
+								amplitude = abs(self.iqStream[i])**2
 								if len(self.noiseState) == 10:
 									if self.noiseState.count(False) > self.noiseState.count(True):
 										self.noiseLevel += 0.25
@@ -224,7 +271,8 @@ class FasterFSK2Demodulator(SDRDemodulator):
 										demodulatingCount = self.size * self.numberOfBuffers * 2
 										demodulating = True
 										i -= increment
-										self.source.iqStream = self.source.iqStream[i-self.samplesBefore:] # test !!!
+										self.iqStream = self.iqStream[i-self.samplesBefore:] # test !!!
+										self.bits = self.bits[i-self.samplesBefore:]
 										i = self.samplesBefore
 									else:
 										i += increment
@@ -233,12 +281,7 @@ class FasterFSK2Demodulator(SDRDemodulator):
 									i += increment
 					else:
 
-						i0 = self.source.iqStream[i-1].real
-						q0 = self.source.iqStream[i-1].imag
-						i1 = self.source.iqStream[i].real
-						q1 = self.source.iqStream[i].imag
-
-						self.demodBuffer[step] += "1" if math.atan2(i0*q1 - q0*i1,i0*i1+q0*q1) > 0 else "0"# (i0*q1 - i1*q0)
+						self.demodBuffer[step] += "1" if self.bits[i] else "0"
 
 						if len(self.demodBuffer[step]) >= len(self.preamble):
 							if self.preamble != self.demodBuffer[step][:len(self.preamble)]:
@@ -246,9 +289,10 @@ class FasterFSK2Demodulator(SDRDemodulator):
 							else:
 								if len(self.demodBuffer[step]) == self.size:
 									demodulatedBlock = self.demodBuffer[step]
-									iqBlock = self.source.iqStream[(i-1)-((self.size-1)*self.numberOfBuffers)-self.samplesBefore:i+self.samplesAfter]
+									iqBlock = self.iqStream[(i-1)-((self.size-1)*self.numberOfBuffers)-self.samplesBefore:i+self.samplesAfter].copy()
 									self.generateOutput(demodulatedBlock,iqBlock)
-									self.source.iqStream = self.source.iqStream[i+1:]
+									self.iqStream = self.iqStream[i+1:]
+									self.bits = self.bits[i+1:]
 									i = 1
 									self.count += 1
 									self.noiseState.append(True)
@@ -1,5 +1,6 @@
 from mirage.libs.common.sdr.sinks import SDRSink
 from mirage.libs.common.sdr.encoders import SDREncoder
+from collections import OrderedDict
 import math,queue,threading
 import numpy as np
 
@@ -11,15 +12,21 @@ This component implements multiple Software Defined Radio modulators allowing to
 
 class SDRModulator:
 	'''
-	This class implements a Sofware Defined Radio modulator: every specific modulator has to inherit from this class and implement the ``run`` method.
+	This class implements a Sofware Defined Radio modulator: every specific modulator has to inherit from this class and implement the ``modulate`` and ``getParameters`` methods.
 	When the modulator is started, it processes the packets transmitted using setInput, performs the operations needed to modulate the data and transmits the IQ stream to the associated ``SDRSink``.
+
+	The generated waveforms are stored in a bounded LRU cache, indexed by the encoded data and the modulation parameters : a frame transmitted multiple times (e.g. an advertisement) is only modulated once.
+	The cached waveforms are read-only ``numpy.complex64`` arrays, and the corresponding interleaved signed 8 bits buffers (see ``getTransmitBuffer``) are provided to the sink without any conversion.
 	'''
-	def __init__(self):
+	def __init__(self,cacheSize=64):
 		self.sink = None
 		self.count = 0
 		self.encoders = []
 		self.running = False
 		self.input = queue.Queue()
+		self.cacheSize = cacheSize
+		self.cache = OrderedDict()
+		self.cacheLock = threading.Lock()
 
 	def setSink(self,sink):
 		'''
@@ -76,6 +83,93 @@ class SDRModulator:
 		'''
 		self.input.put(self.generateInput(data))
 
+	def setCacheSize(self,cacheSize):
+		'''
+		This method sets the maximal number of waveforms stored in the cache (0 disables the cache).
+
+		:param cacheSize: maximal number of cached waveforms
+		:type cacheSize: int
+
+		'''
+		with self.cacheLock:
+			self.cacheSize = cacheSize
+			while len(self.cache) > max(0,cacheSize):
+				self.cache.popitem(last=False)
+
+	def clearCache(self):
+		'''
+		This method removes every cached waveforms.
+		'''
+		with self.cacheLock:
+			self.cache.clear()
+
+	def getParameters(self):
+		'''
+		This method returns the modulation parameters, used to index the cached waveforms.
+
+		:return: modulation parameters
+		:rtype: tuple
+
+		'''
+		return ()
+
+	def modulate(self,data):
+		'''
+		This method modulates the provided data.
+
+		:param data: data to modulate (binary string)
+		:type data: str
+		:return: IQ samples
+		:rtype: ``numpy.ndarray`` of ``numpy.complex64``
+
+		'''
+		return np.zeros(0,dtype=np.complex64)
+
+	def _getCacheEntry(self,data):
+		key = (data,self.getParameters())
+		with self.cacheLock:
+			if key in self.cache:
+				self.cache.move_to_end(key)
+				return self.cache[key]
+		waveform = self.modulate(data)
+		waveform.flags.writeable = False
+		entry = [waveform,None]
+		with self.cacheLock:
+			if self.cacheSize > 0:
+				self.cache[key] = entry
+				while len(self.cache) > self.cacheSize:
+					self.cache.popitem(last=False)
+		return entry
+
+	def getWaveform(self,data):
+		'''
+		This method returns the waveform corresponding to the provided data, from the cache if it has already been generated.
+
+		:param data: data to modulate (binary string)
+		:type data: str
+		:return: IQ samples (read-only)
+		:rtype: ``numpy.ndarray`` of ``numpy.complex64``
+
+		'''
+		return self._getCacheEntry(data)[0]
+
+	def getTransmitBuffer(self,data):
+		'''
+		This method returns the waveform corresponding to the provided data as interleaved I and Q signed 8 bits values, ready to be transmitted by the sink (from the cache if it has already been generated).
+
+		:param data: data to modulate (binary string)
+		:type data: str
+		:return: interleaved I and Q values (read-only)
+		:rtype: ``numpy.ndarray`` of ``numpy.int8``
+
+		'''
+		entry = self._getCacheEntry(data)
+		if entry[1] is None:
+			buffer = SDRSink.quantize(entry[0])
+			buffer.flags.writeable = False
+			entry[1] = buffer
+		return entry[1]
+
 	def start(self):
 		'''
 		This method starts the modulator.
@@ -104,7 +198,16 @@ class SDRModulator:
 		self.running = False
 
 	def run(self):
-		pass
+		if self.sink.running:
+			while self.running:
+				try:
+					data = self.input.get(timeout=0.1)
+				except queue.Empty:
+					continue
+				self.sink.transmit(self.getTransmitBuffer(data))
+				self.count += 1
+		else:
+			self.running = False
 
 class OQPSKModulator(SDRModulator):
 	'''
@@ -176,39 +279,26 @@ class OQPSKModulator(SDRModulator):
 		:param pulseType: pulse type ("square" or "sinus")
 		:type pulseType: str
 		:return: pulse
-		:rtype: list of int
+		:rtype: ``numpy.ndarray`` of float
 
 		'''
-		table=[]
 		if pulseType == "sinus":
-			for i in range(samplesPerSymbol):
-				table.append(math.sin((i*math.pi)/samplesPerSymbol))
+			return np.sin(np.arange(samplesPerSymbol)*np.pi/samplesPerSymbol)
 		else:
-			table = [1.0 for i in range(samplesPerSymbol)]
-		return table
+			return np.ones(samplesPerSymbol)
 
-	def run(self):
-		if self.sink.running:
-			while self.running:
-				if not self.input.empty():
-					data = self.input.get()
-					iChannel = []
-					qChannel = [0.0 for i in range(self.samplesPerSymbol//2)]
-					for i in range(len(data)):
-						if i%2 == 0:
-							iChannel += [(t if data[i] == "1" else -t) for t in self.pulse]
-						else:
-							qChannel += [(t if data[i] == "1" else -t) for t in self.pulse]
-					iChannel += [0.0] + [0.0 for i in range(len(qChannel)-len(iChannel))] #FIXME y en a forcément plus dans I non?
-					qChannel += [0.0]
-
-					iqSamples = []
-					for i in range(len(iChannel)):
-						iqSamples.append(iChannel[i]+1j*qChannel[i])
-
-					self.sink.transmit(iqSamples)
-		else:
-			self.running = False
+	def getParameters(self):
+		return (self.samplesPerSymbol,self.pulseType)
+
+	def modulate(self,data):
+		symbols = np.where(np.frombuffer(data.encode(),dtype=np.uint8) == ord("1"),1.0,-1.0)
+		iChannel = np.outer(symbols[0::2],self.pulse).ravel()
+		qChannel = np.concatenate((np.zeros(self.samplesPerSymbol//2),np.outer(symbols[1::2],self.pulse).ravel()))
+		# the Q channel is delayed by half a symbol, both channels are padded to the same length
+		iqSamples = np.zeros(max(len(iChannel),len(qChannel))+1,dtype=np.complex64)
+		iqSamples.real[:len(iChannel)] = iChannel
+		iqSamples.imag[:len(qChannel)] = qChannel
+		return iqSamples
 
 class GFSKModulator(SDRModulator):
 	'''
@@ -286,20 +376,10 @@ class GFSKModulator(SDRModulator):
 
 
 	def _generateGaussian(self,gain,sps,bt,ntaps):
-		taps = [0.0 for i in range(ntaps)]
-		scale = 0.0
-		dt = 1.0 / sps
 		s = 1.0 / (math.sqrt(math.log(2.0))) / (2 * math.pi * bt)
-		t0 = -0.5 * ntaps
-		ts = 0.0
-		for i in range(ntaps):
-			t0+=1.0
-			ts = s * dt * t0
-			taps[i] = math.exp(-0.5 * ts * ts)
-			scale += taps[i]
-		for i in range(ntaps):
-			taps[i] = taps[i] / scale * gain
-		return taps
+		ts = s * (1.0 / sps) * (np.arange(1,ntaps+1) - 0.5 * ntaps)
+		taps = np.exp(-0.5 * ts * ts)
+		return taps / taps.sum() * gain
 
 	def generateFilter(self):
 		'''
@@ -308,29 +388,17 @@ class GFSKModulator(SDRModulator):
 
 		self.pulse = self._generateGaussian(1.0,self.samplesPerSymbol, self.bt, self.samplesPerSymbol)
 
+	def getParameters(self):
+		return (self.samplesPerSymbol,self.bt,self.modulationIndex)
 
+	def modulate(self,data):
+		# Generating NRZ signal
+		inp = np.repeat(np.where(np.frombuffer(data.encode(),dtype=np.uint8) == ord("1"),1.0,-1.0),self.samplesPerSymbol)
 
-	def run(self):
-		if self.sink.running:
-			while self.running:
-				if not self.input.empty():
-					data = self.input.get()
-					inp = []
-					# Generating NRZ signal
-					for bit in data:
-						inp += [1.0 if bit=="1" else -1.0 for i in range(self.samplesPerSymbol)]
-
-					# Applying gaussian filter
-					outputGaussianFilter = np.convolve(inp, self.pulse)
-
-					# Generating IQ samples
-					output = []
-					tmp = 0
-					output.append(math.cos(tmp)+1j*math.sin(tmp))
-					for i in range(1,len(outputGaussianFilter)):
-						tmp = tmp+math.pi*self.modulationIndex*outputGaussianFilter[i-1]/float(self.samplesPerSymbol)
-						output.append(math.cos(tmp)+1j*math.sin(tmp))
-					print("Transmitting IQ")
-					self.sink.transmit(output)
-		else:
-			self.running = False
+		# Applying gaussian filter
+		outputGaussianFilter = np.convolve(inp, self.pulse)
+
+		# Generating IQ samples (the phase is the cumulated frequency deviation)
+		phase = np.zeros(len(outputGaussianFilter))
+		np.cumsum(outputGaussianFilter[:-1]*(math.pi*self.modulationIndex/float(self.samplesPerSymbol)),out=phase[1:])
+		return np.exp(1j*phase).astype(np.complex64)
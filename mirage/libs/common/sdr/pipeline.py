@@ -84,7 +84,7 @@ class SDRPipeline:
 		This method returns the demodulator's output .
 
 		:return: tuple of demodulated data and the corresponding IQ Samples
-		:rtype: (bytes, list of complex)
+		:rtype: (bytes, ``numpy.ndarray`` of complex)
 
 		'''
 		return self.demodulator.getOutput()
@@ -173,3 +173,155 @@ class SDRPipeline:
 			if self.modulator.running:
 				self.modulator.stop()
 		self.started = False
+
+class SDRChannelizedPipeline:
+	'''
+	This class implements a multi-channel Software Defined Radio pipeline : the wideband IQ stream provided by a ``SDRSource`` is split into multiple narrowband streams by a channelizer (``SDRChannelizer``), and every narrowband stream is demodulated and decoded by its own ``SDRPipeline``.
+	The outputs are tagged with the corresponding channel.
+
+	:Example:
+
+		>>> rxPipeline = source >> channelizer
+		>>> rxPipeline.addChannel(11, 2405000000, demodulator11, decoder11)
+		>>> rxPipeline.addChannel(12, 2410000000, demodulator12, decoder12)
+		>>> rxPipeline.start()
+		>>> rxPipeline.getOutput()
+		(b'...', [...], 12)
+
+	'''
+	def __init__(self, source=None, channelizer=None):
+		self.source = source
+		self.channelizer = channelizer
+		self.pipelines = {}
+		self.nextChannel = 0
+		self.started = False
+
+	def __del__(self):
+		self.stop()
+
+	def addChannel(self,channel,frequency,demodulator,*decoders):
+		'''
+		This method adds a channel to the pipeline, demodulated and decoded by the provided blocks.
+
+		:param channel: channel identifier (e.g. BLE or Zigbee channel number)
+		:type channel: int
+		:param frequency: center frequency of the channel (in Hz)
+		:type frequency: int
+		:param demodulator: demodulator used for this channel
+		:type demodulator: ``SDRDemodulator``
+		:param `*decoders`: decoders used for this channel
+		:type `*decoders`: ``SDRDecoder`` (multiple)
+		:return: pipeline of the channel
+		:rtype: ``SDRPipeline``
+
+		'''
+		pipeline = self.channelizer.addChannel(channel,frequency) >> demodulator
+		for decoder in decoders:
+			pipeline = pipeline >> decoder
+		self.pipelines[channel] = pipeline
+		return pipeline
+
+	def getSource(self):
+		'''
+		This method returns the wideband source connected to the pipeline.
+
+		:return: pipeline source
+		:rtype: ``SDRSource``
+
+		'''
+		return self.source
+
+	def getChannelizer(self):
+		'''
+		This method returns the channelizer connected to the pipeline.
+
+		:return: pipeline channelizer
+		:rtype: ``SDRChannelizer``
+
+		'''
+		return self.channelizer
+
+	def getPipeline(self,channel):
+		'''
+		This method returns the pipeline demodulating the provided channel.
+
+		:param channel: channel identifier
+		:type channel: int
+		:return: pipeline of the channel
+		:rtype: ``SDRPipeline``
+
+		'''
+		return self.pipelines.get(channel)
+
+	def getChannels(self):
+		'''
+		This method returns the list of channels demodulated by the pipeline.
+
+		:return: list of channels
+		:rtype: list of int
+
+		'''
+		return list(self.pipelines.keys())
+
+	def getOutput(self):
+		'''
+		This method returns the next output of the demodulators, tagged with the corresponding channel. The channels are polled in a round-robin way.
+
+		:return: tuple of demodulated data, the corresponding IQ Samples and the channel
+		:rtype: (bytes, ``numpy.ndarray`` of complex, int)
+
+		'''
+		channels = list(self.pipelines.keys())
+		for i in range(len(channels)):
+			channel = channels[(self.nextChannel + i) % len(channels)]
+			output = self.pipelines[channel].getOutput()
+			if output is not None:
+				self.nextChannel = (self.nextChannel + i + 1) % len(channels)
+				return (output[0],output[1],channel)
+		return None
+
+	def isStarted(self):
+		'''
+		This method returns a boolean indicating if the pipeline is started.
+
+		:return: boolean indicating if the pipeline is started
+		:rtype: bool
+
+		'''
+		return self.started
+
+	def start(self):
+		'''
+		This method starts the pipeline.
+
+		:Example:
+
+			>>> pipeline.start()
+
+		'''
+		if not self.source.running:
+			self.source.startStreaming()
+		while not self.source.running:
+			utils.wait(seconds=0.01)
+		if not self.channelizer.running:
+			self.channelizer.start()
+		for pipeline in self.pipelines.values():
+			pipeline.start()
+		self.started = True
+
+	def stop(self):
+		'''
+		This method stops the pipeline.
+
+		:Example:
+
+			>>> pipeline.stop()
+
+		'''
+		for pipeline in self.pipelines.values():
+			pipeline.stop()
+		if self.channelizer is not None and self.channelizer.running:
+			self.channelizer.stop()
+		if self.source is not None and self.source.running:
+			self.source.stopStreaming()
+		self.started = False
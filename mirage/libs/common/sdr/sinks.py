@@ -2,7 +2,8 @@ from ctypes import *
 from mirage.libs.common.sdr.hackrf_definitions import *
 from mirage.libs.common.sdr.hardware import *
 from mirage.libs.common.sdr.pipeline import SDRPipeline
-import queue,struct,threading,numpy
+from mirage.libs.common.sdr.sources import FileSource
+import os,queue,threading,numpy
 
 '''
 This component implements the supported Software Defined Radio Sinks (e.g. TX).
@@ -22,6 +23,9 @@ class SDRSink:
 		  * ``isStreaming()`` : this method returns a boolean indicating if streaming is enabled
 		  * ``close()`` : this method closes the sink
 
+	The IQ samples to transmit are provided to the ``transmit`` method, and stored in the transmit queue as interleaved I and Q signed 8 bits values (``numpy.ndarray`` of ``numpy.int8``).
+	A modulator may provide some pre-quantised buffers (see ``SDRSink.quantize``) : they are queued without any conversion or copy.
+
 	'''
 	def __init__(self,interface):
 		self.interface = interface
@@ -54,13 +58,41 @@ class SDRSink:
 	def stopStreaming(self):
 		self.running = False
 
+	@staticmethod
+	def quantize(iqSamples):
+		'''
+		This static method converts some IQ samples to interleaved I and Q signed 8 bits values.
+
+		:param iqSamples: IQ samples (amplitude between -1.0 and 1.0)
+		:type iqSamples: list of complex or ``numpy.ndarray`` of complex
+		:return: interleaved I and Q values
+		:rtype: ``numpy.ndarray`` of ``numpy.int8``
+
+		:Example:
+
+			>>> SDRSink.quantize([1.0+0.5j, -1.0j])
+			array([ 127,   63,    0, -127], dtype=int8)
+
+		'''
+		values = numpy.ascontiguousarray(iqSamples,dtype=numpy.complex64).view(numpy.float32) * 127
+		return values.astype(numpy.int8)
+
 	def nextData(self):
 		if self.transmitQueue.empty():
-			return []
+			return numpy.zeros(0,dtype=numpy.int8)
 		else:
 			return self.transmitQueue.get()
 
 	def transmit(self,iqSamples):
+		'''
+		This method adds some IQ samples to the transmit queue.
+
+		:param iqSamples: IQ samples, or interleaved I and Q signed 8 bits values
+		:type iqSamples: list of complex, ``numpy.ndarray`` of complex or ``numpy.ndarray`` of ``numpy.int8``
+
+		'''
+		if not (isinstance(iqSamples,numpy.ndarray) and iqSamples.dtype == numpy.int8):
+			iqSamples = SDRSink.quantize(iqSamples)
 		self.transmitQueue.put(iqSamples)
 
 	def close(self):
@@ -89,7 +121,8 @@ class HackRFSink(HackRFSDR,SDRSink):
 		HackRFSDR.__init__(self,interface=interface)
 		SDRSink.__init__(self,interface=interface)
 		self.tLock = threading.Lock()
-		self.currentData = []
+		self.currentData = numpy.zeros(0,dtype=numpy.int8)
+		self.currentOffset = 0
 		if self.ready:
 			HackRFSink.numberOfSinks+=1
 
@@ -128,35 +161,23 @@ class HackRFSink(HackRFSDR,SDRSink):
 		'''
 		This method implements the transmission callback used by the sink to transmit IQ to the HackRF.
 		It is not intended to be used directly, see ``startStreaming`` and ``stopStreaming`` methods to start and stop the streaming process.
+
+		The queued buffers are copied in the HackRF transfer buffer using ``memmove``. A packet shorter than a transfer is aligned at the end of the transfer, a longer one is split in consecutive transfers.
 		'''
-		# PROBLEM : MULTIPLE PACKETS ARE TRANSMITTED SOMETIMES ...
 		length = hackrf_transfer.contents.valid_length
 		self.blockLength = length // 2
-		array_type = (c_byte*length)
-		values = (array_type)()
-		if len(self.currentData) == 0:
+		destination = cast(hackrf_transfer.contents.buffer, c_void_p).value
+		if self.currentOffset >= len(self.currentData):
 			self.currentData = self.nextData()
-		if len(self.currentData) == 0:
-			for i in range(length):
-				values[i] = 0
-		elif len(self.currentData) <= self.blockLength:
-			start = self.blockLength - len(self.currentData)
-			for i in range(2*start):
-				values[i] = 0
-			for i in range(len(self.currentData)):
-				values[2*start+2*i] = struct.pack('b',int(self.currentData[i].real*127))[0]
-				values[2*start+2*i+1] = struct.pack('b',int(self.currentData[i].imag*127))[0]
-			for i in range(2*start+2*len(self.currentData),len(values)):
-				values[i] = 0
-			self.currentData = []
-		else:
-			data = self.currentData[:self.blockLength]
-			self.currentData = self.currentData[self.blockLength+1:]
-			for i in range(len(data)):
-				values[2*i] = struct.pack('b',int(data[i].real*127))[0]
-				values[2*i+1] = struct.pack('b',int(data[i].imag*127))[0]
+			self.currentOffset = 0
 		self.tLock.acquire()
-		memmove(hackrf_transfer.contents.buffer, byref(values), length)
+		count = min(len(self.currentData) - self.currentOffset,length)
+		start = length - count if self.currentOffset == 0 else 0
+		memset(destination, 0, start)
+		if count > 0:
+			memmove(destination + start, self.currentData.ctypes.data + self.currentOffset, count)
+		memset(destination + start + count, 0, length - start - count)
+		self.currentOffset += count
 		self.tLock.release()
 		return 0
 
@@ -277,3 +298,110 @@ class HackRFSink(HackRFSDR,SDRSink):
 			io.fail("You have to provide a sample rate !")
 			valid = False
 		return valid
+
+class FileSink(SDRSink):
+	'''
+	This class defines a Sink writing the transmitted IQ samples in a raw IQ file, allowing to use a Software Defined Radio pipeline offline (e.g. to generate a recording). It inherits from ``SDRSink``.
+
+	The supported formats are the same as the ``FileSource`` ones (``cs8`` or ``cf32``, according to the extension). The file is created when the first samples are written.
+
+	:Example:
+
+		>>> sink = FileSink("generated.iq")
+		>>> pipeline = sink << GFSKModulator(samplesPerSymbol=2) << BLEEncoder(channel=37)
+		>>> pipeline.start()
+		>>> pipeline.setInput(bytes(packet))
+
+	'''
+	FORMATS = FileSource.FORMATS
+
+	@classmethod
+	def fromRecording(cls,interface):
+		'''
+		This class method returns the sink associated to a recording used as a source : the samples are written in a file named "<name>-tx<extension>" (e.g. "capture-tx.iq" for "capture.iq"), using the same format.
+
+		:param interface: name of the recording
+		:type interface: str
+		:return: file sink
+		:rtype: ``FileSink``
+		'''
+		name,extension = os.path.splitext(interface)
+		return cls(name+"-tx"+extension)
+
+	def __init__(self,interface,fileFormat=None):
+		SDRSink.__init__(self,interface=interface)
+		self.filename = interface
+		self.fileFormat = fileFormat if fileFormat is not None else FileSink.FORMATS.get(os.path.splitext(interface)[1],"cs8")
+		self.lnaGain = None
+		self.file = None
+		self.thread = None
+
+	def isReady(self):
+		return True
+
+	def setGain(self,gain):
+		self.setTXGain(gain)
+
+	def getGain(self):
+		return self.txGain
+
+	def setLNAGain(self,lnaGain):
+		self.lnaGain = lnaGain
+
+	def enableAntenna(self):
+		pass
+
+	def _write(self,data):
+		if self.file is None:
+			self.file = open(self.filename,"wb")
+		if self.fileFormat == "cs8":
+			data.tofile(self.file)
+		else:
+			(data.astype(numpy.float32) / 127.0).tofile(self.file)
+		self.file.flush()
+
+	def _stream(self):
+		while self.running:
+			try:
+				self._write(self.transmitQueue.get(timeout=0.1))
+			except queue.Empty:
+				pass
+		while not self.transmitQueue.empty():
+			self._write(self.transmitQueue.get())
+
+	def startStreaming(self):
+		'''
+		This method starts the streaming process.
+
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+		'''
+		if not self.running:
+			self.running = True
+			self.thread = threading.Thread(target=self._stream,daemon=True)
+			self.thread.start()
+			return True
+		return False
+
+	def stopStreaming(self):
+		'''
+		This method stops the streaming process, after writing the queued samples.
+
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+		'''
+		if self.running:
+			self.running = False
+			if self.thread is not None and self.thread is not threading.current_thread():
+				self.thread.join()
+			return True
+		return False
+
+	def close(self):
+		'''
+		This method closes the IQ file.
+		'''
+		self.stopStreaming()
+		if self.file is not None:
+			self.file.close()
+			self.file = None
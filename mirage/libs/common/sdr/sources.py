@@ -3,13 +3,149 @@ from mirage.libs.common.sdr.hackrf_definitions import *
 from mirage.libs.common.sdr.pipeline import *
 from mirage.libs.common.sdr.hardware import *
 from mirage.libs import io,utils
-import os,threading,numpy
+import os,threading,time,numpy
 
 
 '''
 This component implements the supported Software Defined Radio Sources (e.g. RX).
 '''
 
+class IQRingBuffer:
+	'''
+	This class implements a preallocated ring buffer of IQ samples (``numpy.complex64``), used by the ``SDRSource`` to provide the received IQ stream to the demodulators.
+
+	The writer (the reception callback of the source) and the reader (the demodulator) use two absolute cursors (number of samples written and read since the last reset).
+	If the reader is too slow and the buffer is full, the oldest samples are overwritten : the read cursor is moved forward and the number of lost samples is counted (see ``getOverflows``).
+
+	:Example:
+
+		>>> buffer = IQRingBuffer(size=1024)
+		>>> buffer.writeInterleaved(numpy.array([127,0,0,127],dtype=numpy.int8))
+		>>> len(buffer)
+		2
+		>>> buffer.read()
+		array([0.9921875+0.j       , 0.       +0.9921875j], dtype=complex64)
+
+	'''
+	def __init__(self,size=2**21):
+		self.size = size
+		self.buffer = numpy.zeros(size,dtype=numpy.complex64)
+		self.lock = threading.Lock()
+		self.reset()
+
+	def reset(self):
+		'''
+		This method empties the buffer and resets the cursors and the overflow counter.
+		'''
+		with self.lock:
+			self.readCursor = 0
+			self.writeCursor = 0
+			self.overflows = 0
+			self.reads = 0
+
+	def __len__(self):
+		return self.writeCursor - self.readCursor
+
+	def getReadCursor(self):
+		'''
+		This method returns the read cursor (number of samples read or lost since the last reset).
+
+		:return: read cursor
+		:rtype: int
+		'''
+		return self.readCursor
+
+	def getWriteCursor(self):
+		'''
+		This method returns the write cursor (number of samples written since the last reset).
+
+		:return: write cursor
+		:rtype: int
+		'''
+		return self.writeCursor
+
+	def getReadsCount(self):
+		'''
+		This method returns the number of read operations performed since the last reset.
+
+		:return: number of read operations
+		:rtype: int
+		'''
+		return self.reads
+
+	def getOverflows(self):
+		'''
+		This method returns the number of samples lost because the buffer was full.
+
+		:return: number of lost samples
+		:rtype: int
+		'''
+		return self.overflows
+
+	def _reserve(self,count):
+		# moves the write cursor forward and returns the number of samples to skip (if they don't fit in the buffer)
+		# and the slices of the buffer where the remaining samples must be written
+		skipped = max(0,count - self.size)
+		lost = max(0,self.writeCursor + count - self.size - self.readCursor)
+		self.overflows += lost
+		self.readCursor += lost
+		self.writeCursor += skipped
+		start = self.writeCursor % self.size
+		first = min(count - skipped,self.size - start)
+		self.writeCursor += count - skipped
+		return (skipped,slice(start,start+first),slice(0,count - skipped - first))
+
+	def write(self,samples):
+		'''
+		This method writes some IQ samples in the buffer.
+
+		:param samples: IQ samples
+		:type samples: ``numpy.ndarray`` of complex
+		'''
+		with self.lock:
+			skipped,first,second = self._reserve(len(samples))
+			length = first.stop - first.start
+			self.buffer[first] = samples[skipped:skipped+length]
+			self.buffer[second] = samples[skipped+length:]
+
+	def writeInterleaved(self,values):
+		'''
+		This method converts some interleaved signed 8 bits I and Q values (e.g. the content of a HackRF transfer) to complex samples, and writes them in the buffer.
+		The conversion is performed directly in the buffer, without any intermediate allocation.
+
+		:param values: interleaved I and Q values
+		:type values: ``numpy.ndarray`` of ``numpy.int8``
+		'''
+		with self.lock:
+			count = len(values) // 2
+			skipped,first,second = self._reserve(count)
+			start = 2*skipped
+			length = 2*(first.stop - first.start)
+			numpy.multiply(values[start:start+length],1/128.0,out=self.buffer[first].view(numpy.float32),casting="unsafe")
+			numpy.multiply(values[start+length:2*count],1/128.0,out=self.buffer[second].view(numpy.float32),casting="unsafe")
+
+	def read(self,count=None):
+		'''
+		This method reads some IQ samples from the buffer and moves the read cursor forward.
+
+		:param count: maximal number of samples to read (by default, every available samples are read)
+		:type count: int
+		:return: IQ samples (copy of the buffer's content)
+		:rtype: ``numpy.ndarray`` of ``numpy.complex64``
+		'''
+		with self.lock:
+			available = self.writeCursor - self.readCursor
+			count = available if count is None else min(count,available)
+			start = self.readCursor % self.size
+			first = min(count,self.size - start)
+			if first == count:
+				samples = self.buffer[start:start+count].copy()
+			else:
+				samples = numpy.concatenate((self.buffer[start:],self.buffer[:count - first]))
+			self.readCursor += count
+			self.reads += 1
+			return samples
+
 class SDRSource:
 	'''
 	This class defines a standard Software Defined Radio source.
@@ -22,6 +158,8 @@ class SDRSource:
 		  * ``isStreaming()`` : this method returns a boolean indicating if streaming is enabled
 		  * ``close()`` : this method closes the sink
 
+	The received IQ samples are stored in the ``iqStream`` attribute, a ring buffer (``IQRingBuffer``) read by the demodulator.
+
 	'''
 
 	def __init__(self,interface):
@@ -32,7 +170,7 @@ class SDRSource:
 		self.gain = None
 		self.blockLength = None
 		self.sampleRate = None
-		self.iqStream = []
+		self.iqStream = IQRingBuffer()
 
 	def setBandwidth(self,bandwidth):
 		self.bandwidth = bandwidth
@@ -61,6 +199,9 @@ class SDRSource:
 
 	def __rshift__(self, demodulator):
 		demodulator.setSource(self)
+		if hasattr(demodulator,"addChannel"):
+			# the source is connected to a channelizer
+			return SDRChannelizedPipeline(source=self,channelizer=demodulator)
 		return SDRPipeline(source=self,demodulator=demodulator)
 
 class HackRFSource(HackRFSDR,SDRSource):
@@ -97,8 +238,7 @@ class HackRFSource(HackRFSDR,SDRSource):
 		self.blockLength = length // 2
 		arrayType = (c_byte*length)
 		values = cast(hackrf_transfer.contents.buffer, POINTER(arrayType)).contents
-		#if len(self.iqStream) < 10*length:
-		self.iqStream+=[(values[i]/128.0+1j*values[i+1]/128.0) for i in range(0,len(values)-1,2)]
+		self.iqStream.writeInterleaved(numpy.frombuffer(values,dtype=numpy.int8))
 		return 0
 
 
@@ -116,7 +256,7 @@ class HackRFSource(HackRFSDR,SDRSource):
 
 		'''
 		if self.checkParameters() and not self.running:
-			self.iqStream = []
+			self.iqStream.reset()
 			if self.alreadyStarted:
 				self.restart()
 			self.lock.acquire()
@@ -224,3 +364,195 @@ class HackRFSource(HackRFSDR,SDRSource):
 			io.fail("You have to provide a sample rate !")
 			valid = False
 		return valid
+
+class FileSource(SDRSource):
+	'''
+	This class defines a Source reading the IQ samples from a raw IQ file, allowing to use a Software Defined Radio pipeline offline (e.g. to demodulate a recording or to benchmark a demodulator). It inherits from ``SDRSource``.
+
+	The following formats are supported :
+
+		* ``cs8`` : interleaved I and Q signed 8 bits values (HackRF native format, e.g. generated by ``hackrf_transfer -r``), used for the ".iq" and ".cs8" extensions
+		* ``cf32`` : interleaved I and Q 32 bits floats (e.g. generated by GNU Radio), used for the ".cf32", ".fc32" and ".cfile" extensions
+
+	The file is mapped in memory and provided to the demodulator by blocks of *blockLength* samples, either as fast as possible ("max" rate, by default : the source then waits for the demodulator before providing the next block, no sample is lost) or in real time ("realtime" rate, according to the sample rate : the samples are lost if the demodulator is too slow).
+
+	:Example:
+
+		>>> source = FileSource("capture.iq")
+		>>> demodulator = FSK2Demodulator(preamble="01101011011111011001000101110001", size=8*40, samplesPerSymbol=2)
+		>>> pipeline = source >> demodulator
+		>>> pipeline.start()
+		>>> while not source.isFinished():
+		...     utils.wait(seconds=0.1)
+		>>> source.getStatistics()
+		{'samples': 40000000, 'duration': 4.13, 'samplesPerSecond': 9685230.02, 'overflows': 0}
+
+	'''
+	FORMATS = {".iq":"cs8",".cs8":"cs8",".cf32":"cf32",".fc32":"cf32",".cfile":"cf32"}
+
+	@classmethod
+	def isIQFile(cls,interface):
+		'''
+		This class method indicates if the provided interface is the name of a supported IQ file.
+
+		:param interface: interface
+		:type interface: str
+		:return: boolean indicating if the interface is an IQ file
+		:rtype: bool
+		'''
+		return os.path.splitext(interface)[1] in cls.FORMATS
+
+	RATES = ("realtime","max")
+
+	def __init__(self,interface,fileFormat=None,rate="max",blockLength=131072):
+		SDRSource.__init__(self,interface=interface)
+		self.filename = interface
+		self.fileFormat = fileFormat if fileFormat is not None else FileSource.FORMATS.get(os.path.splitext(interface)[1],"cs8")
+		self.rate = rate
+		self.blockLength = blockLength
+		self.lnaGain = None
+		self.thread = None
+		self.position = 0
+		self.startTime = None
+		self.endTime = None
+		self.samples = None
+		try:
+			if os.path.getsize(self.filename) > 0:
+				self.samples = numpy.memmap(self.filename,dtype=numpy.int8 if self.fileFormat == "cs8" else numpy.complex64,mode="r")
+			else:
+				self.samples = numpy.zeros(0,dtype=numpy.int8)
+		except (IOError,OSError,ValueError):
+			io.fail("IQ file "+str(self.filename)+" can't be opened !")
+
+	def isReady(self):
+		'''
+		This method indicates if the IQ file has been successfully opened.
+
+		:return: boolean indicating if the source is ready
+		:rtype: bool
+		'''
+		return self.samples is not None
+
+	def setLNAGain(self,lnaGain):
+		self.lnaGain = lnaGain
+
+	def enableAntenna(self):
+		pass
+
+	def setRate(self,rate):
+		'''
+		This method sets the rate used to provide the samples : "realtime" (according to the sample rate) or "max" (as fast as possible).
+
+		:param rate: rate ("realtime" or "max")
+		:type rate: str
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+		'''
+		if rate not in FileSource.RATES:
+			io.fail("Unknown rate : "+str(rate)+" (supported rates : "+", ".join(FileSource.RATES)+")")
+			return False
+		self.rate = rate
+		return True
+
+	def getRate(self):
+		'''
+		This method returns the rate used to provide the samples.
+
+		:return: rate ("realtime" or "max")
+		:rtype: str
+		'''
+		return self.rate
+
+	def getLength(self):
+		'''
+		This method returns the number of samples stored in the file.
+
+		:return: number of samples
+		:rtype: int
+		'''
+		if self.samples is None:
+			return 0
+		return len(self.samples) // 2 if self.fileFormat == "cs8" else len(self.samples)
+
+	def _stream(self):
+		length = self.getLength()
+		deadline = time.time()
+		while self.running and self.position < length:
+			count = min(self.blockLength,length - self.position)
+			if self.rate == "max":
+				while self.running and len(self.iqStream) + count > self.iqStream.size:
+					utils.wait(seconds=0.0001)
+			if self.fileFormat == "cs8":
+				self.iqStream.writeInterleaved(self.samples[2*self.position:2*(self.position+count)])
+			else:
+				self.iqStream.write(self.samples[self.position:self.position+count])
+			self.position += count
+			if self.rate != "max" and self.sampleRate is not None:
+				deadline += count / self.sampleRate
+				utils.wait(seconds=max(0,deadline - time.time()))
+		# the streaming is finished when the demodulator has processed every samples, i.e. when it tries to read new samples from an empty buffer
+		while self.running and len(self.iqStream) > 0:
+			utils.wait(seconds=0.0001)
+		reads = self.iqStream.getReadsCount()
+		while self.running and self.iqStream.getReadsCount() == reads:
+			utils.wait(seconds=0.0001)
+		if self.running:
+			self.endTime = time.time()
+
+	def startStreaming(self):
+		'''
+		This method starts the streaming process, from the beginning of the file.
+
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+		'''
+		if self.isReady() and not self.running:
+			self.iqStream.reset()
+			self.position = 0
+			self.startTime = time.time()
+			self.endTime = None
+			self.running = True
+			self.thread = threading.Thread(target=self._stream,daemon=True)
+			self.thread.start()
+			return True
+		return False
+
+	def stopStreaming(self):
+		'''
+		This method stops the streaming process.
+
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+		'''
+		if self.running:
+			self.running = False
+			if self.thread is not None and self.thread is not threading.current_thread():
+				self.thread.join()
+			return True
+		return False
+
+	def isFinished(self):
+		'''
+		This method indicates if every samples of the file have been processed by the demodulator.
+
+		:return: boolean indicating if the streaming is finished
+		:rtype: bool
+		'''
+		return self.endTime is not None
+
+	def getStatistics(self):
+		'''
+		This method returns some statistics about the streaming process : number of samples read by the demodulator, duration (in seconds), throughput (in samples per second) and number of samples lost because the demodulator was too slow.
+
+		:return: dictionary of statistics
+		:rtype: dict
+		'''
+		end = self.endTime if self.endTime is not None else time.time()
+		duration = end - self.startTime if self.startTime is not None else 0.0
+		samples = self.iqStream.getReadCursor() - self.iqStream.getOverflows()
+		return {
+			"samples":samples,
+			"duration":duration,
+			"samplesPerSecond":samples / duration if duration > 0 else 0.0,
+			"overflows":self.iqStream.getOverflows()
+		}
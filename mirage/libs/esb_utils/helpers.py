@@ -1,6 +1,8 @@
 '''
 This module provides some helpers in order to manipulate Enhanced ShockBurst packets.
 '''
+import numpy as np
+
 def frequencyToChannel(frequency):
 	'''
 	This function converts a frequency to the corresponding Enhanced ShockBurst channel.
@@ -58,7 +60,8 @@ def bytes2bits(data):
 		'010000010100001001000011'
 
 	'''
-	return "".join(["{:08b}".format(i) for i in bytes(data)])
+	data = bytes(data)
+	return "{:0{}b}".format(int.from_bytes(data,"big"),8*len(data)) if len(data) > 0 else ""
 
 def bits2bytes(bits):
 	'''
@@ -77,7 +80,8 @@ def bits2bytes(bits):
 		b'ABC'
 		
 	'''
-	return bytes([int(j+((8-len(j))*"0"),2) for j in [bits[i:i + 8] for i in range(0, len(bits), 8)]])
+	length = (len(bits) + 7) // 8
+	return int(bits.ljust(8*length,"0"),2).to_bytes(length,"big") if length > 0 else b""
 
 def bitwiseXor(a,b):
 	'''
@@ -102,13 +106,28 @@ def bitwiseXor(a,b):
 	'''
 	if len(a) != len(b):
 		return None
-	result = ""
-	for i in range(len(a)):
-		valA = a[i] == "1"
-		valB = b[i] == "1"
-		result += "1" if valA ^ valB else "0"
-	return result
+	return "{:0{}b}".format(int(a,2) ^ int(b,2),len(a)) if len(a) > 0 else ""
+
+
+def _generateCrcTable():
+	table = []
+	for byte in range(256):
+		crc = byte << 8
+		for _ in range(8):
+			crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+		table.append(crc)
+	return table
+
+CRC_TABLE = _generateCrcTable()
+'''
+This table contains the CRC-CCITT (polynome 0x1021) of every byte, allowing to process a byte per iteration.
+'''
 
+def _calcCrcBits(crc,byte,bits):
+	crc ^= byte << 8
+	for _ in range(bits):
+		crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+	return crc
 
 def calcCrcByte(crc,byte,bits):
 	'''
@@ -122,22 +141,17 @@ def calcCrcByte(crc,byte,bits):
 	:type bits: int
 	
 	'''
-	polynome = bytes2bits(b'\x10\x21')
-	crc_ba = bytes2bits(crc)
-	byte_ba = bytes2bits(bytes([byte]))
-	crc_ba = bitwiseXor(crc_ba,byte_ba + "00000000")
-	while bits>0:
-		bits-=1
-		if crc_ba[0:1] == '1':
-			crc_ba = crc_ba[1:]+'0'				
-			crc_ba = bitwiseXor(crc_ba,polynome)
-		else:
-			crc_ba = crc_ba[1:]+'0'
-	return bits2bytes(crc_ba)
+	crc = int.from_bytes(crc,"big")
+	if bits == 8:
+		crc = ((crc << 8) & 0xFFFF) ^ CRC_TABLE[(crc >> 8) ^ byte]
+	else:
+		crc = _calcCrcBits(crc,byte,bits)
+	return crc.to_bytes(2,"big")
 
 def calcCrc(packet):
 	'''
 	This function calculates the CRC of an Enhanced Shockburst packet.
+	The packet contains 8*n+1 bits (because of the 9 bits Packet Control Field) : only the most significant bit of the last byte is used.
 
 	:param packet: raw bytes of packet (without CRC and preamble)
 	:type packet: bytes
@@ -150,8 +164,44 @@ def calcCrc(packet):
 		'9ed4'
 
 	'''
-	crc = b"\xFF\xFF"
+	crc = 0xFFFF
+	table = CRC_TABLE
 	for x in packet[:-1]:
-		crc = calcCrcByte(crc,x,8)
-	crc = calcCrcByte(crc, packet[-1],1)
-	return crc
+		crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ x]
+	return _calcCrcBits(crc,packet[-1],1).to_bytes(2,"big")
+
+def findValidCrcs(bits,start=0):
+	'''
+	This function checks every possible packet alignment of a sequence of bits (e.g. a promiscuous capture) at once.
+	For every end position, the CRC of the bits located between *start* and this position is calculated incrementally, and compared to the following 16 bits.
+
+	:param bits: sequence of bits (string, e.g. "10110011", or raw bytes)
+	:type bits: str or bytes
+	:param start: position of the first bit of the packet (after the preamble)
+	:type start: int
+	:return: end positions (in bits) followed by a valid CRC
+	:rtype: numpy array of int
+
+	:Example:
+
+		>>> packet = bytes.fromhex('e846f92fa429006100007f57ff80004900')
+		>>> bits = "10101010" + bytes2bits(packet)[:-7] + bytes2bits(calcCrc(packet))
+		>>> findValidCrcs(bits,start=8)
+		array([137])
+
+	'''
+	if isinstance(bits,str):
+		bits = np.frombuffer(bits.encode(),dtype=np.uint8) - ord("0")
+	else:
+		bits = np.unpackbits(np.frombuffer(bytes(bits),dtype=np.uint8))
+	if len(bits) < start + 17:
+		return np.array([],dtype=np.int64)
+	# CRC of the bits located between start and every end position
+	crcs = np.empty(len(bits) - 16 - start,dtype=np.int64)
+	crc = 0xFFFF
+	for index,bit in enumerate(bits[start:len(bits)-16].tolist()):
+		crc = ((crc << 1) ^ 0x1021 if (crc >> 15) ^ bit else crc << 1) & 0xFFFF
+		crcs[index] = crc
+	# 16 bits following every end position
+	following = np.lib.stride_tricks.sliding_window_view(bits[start+1:],16).astype(np.int64) @ (1 << np.arange(15,-1,-1))
+	return np.flatnonzero(crcs == following[:len(crcs)]) + start + 1
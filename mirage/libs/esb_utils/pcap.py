@@ -34,7 +34,7 @@ class ESBPCAPDevice(wireless.PCAPDevice):
 	DLT = 148
 	SCAPY_LAYER = ESB_Hdr
 
-	sharedMethods = ["enterSnifferMode","enterPromiscuousMode","scan","getChannel","setChannel","getMode","generateStream"]
+	sharedMethods = ["enterSnifferMode","enterPromiscuousMode","scan","getChannel","setChannel","getMode","setReplaySpeed","getReplaySpeed","seekPacket","seekTimestamp","getPacketsCount","setIndexStorage","setWriterOptions","generateStream"]
 
 	def init(self):
 		super().init()
@@ -168,7 +168,7 @@ class ESBPCAPDevice(wireless.PCAPDevice):
 		
 		stream = []
 		currentTimestamp = None
-		for timestamp,packet in self.getAllPackets():
+		for timestamp,packet in self.iterPackets():
 			if currentTimestamp is None:
 				currentTimestamp = timestamp
 			else:
@@ -421,15 +421,41 @@ class ESBRFStormDevice(wireless.Device):
 			return "SNIFFER"
 
 
+	def _sendPromiscuous(self,pkts):
+		# the device is switched to sniffer mode only when the address changes, then restored once in promiscuous mode
+		currentAddress = None
+		for pkt in pkts:
+			address = bytes.fromhex(pkt.address.replace(":",""))[::-1][:5]
+			if address != currentAddress:
+				self._enterSnifferMode(address)
+				currentAddress = address
+			self._transmitPayload(raw(pkt[ESB_Payload_Hdr:]))
+		if currentAddress is not None:
+			self._enterPromiscuousMode()
+
+	def sendMany(self,pkts):
+		'''
+		This method sends multiple packets while holding the device lock.
+		In promiscuous mode, the consecutive packets transmitted to the same address share a single switch to sniffer mode.
+
+		:param pkts: packets to send
+		:type pkts: list of scapy frames
+		'''
+		if self.mode == ESBOperationMode.PROMISCUOUS:
+			self.lock.acquire()
+			self._sendPromiscuous(pkts)
+			self.lock.release()
+		else:
+			for pkt in pkts:
+				self.send(pkt)
+
 	def send(self,pkt):
 		self.lock.acquire()
 		if self.mode == ESBOperationMode.GENERIC_PROMISCUOUS:
 			self._transmitPayloadGeneric(raw(pkt), address=bytes.fromhex(pkt.address.replace(":","")) if hasattr(pkt,"address") else b"\x33\x33\x33\x33\x33")
 
 		elif self.mode == ESBOperationMode.PROMISCUOUS:
-			self._enterSnifferMode(bytes.fromhex(pkt.address.replace(":",""))[::-1][:5])
-			self._transmitPayload(raw(pkt[ESB_Payload_Hdr:]))
-			self._enterPromiscuousMode()
+			self._sendPromiscuous([pkt])
 
 		else:
 			if pkt.no_ack == 1:
@@ -41,23 +41,21 @@ class ESB_Hdr(Packet):
 	def pre_dissect(self,s):		
 		bitstring = bytes2bits(s)
 		crc = None
-		crcFound = False
-		i = ESB_Hdr.ESB_PREAMBLE_SIZE+1
-		# We try to guess the packet size by looking for a valid CRC
-		while i < len(bitstring) - 16:
-			if bytes2bits(calcCrc(bits2bytes(bitstring[ESB_Hdr.ESB_PREAMBLE_SIZE:i]))) == bitstring[i:i+ESB_Hdr.ESB_CRC_SIZE]:
-				crcFound = True
-				break
-			i += 1
+		# We try to guess the packet size by looking for a valid CRC (every possible size is checked at once)
+		validSizes = findValidCrcs(bitstring,start=ESB_Hdr.ESB_PREAMBLE_SIZE)
+		crcFound = len(validSizes) > 0
 
 		# We try to guess the address size by checking if :
 		# ESB_PREAMBLE_SIZE + 8*addr_size + ESB_PCF_SIZE + payload_size = 8*packet_size - ESB_CRC_SIZE
 		
 		addrLenFound = False
-		for addrLen in range(3,6):
-			payLen = bits2bytes("00"+bitstring[ESB_Hdr.ESB_PREAMBLE_SIZE+addrLen*8:ESB_Hdr.ESB_PREAMBLE_SIZE+addrLen*8+ESB_Hdr.ESB_PAYLEN_SIZE])[0]
-			if ESB_Hdr.ESB_PREAMBLE_SIZE+addrLen*8+ESB_Hdr.ESB_PCF_SIZE+payLen*8 == i:
-				addrLenFound = True
+		for i in validSizes:
+			for addrLen in range(3,6):
+				payLen = bits2bytes("00"+bitstring[ESB_Hdr.ESB_PREAMBLE_SIZE+addrLen*8:ESB_Hdr.ESB_PREAMBLE_SIZE+addrLen*8+ESB_Hdr.ESB_PAYLEN_SIZE])[0]
+				if ESB_Hdr.ESB_PREAMBLE_SIZE+addrLen*8+ESB_Hdr.ESB_PCF_SIZE+payLen*8 == i:
+					addrLenFound = True
+					break
+			if addrLenFound:
 				break
 
 
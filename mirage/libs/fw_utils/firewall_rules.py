@@ -2,6 +2,9 @@
 
 from mirage.libs.ble_utils import packets
 from mirage.libs import utils
+from bisect import bisect_right
+import random
+import time
 
 class IncompatibleAttributeException(Exception):
     pass
@@ -58,53 +61,293 @@ class BLETablesRule:
         elif action == "deny":
             self.action=False
         else:
-            raise InvalidAttibuteException(action)
+            raise InvalidAttributeException(action)
 
         self.type=getattr(packets,type) # may raise AttributeError, catched above
         for key in kwargs:
-            if BLETablesRule.valid_keys[key](kwargs): # may raise KeyError, catched above
-                setattr(self, key, kwargs[key])
-            else:
+            if not BLETablesRule.valid_keys[key](kwargs): # may raise KeyError, catched above
                 raise IncompatibleAttributeException(key)
 
+        # the fields are parsed once, the matching only compares integers and strings
+        self.handle=utils.integerArg(kwargs["handle"]) if "handle" in kwargs else None
+        self.value=utils.integerArg(kwargs["value"]) if "value" in kwargs else None
+        self.src=kwargs["src"].upper() if "src" in kwargs else None
+        self.dst=kwargs["dst"].upper() if "dst" in kwargs else None
+        if "direction" in kwargs and kwargs["direction"] not in ("master","slave"):
+            raise InvalidAttributeException(kwargs["direction"])
+        # a packet goes to the slave if it comes from the master
+        self.fromMaster=(kwargs["direction"]=="slave") if "direction" in kwargs else None
+
+    def matchAddresses(self, srcAddr, dstAddr=None):
+        # returns True if the addresses match, False otherwise
+        return (self.src is None or srcAddr == self.src) and (self.dst is None or (dstAddr is not None and dstAddr == self.dst))
+
     def match(self, packet, fromMaster, srcAddr, dstAddr=None):
         # returns True if packet matches, False otherwise
-        
+
         if not isinstance(packet, self.type):
             return False
 
-        if hasattr(self, "handle"):
-
-            if not hasattr(self, "handle"):
+        if self.handle is not None:
+            if getattr(packet, "handle", None) != self.handle:
                 return False
 
-            if not packet.handle == utils.integerArg(self.handle):
-                return False
+            if self.value is not None:
+                if not hasattr(packet, "value") or int.from_bytes(packet.value, "little") != self.value:
+                    return False
 
-            if hasattr(self, "value"):
+        if self.fromMaster is not None and fromMaster != self.fromMaster:
+            return False
 
-                if not hasattr(packet, "value"):
-                    return False
+        return self.matchAddresses(srcAddr, dstAddr)
 
-                
-                try:
-                    if not packet.value == utils.integerArg(self.value).to_bytes(len(packet.value),"little"):
-                        return False
-                except OverflowError:
-                    return False
 
-        if hasattr(self,"src"):
-            if srcAddr != self.src.upper():
-                return False
+class BLETablesRuleSet:
+    '''
+    This class describes the set of firewall rules of a BLE_TABLES context, compiled into a decision structure.
 
-        if hasattr(self,"dst"):
-            if (dstAddr==None) or (dstAddr != self.dst.upper()):
-                return False
+    The rules are added in order (``addRule``), then compiled once (``compile``) : for every packet type and direction, the rules are indexed by handle (and by value, if some rules of a given handle provide one).
+    Every bucket only contains the rules that may match the corresponding packets, in their original order, and stops after the first rule which always matches. The first matching rule of the bucket gives the verdict, the default rule is used if no rule matches.
 
-        if hasattr(self,"direction"):
-            if fromMaster != (self.direction=="slave"):
-                return False
+    As a consequence, the cost of a verdict doesn't depend on the number of rules (except for rules filtering on addresses, which are evaluated sequentially in their bucket).
+
+    :Example:
+
+        >>> ruleSet = BLETablesRuleSet()
+        >>> ruleSet.addRule(BLETablesRule("deny", "BLEWriteRequest", handle="0x3b", value="0x0"))
+        >>> ruleSet.setDefault(True)
+        >>> ruleSet.compile()
+        >>> ruleSet.verdict(packets.BLEWriteRequest(handle=0x3b, value=b"\x00"), True, "11:22:33:44:55:66")
+        False
+
+    '''
+    def __init__(self, default=True):
+        self.rules=[]
+        self.default=default
+        self.table={}
+
+    def addRule(self, rule):
+        '''
+        This method appends a rule to the set. The set must be compiled again to take it into account.
+
+        :param rule: rule to append
+        :type rule: BLETablesRule
+        '''
+        self.rules.append(rule)
+
+    def setDefault(self, default):
+        '''
+        This method sets the verdict used if no rule matches.
+
+        :param default: default verdict (True to allow)
+        :type default: bool
+        '''
+        self.default=default
+
+    def _bucket(self, rules):
+        # keeps the rules until the first rule always matching in the bucket
+        bucket=[]
+        for rule in rules:
+            bucket.append(rule)
+            if rule.src is None and rule.dst is None:
+                break
+        return bucket
+
+    def compile(self):
+        '''
+        This method compiles the rules into the decision structure used by ``verdict``.
+        The decision structure is a dictionary indexed by (packet type, direction), providing a tuple composed of a dictionary indexed by handle and of the bucket used for the other handles.
+        A handle is linked to a bucket, or to a tuple composed of a dictionary indexed by value and of the bucket used for the other values.
+        '''
+        self.table={}
+        for packetType in set(rule.type for rule in self.rules):
+            for fromMaster in (True,False):
+                rules=[rule for rule in self.rules if issubclass(packetType, rule.type) and rule.fromMaster in (None,fromMaster)]
+                if rules == []:
+                    continue
+                handles={}
+                for handle in set(rule.handle for rule in rules if rule.handle is not None):
+                    handleRules=[rule for rule in rules if rule.handle in (None,handle)]
+                    values=set(rule.value for rule in handleRules if rule.value is not None)
+                    otherValues=self._bucket([rule for rule in handleRules if rule.value is None])
+                    if values:
+                        handles[handle]=({value:self._bucket([rule for rule in handleRules if rule.value in (None,value)]) for value in values},otherValues)
+                    else:
+                        handles[handle]=otherValues
+                self.table[(packetType,fromMaster)]=(handles,self._bucket([rule for rule in rules if rule.handle is None]))
+
+    def verdict(self, packet, fromMaster, srcAddr, dstAddr=None):
+        '''
+        This method returns the verdict of the firewall for the provided packet.
+
+        :param packet: packet to check
+        :type packet: ``mirage.libs.ble_utils.packets.BLEPacket``
+        :param fromMaster: boolean indicating if the packet comes from the master
+        :type fromMaster: bool
+        :param srcAddr: address of the sender
+        :type srcAddr: str
+        :param dstAddr: address of the receiver
+        :type dstAddr: str
+        :return: boolean indicating if the packet is allowed
+        :rtype: bool
+        '''
+        entry=self.table.get((type(packet),fromMaster))
+        if entry is None:
+            return self.default
+        handles,bucket=entry
+        if handles:
+            bucket=handles.get(getattr(packet, "handle", None), bucket)
+            if isinstance(bucket, tuple):
+                values,bucket=bucket
+                if hasattr(packet, "value"):
+                    bucket=values.get(int.from_bytes(packet.value, "little"), bucket)
+        for rule in bucket:
+            if rule.src is None and rule.dst is None or rule.matchAddresses(srcAddr, dstAddr):
+                return rule.action
+        return self.default
+
+    @classmethod
+    def benchmark(cls, counts=(10,100,1000), verdicts=100000):
+        '''
+        This class method measures the number of verdicts per second for rule sets of different sizes.
+        The rules and the packets are randomly generated (Write Requests and Read Requests, with some handles, values and addresses).
+
+        :param counts: sizes of the rule sets to test
+        :type counts: tuple of int
+        :param verdicts: number of verdicts computed for every rule set
+        :type verdicts: int
+        :return: dictionary linking every size to the number of verdicts per second
+        :rtype: dict
+
+        :Example:
+
+            >>> BLETablesRuleSet.benchmark()
+            {10: 1234567.8, 100: 1198765.4, 1000: 1187654.3}
+
+        '''
+        generator=random.Random(0)
+        addresses=["11:22:33:44:55:66","AA:BB:CC:DD:EE:FF"]
+        requests=[packets.BLEWriteRequest(handle=handle,value=bytes([value])) for handle in range(1,0x100) for value in range(4)]
+        requests+=[packets.BLEReadRequest(handle=handle) for handle in range(1,0x100)]
+        results={}
+        for count in counts:
+            ruleSet=cls(default=True)
+            for _ in range(count):
+                fields={"handle":hex(generator.randrange(1,0x100))}
+                if generator.random() < 0.5:
+                    fields["value"]=hex(generator.randrange(4))
+                if generator.random() < 0.3:
+                    fields["direction"]=generator.choice(["master","slave"])
+                if generator.random() < 0.1:
+                    fields["dst"]=generator.choice(addresses)
+                ruleSet.addRule(BLETablesRule(generator.choice(["allow","deny"]),generator.choice(["BLEWriteRequest","BLEReadRequest"]),**fields))
+            ruleSet.compile()
+            samples=[(generator.choice(requests),generator.random() < 0.5) for _ in range(1024)]
+            start=time.perf_counter()
+            for i in range(verdicts):
+                packet,fromMaster=samples[i & 1023]
+                ruleSet.verdict(packet, fromMaster, addresses[0], addresses[1])
+            results[count]=verdicts/(time.perf_counter()-start)
+        return results
+
+
+class HandleTranslator:
+    '''
+    This class translates the handles of the Slave's GATT server when some attributes are hidden from the Master (GATT_FILTER context).
+
+    The removed intervals of handles are sorted, and the number of handles removed before every interval is stored (prefix sums) : a translation in both directions is a binary search.
+    The handles fields of every packet type are listed once, in order to avoid inspecting every packet.
+
+    :Example:
+
+        >>> translator = HandleTranslator([(0x10,0x12),(0x20,0x20)])
+        >>> translator.fromSlave(0x21)
+        29
+        >>> translator.fromMaster(29)
+        33
+
+    '''
+    HANDLE_FIELDS = ("endHandle","handle","startHandle","valueHandle")
+    handleFields = {}
+
+    def __init__(self, removedHandles=[]):
+        self.setRemovedHandles(removedHandles)
+
+    def setRemovedHandles(self, removedHandles):
+        '''
+        This method sets the removed intervals of handles.
+
+        :param removedHandles: list of removed intervals (start and end handles, both included)
+        :type removedHandles: list of tuple of (int,int)
+        '''
+        intervals=sorted(removedHandles)
+        self.starts=[start for start,_ in intervals]
+        self.ends=[end for _,end in intervals]
+        # number of handles removed before every interval
+        self.removedBefore=[0]
+        for start,end in intervals:
+            self.removedBefore.append(self.removedBefore[-1]+end-start+1)
+        # position of every interval in the Master's view of the handles
+        self.translatedStarts=[start-removed for start,removed in zip(self.starts,self.removedBefore)]
+        self.removed=set(self.starts)
+
+    def isRemoved(self, handle):
+        '''
+        This method indicates if a handle starts a removed interval.
+
+        :param handle: Slave's handle
+        :type handle: int
+        :return: boolean indicating if the handle is removed
+        :rtype: bool
+        '''
+        return handle in self.removed
+
+    def isAllowed(self, handle):
+        '''
+        This method indicates if a handle is outside of every removed interval.
+
+        :param handle: Slave's handle
+        :type handle: int
+        :return: boolean indicating if the handle is allowed
+        :rtype: bool
+        '''
+        index=bisect_right(self.starts, handle)-1
+        return index < 0 or self.ends[index] < handle
+
+    def fromSlave(self, handle):
+        '''
+        This method translates a Slave's handle into the corresponding Master's handle.
+
+        :param handle: Slave's handle
+        :type handle: int
+        :return: Master's handle
+        :rtype: int
+        '''
+        return handle-self.removedBefore[bisect_right(self.starts, handle)]
+
+    def fromMaster(self, handle):
+        '''
+        This method translates a Master's handle into the corresponding Slave's handle.
 
-        return True
+        :param handle: Master's handle
+        :type handle: int
+        :return: Slave's handle
+        :rtype: int
+        '''
+        return handle+self.removedBefore[bisect_right(self.translatedStarts, handle)]
 
+    @classmethod
+    def getHandleFields(cls, packet):
+        '''
+        This class method returns the names of the fields containing a handle in the provided packet, according to its type.
 
+        :param packet: packet
+        :type packet: ``mirage.libs.ble_utils.packets.BLEPacket``
+        :return: names of the handle fields
+        :rtype: tuple of str
+        '''
+        fields=cls.handleFields.get(type(packet))
+        if fields is None:
+            fields=tuple(field for field in cls.HANDLE_FIELDS if hasattr(packet, field))
+            cls.handleFields[type(packet)]=fields
+        return fields
@@ -50,7 +50,7 @@ def parse_ble_tables(lines):
             except ValueError:
                 raise IncorrectBLETableError('Invalid rule : missing "type"')
 
-            resulting_code+="\n\t\t\tself.rule_dictionnary[\"{}\"].append(firewall_rules.BLETablesRule({}))".format(rule_type[3:],fct_args)
+            resulting_code+="\n\t\t\tself.ruleSet.addRule(firewall_rules.BLETablesRule({}))".format(fct_args)
 
         i+=1
 
@@ -59,7 +59,8 @@ def parse_ble_tables(lines):
     if default==None:
         raise IncorrectBLETableError("No default rule in BLE_TABLES")
 
-    resulting_code+="\n\t\t\tself.default_rule = {}".format(default)
+    resulting_code+="\n\t\t\tself.ruleSet.setDefault({})".format(default)
+    resulting_code+="\n\t\t\tself.ruleSet.compile()"
 
     return lines[i+1:],resulting_code
 
@@ -107,25 +108,18 @@ def parse_rules(ble_tables_content):
         if line.strip()!="":
             lines.append(line.strip())
 
-    rules_dict=""
     code_callbacks=""
     
     for elt_name in dir(packets):
         elt=getattr(packets,elt_name)
         if type(elt)==type and issubclass(elt,packets.BLEPacket) and elt!=packets.BLEPacket and "connectionHandle" in elt.__init__.__code__.co_names:
-            rules_dict+="\n\t\tself.rule_dictionnary[\"{}\"]=[]".format(elt.__name__[3:])
-
             # -- code for packets from the Master --
             code_callbacks+="\n\tdef onMaster{}(self,packet):".format(elt.__name__[3:])
             code_callbacks+="\n\t\ttest=self.translateHandlesFromMaster(packet)"
             code_callbacks+="\n\t\tif not test:"
             code_callbacks+="\n\t\t\treturn False"
-            code_callbacks+="\n\t\tres=self.default_rule"
             code_callbacks+="\n\t\tsrcAddr,dstAddr=self.connection2addresses(packet, True)"
-            code_callbacks+="\n\t\tfor rule in self.rule_dictionnary[\"{}\"]:".format(elt.__name__[3:])
-            code_callbacks+="\n\t\t\tif rule.match(packet, True, srcAddr, dstAddr):"
-            code_callbacks+="\n\t\t\t\tres=rule.action"
-            code_callbacks+="\n\t\t\t\tbreak"
+            code_callbacks+="\n\t\tres=self.ruleSet.verdict(packet, True, srcAddr, dstAddr)"
             code_callbacks+="\n\t\tif not res:"
             code_callbacks+="\n\t\t\tio.info('Packet dropped by firewall : '+packet.__repr__())"
             code_callbacks+="\n\t\t\tself.errorResponse(packet)"
@@ -138,12 +132,8 @@ def parse_rules(ble_tables_content):
             code_callbacks+="\n\t\ttest=self.translateHandlesFromSlave(packet)"
             code_callbacks+="\n\t\tif not test:"
             code_callbacks+="\n\t\t\treturn False"
-            code_callbacks+="\n\t\tres=self.default_rule"
             code_callbacks+="\n\t\tsrcAddr,dstAddr=self.connection2addresses(packet, False)"
-            code_callbacks+="\n\t\tfor rule in self.rule_dictionnary[\"{}\"]:".format(elt.__name__[3:])
-            code_callbacks+="\n\t\t\tif rule.match(packet, False, srcAddr, dstAddr):"
-            code_callbacks+="\n\t\t\t\tres=rule.action"
-            code_callbacks+="\n\t\t\t\tbreak"
+            code_callbacks+="\n\t\tres=self.ruleSet.verdict(packet, False, srcAddr, dstAddr)"
             code_callbacks+="\n\t\tif not res:"
             code_callbacks+="\n\t\t\tio.info('Packet dropped by firewall : '+packet.__repr__())"
             code_callbacks+="\n\t\treturn res\n\n"
@@ -173,7 +163,7 @@ def parse_rules(ble_tables_content):
     code=""
     
     with open("mirage/libs/fw_utils/template_scenario.py") as f:
-        code=f.read().format(out_file_name, rules_dict, code_callbacks, code_ble_tables,code_gatt_filter)
+        code=f.read().format(out_file_name, code_callbacks, code_ble_tables,code_gatt_filter)
 
     with open(out_file_path,"w") as f:
         f.write(code)
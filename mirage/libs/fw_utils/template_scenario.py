@@ -10,15 +10,15 @@ import os
 class {0}(scenario.Scenario):
 	def __init__(self, *args, **kwargs):
 		scenario.Scenario.__init__(self,*args,**kwargs)
-		self.rule_dictionnary=dict()
+		self.ruleSet=firewall_rules.BLETablesRuleSet()
 		self.removedUUIDs=set()
 		self.removedHandles=[]
+		self.translator=firewall_rules.HandleTranslator()
 		self.maxHandle=None
 		self.mitmRunning=False
 		_,self.discovered=tempfile.mkstemp()
 		self.attributeHandles=set()
 		os.close(_)
-		{1}
 
 	def runDiscover(self):
 		newConnection=False
@@ -101,34 +101,21 @@ class {0}(scenario.Scenario):
 			for i,handle in enumerate(handles_list):
 				if handles[handle].intersection(self.removedUUIDs):
 					self.removedHandles.append((handle,handle))
+			self.removedHandles.sort()
+			self.translator.setRemovedHandles(self.removedHandles)
 			self.maxHandle=max(handles_list)
 		finally:
 			if os.path.isfile(self.discovered):
 				os.remove(self.discovered)
 
 	def checkSlaveHandle(self, handle):
-		for start,stop in self.removedHandles:
-			if handle>=start and handle<=stop:
-				return False
-		return True
+		return self.translator.isAllowed(handle)
 
 	def _translateSingleHandleSlave(self, handle):
-		toRemove = 0
-		for start,end in self.removedHandles:
-			if start<=handle:
-				toRemove+=end-start+1 # end is included
-			else:
-				break
-		return handle-toRemove
+		return self.translator.fromSlave(handle)
 
 	def _translateSingleHandleMaster(self, handle):
-		newHandle=handle
-		for start, end in self.removedHandles:
-			if start<=newHandle:
-				newHandle+=end-start+1 # end included
-			else:
-				break
-		return newHandle
+		return self.translator.fromMaster(handle)
 
 	def _checkMasterRequest(self, startHandle, endHandle):
 		# changes the startHandle if the request may answer only with forbidden handles
@@ -137,9 +124,8 @@ class {0}(scenario.Scenario):
 			handle+=1
 		if handle==endHandle:
 			return endHandle
-		removedSingleHandles=[h[0] for h in self.removedHandles]
-		if handle in removedSingleHandles:
-			while handle in removedSingleHandles or handle not in self.attributeHandles:
+		if self.translator.isRemoved(handle):
+			while self.translator.isRemoved(handle) or handle not in self.attributeHandles:
 				handle+=1
 			handle=min(handle, endHandle)
 			io.info("Correcting translation from "+hex(startHandle)+" to "+hex(handle)+" to avoid response with only forbidden handles")
@@ -152,7 +138,7 @@ class {0}(scenario.Scenario):
 		if type(packet)==ble.BLEReadByGroupTypeResponse:
 			new_attrs=[]
 			for attr in packet.attributes:
-				if int.from_bytes(attr["value"],"little") not in self.removedUUIDs and attr['attributeHandle'] not in [h[0] for h in self.removedHandles]:
+				if int.from_bytes(attr["value"],"little") not in self.removedUUIDs and not self.translator.isRemoved(attr['attributeHandle']):
 					new_attr=dict()
 					new_attr['attributeHandle']=self._translateSingleHandleSlave(attr['attributeHandle'])
 					new_attr['endGroupHandle']=self._translateSingleHandleSlave(attr['endGroupHandle']) if attr['endGroupHandle']!=0xFFFF else 0xFFFF
@@ -172,7 +158,7 @@ class {0}(scenario.Scenario):
 				uuid=int.from_bytes(attr['value'][3:], "little")
 				n_uuid=len(attr['value'][3:])
 				valueHandle=int.from_bytes(attr['value'][1:3], "little")
-				if uuid not in self.removedUUIDs and attr['attributeHandle'] not in [h[0] for h in self.removedHandles] and valueHandle not in [h[0] for h in self.removedHandles]:
+				if uuid not in self.removedUUIDs and not self.translator.isRemoved(attr['attributeHandle']) and not self.translator.isRemoved(valueHandle):
 					new_attr=dict()
 					new_attr['attributeHandle']=self._translateSingleHandleSlave(attr['attributeHandle'])
 					newValueHandle=self._translateSingleHandleSlave(valueHandle)
@@ -189,7 +175,7 @@ class {0}(scenario.Scenario):
 		elif type(packet)==ble.BLEFindInformationResponse:
 			new_attrs=[]
 			for attr in packet.attributes:
-				if attr['attributeHandle'] not in [h[0] for h in self.removedHandles]:
+				if not self.translator.isRemoved(attr['attributeHandle']):
 					new_attr=dict()
 					new_attr['attributeHandle']=self._translateSingleHandleSlave(attr['attributeHandle'])
 					new_attr['type']=attr['type']
@@ -203,8 +189,8 @@ class {0}(scenario.Scenario):
 				io.info(str(packet)+" dropped (handle removed)")
 				return False
 		else:
-			for attr in dir(packet):
-				if attr in ["handle","endHandle","startHandle","valueHandle"] and not (attr=="endHandle" and packet.endHandle==0xFFFF):
+			for attr in firewall_rules.HandleTranslator.getHandleFields(packet):
+				if not (attr=="endHandle" and packet.endHandle==0xFFFF):
 					handle=getattr(packet, attr)
 					newHandle=self._translateSingleHandleSlave(handle)
 					io.info(hex(handle)+" has been replaced by "+hex(newHandle))
@@ -214,8 +200,8 @@ class {0}(scenario.Scenario):
 
 	def translateHandlesFromMaster(self, packet):
 		io.info("Translating from Master : "+str(packet))
-		for attr in dir(packet):
-			if attr in ["handle","startHandle","endHandle","valueHandle"] and not (attr=="endHandle" and packet.endHandle==0xFFFF):
+		for attr in firewall_rules.HandleTranslator.getHandleFields(packet):
+			if not (attr=="endHandle" and packet.endHandle==0xFFFF):
 				handle = getattr(packet, attr)
 				newHandle = self._translateSingleHandleMaster(handle)
 				if attr=="startHandle" and packet.startHandle!=packet.endHandle:
@@ -255,18 +241,18 @@ class {0}(scenario.Scenario):
 
 
 	# packet handlers
-	{2}
+	{1}
 
 	def onStart(self):
 		# GATT_FILTER rules
-		{4}
+		{3}
 
 		self.runDiscover()
 		self.mitmRunning=True
 
 		# BLE_TABLES rules
 		try:
-			{3}
+			{2}
 		except AttributeError as e:
 			io.fail("Invalid packet type : "+e.args[0])
 			raise
@@ -33,7 +33,7 @@ class MosartPCAPDevice(wireless.PCAPDevice):
 	DLT = 149
 	SCAPY_LAYER = Mosart_Hdr
 
-	sharedMethods = ["enterSnifferMode","enterPromiscuousMode","disableDonglePackets","enableDonglePackets","getChannel","setChannel","getMode","generateStream"]
+	sharedMethods = ["enterSnifferMode","enterPromiscuousMode","disableDonglePackets","enableDonglePackets","getChannel","setChannel","getMode","setReplaySpeed","getReplaySpeed","seekPacket","seekTimestamp","getPacketsCount","setIndexStorage","setWriterOptions","generateStream"]
 
 	def init(self):
 		super().init()
@@ -173,7 +173,7 @@ class MosartPCAPDevice(wireless.PCAPDevice):
 		
 		stream = []
 		currentTimestamp = None
-		for timestamp,packet in self.getAllPackets():
+		for timestamp,packet in self.iterPackets():
 			if currentTimestamp is None:
 				currentTimestamp = timestamp
 			else:
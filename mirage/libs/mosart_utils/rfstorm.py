@@ -376,22 +376,38 @@ class MosartRFStormDevice(wireless.Device):
 		'''
 		self.syncMode = False
 
-	def send(self,pkt):
-		self.lock.acquire()
-
+	def _buildPayload(self,pkt):
 		if Mosart_Dongle_Sync_Packet not in pkt:
 			crcBytes = struct.pack('H',crc(raw(pkt)[6:]))
 		else:
 			crcBytes = b""
-		packet = bytes([i ^ 0x5A for i in (raw(pkt) + crcBytes + b"\xA5")])
+		return bytes([i ^ 0x5A for i in (raw(pkt) + crcBytes + b"\xA5")])
 
+	def _sendPayload(self,packet):
 		if self.syncMode:
 			pay = b"\xFF"
 			while b"\x4b\x78" not in pay:
 				pay = bytes(self._receivePayload())
 	
 		self._transmitPayloadGeneric(packet[2:],b"\xAA\xAA")
-		
+
+	def send(self,pkt):
+		packet = self._buildPayload(pkt)
+		self.lock.acquire()
+		self._sendPayload(packet)
+		self.lock.release()
+
+	def sendMany(self,pkts):
+		'''
+		This method sends multiple packets : the payloads are built before acquiring the device lock, which is held during the whole transmission.
+
+		:param pkts: packets to send
+		:type pkts: list of scapy frames
+		'''
+		packets = [self._buildPayload(pkt) for pkt in pkts]
+		self.lock.acquire()
+		for packet in packets:
+			self._sendPayload(packet)
 		self.lock.release()
 
 	def recv(self):
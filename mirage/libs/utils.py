@@ -357,6 +357,27 @@ def integerArg(arg):
 	else:
 		return None
 
+def floatArg(arg):
+	'''
+	This function converts the provided string into a float.
+	
+	:param arg: string to convert
+	:type arg: str
+	:return: corresponding float
+	:rtype: float
+
+	:Example:
+		>>> utils.floatArg("2.5")
+		2.5
+		>>> utils.floatArg("12")
+		12.0
+
+	'''
+	try:
+		return float(arg)
+	except ValueError:
+		return None
+
 def listArg(arg):
 	'''
 	This function converts the provided string into a list of strings (splitted by ",").
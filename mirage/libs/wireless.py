@@ -1,9 +1,9 @@
-from queue import Queue,Empty
-import time
+from queue import Queue,Empty,Full
+import time,selectors,threading
 import mirage.libs.io as io
 from mirage.libs.wireless_utils.packets import *
-from mirage.libs.wireless_utils.packetQueue import PacketQueue,StoppableThread
-from mirage.libs.wireless_utils.callbacks import Callback
+from mirage.libs.wireless_utils.packetQueue import PacketQueue,StoppableThread,QueueOverflowPolicy
+from mirage.libs.wireless_utils.callbacks import Callback,CallbackExecutor
 from mirage.libs.wireless_utils.device import Device,SDRDevice
 from mirage.libs.wireless_utils.pcapDevice import PCAPDevice
 from mirage.libs.wireless_utils.butterfly import ButterflyDevice
@@ -21,7 +21,7 @@ class Emitter(PacketQueue):
 	  * `packetType` : indicating the child class of Packet for the technology implemented by the Emitter
 	  * `deviceType` : indicating the child class of Device to instanciate
 
-	A `_task` method is implemented by default. It gets a Mirage Packet from the queue, calls the convert method on it and calls the send method of a Device on the result. If you want to customize this behaviour, you can overload this method.
+	A `_task` method is implemented by default. It waits for a Mirage Packet to be put in the queue, calls the convert method on it and calls the send method of a Device on the result (or the sendMany method if a batch of packets has been provided using ``sendBatch``). If you want to customize this behaviour, you can overload this method.
 
 	'''
 	def __init__(self,interface,packetType=Packet, deviceType=Device):
@@ -83,20 +83,43 @@ class Emitter(PacketQueue):
 		'''
 		return self.convert(data)
 
-	def _task(self):
-		if not self.isEmpty():
-			self.transmitting = True
-			packet = self.queue.get()
+	def _sendBatch(self,packets):
+		batch = []
+		for packet in packets:
 			if isinstance(packet,WaitPacket):
-				data = bytes("WAIT:"+str(packet.time),"ascii")
+				if len(batch) > 0:
+					self.device.sendMany(batch)
+					batch = []
+				time.sleep(packet.time)
 			else:
 				data = self.convert(packet)
+				if data is not None:
+					batch.append(data)
+		if len(batch) > 0:
+			self.device.sendMany(batch)
 
-			if data is not None:
-				self._send(data)
-			self.transmitting = not self.isEmpty()
+	def _task(self):
+		try:
+			packet = self.queue.get(timeout=self.BLOCKING_TIMEOUT)
+		except Empty:
+			return
+		self.transmitting = True
+		if isinstance(packet,tuple):
+			packets,done = packet
+			try:
+				self._sendBatch(packets)
+			finally:
+				self.transmitting = not self.isEmpty()
+				done.set()
+			return
+		if isinstance(packet,WaitPacket):
+			data = bytes("WAIT:"+str(packet.time),"ascii")
 		else:
-			time.sleep(0.005)
+			data = self.convert(packet)
+
+		if data is not None:
+			self._send(data)
+		self.transmitting = not self.isEmpty()
 
 
 	def send(self,*packets):
@@ -115,6 +138,31 @@ class Emitter(PacketQueue):
 		for packet in packets:
 			self.queue.put(packet)
 
+	def sendBatch(self,packets):
+		'''
+		This method allows to send a list of Mirage Packets as a single batch.
+		The packets are converted together, and the consecutive raw packets (i.e. not separated by a ``WaitPacket``) are transmitted using a single call to the ``sendMany`` method of the Device.
+		If the Device is able to transmit multiple packets at once (e.g. a single USB, serial or file write), it avoids the per-packet overhead of the ``send`` method.
+		The returned event is set once the whole batch has been transmitted, allowing to wait for the end of the transmission.
+
+		:param packets: packets to send
+		:type packets: list of mirage.libs.wireless_utils.packets.Packet
+		:return: event set when the batch has been transmitted
+		:rtype: threading.Event
+
+		:Example:
+
+			>>> done = emitter.sendBatch([packet1, packet2, packet3])
+			>>> done.wait()
+
+		'''
+		done = threading.Event()
+		if len(packets) > 0:
+			self.queue.put((list(packets),done))
+		else:
+			done.set()
+		return done
+
 	def sendp(self,*packets):
 		'''
 		This method is an alias for `send`.
@@ -154,7 +202,9 @@ class Receiver(PacketQueue):
 	  * `packetType` : indicating the child class of Packet for the technology implemented by the Emitter
 	  * `deviceType` : indicating the child class of Device to instanciate
 
-	A `_task` method is implemented by default. It calls the recv method of a Device, converts the result (if it is not None) to a Mirage Packet and adds it to the queue. If you want to customize this behaviour, you can overload this method.
+	By default, the queue of a Receiver is unbounded. A maximal size and an overflow policy (``mirage.libs.wireless_utils.packetQueue.QueueOverflowPolicy``) can be provided using the ``setQueueSize`` method, and some statistics about the queue can be obtained using the ``getQueueStatistics`` method.
+
+	A `_task` method is implemented by default. It calls the recv method of a Device, converts the result (if it is not None) to a Mirage Packet and adds it to the queue. If no data is available and the Device provides a file descriptor (``fileno`` method), it waits for this file descriptor to become readable instead of polling the Device. If you want to customize this behaviour, you can overload this method.
 
 	'''
 	def __init__(self,interface,packetType=Packet, deviceType=Device):
@@ -163,9 +213,15 @@ class Receiver(PacketQueue):
 		self.deviceType = deviceType
 		self.device = self.deviceType.get(self.interface)
 		self.callbacks = []
+		self.callbacksTable = {}
+		self.callbacksExecutor = None
 		self.receiving = False
 		self.callbacksQueue = Queue()
 		self.callbacksActiveListening = False
+		self.selector = None
+		self.selectedFileno = None
+		self.queuePolicy = QueueOverflowPolicy.DROP_OLDEST
+		self.resetQueueStatistics()
 		super().__init__(waitEmpty=False, autoStart=True)
 
 	def updateSDRConfig(self,sdrConfig):
@@ -196,12 +252,105 @@ class Receiver(PacketQueue):
 		'''
 		return self.convert(data)
 
+	def setQueueSize(self,size=0,policy=QueueOverflowPolicy.DROP_OLDEST):
+		'''
+		This method allows to limit the number of Mirage Packets stored in the queue, and to select the policy applied if the queue is full.
+
+		:param size: maximal number of packets stored in the queue (0 means unbounded)
+		:type size: int
+		:param policy: overflow policy (``QueueOverflowPolicy.DROP_OLDEST``, ``QueueOverflowPolicy.DROP_NEWEST`` or ``QueueOverflowPolicy.BLOCK``), or its name (e.g. "block")
+		:type policy: int or str
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+
+		:Example:
+
+			>>> receiver.setQueueSize(1000)
+			>>> receiver.setQueueSize(100, policy=QueueOverflowPolicy.BLOCK)
+			>>> receiver.setQueueSize(100, policy="drop_newest")
+
+		'''
+		if isinstance(policy,str):
+			name = policy
+			policy = QueueOverflowPolicy.fromName(name)
+			if policy is None:
+				io.fail("Unknown queue overflow policy : "+name+" (supported policies : drop_oldest, drop_newest, block)")
+				return False
+		with self.queue.mutex:
+			self.queue.maxsize = size
+			self.queuePolicy = policy
+			self.queue.not_full.notify_all()
+		return True
+
+	def getQueueStatistics(self):
+		'''
+		This method returns some statistics about the queue : the number of packets enqueued, the number of packets dropped, the maximal number of packets stored simultaneously in the queue (high watermark), the current number of packets stored and the maximal size of the queue.
+
+		:return: dictionary of statistics
+		:rtype: dict
+
+		:Example:
+
+			>>> receiver.getQueueStatistics()
+			{'enqueued': 2048, 'dropped': 1048, 'highWatermark': 1000, 'size': 1000, 'maxSize': 1000}
+
+		'''
+		statistics = dict(self.queueStatistics)
+		statistics["size"] = self.queue.qsize()
+		statistics["maxSize"] = self.queue.maxsize
+		return statistics
+
+	def resetQueueStatistics(self):
+		'''
+		This method resets the statistics about the queue.
+
+		:Example:
+
+			>>> receiver.resetQueueStatistics()
+
+		'''
+		self.queueStatistics = {"enqueued":0, "dropped":0, "highWatermark":0}
+
+	def _enqueue(self,packet):
+		if self.queuePolicy == QueueOverflowPolicy.BLOCK:
+			thread = threading.current_thread()
+			while True:
+				try:
+					self.queue.put(packet,timeout=self.BLOCKING_TIMEOUT)
+					break
+				except Full:
+					# the packet is dropped if the Receiver is stopped while waiting
+					if not getattr(thread,"signal",True):
+						self.queueStatistics["dropped"] += 1
+						return
+		elif self.queuePolicy == QueueOverflowPolicy.DROP_NEWEST:
+			try:
+				self.queue.put_nowait(packet)
+			except Full:
+				self.queueStatistics["dropped"] += 1
+				return
+		else:
+			while True:
+				try:
+					self.queue.put_nowait(packet)
+					break
+				except Full:
+					try:
+						self.queue.get_nowait()
+						self.queueStatistics["dropped"] += 1
+					except Empty:
+						pass
+		self.queueStatistics["enqueued"] += 1
+		size = self.queue.qsize()
+		if size > self.queueStatistics["highWatermark"]:
+			self.queueStatistics["highWatermark"] = size
+
 	def _add(self,data):
 		if data is not None:
 			packet = self.convert(data)
 			self._executeCallbacks(packet)
 			if packet is not None:
-				self.queue.put(packet)
+				self._enqueue(packet)
 
 	def isReceiving(self):
 		'''
@@ -216,11 +365,36 @@ class Receiver(PacketQueue):
 		'''
 		return self.receiving
 
+	def _waitForData(self):
+		try:
+			fileno = self.device.fileno()
+			if fileno is None or fileno < 0:
+				return
+			if self.selector is None:
+				self.selector = selectors.DefaultSelector()
+			if fileno != self.selectedFileno:
+				# the file descriptor may change if the device has been restarted
+				if self.selectedFileno is not None:
+					self.selector.unregister(self.selectedFileno)
+					self.selectedFileno = None
+				self.selector.register(fileno,selectors.EVENT_READ)
+				self.selectedFileno = fileno
+			self.selector.select(timeout=self.BLOCKING_TIMEOUT)
+		except (OSError,ValueError,KeyError):
+			# the file descriptor has been closed, the selector is built again during the next call
+			if self.selector is not None:
+				self.selector.close()
+			self.selector = None
+			self.selectedFileno = None
+			time.sleep(self.BLOCKING_TIMEOUT)
+
 	def _task(self):
 		self.receiving = True
 		pkt = self.device.recv()
 		self._add(pkt)
 		self.receiving = False
+		if pkt is None:
+			self._waitForData()
 
 	def clean(self):
 		'''
@@ -334,6 +508,7 @@ class Receiver(PacketQueue):
 
 		The function *callback* is called with the following format : callback(packet,*args,**kwargs)
 		A callback can be run in the associated background thread (by default) or in foreground by using the methods ``listenCallbacks`` and ``stopListeningCallbacks``.
+		The background callbacks can also be run in a pool of threads, by using the method ``enableCallbacksExecutor``.
 
 		:param event: string describing the associated event
 		:type event: str
@@ -357,15 +532,83 @@ class Receiver(PacketQueue):
 
 		'''
 		self.callbacks.append(Callback(event=event, function=callback, args=args, kwargs=kwargs, background=background))
+		self.callbacksTable = {}
+
+	def _getCallbacks(self,packetClass):
+		# the dispatch table is filled lazily (one entry per packet class) and emptied if the callbacks are modified
+		table = self.callbacksTable
+		if packetClass not in table:
+			table[packetClass] = [callback for callback in self.callbacks if callback.matches(packetClass)]
+		return table[packetClass]
 
 	def _executeCallbacks(self,packet):
-		for callback in self.callbacks:
-			callback.update(packet)
-			if callback.runnable:
-				if callback.background:
-					callback.run(packet)
+		if packet is None:
+			return
+		for callback in self._getCallbacks(type(packet)):
+			if callback.eventType == "npackets":
+				callback.count -= 1
+				if callback.count != 0:
+					continue
+				callback.count = callback.every
+			if callback.background:
+				if self.callbacksExecutor is not None:
+					self.callbacksExecutor.submit(callback,packet)
 				else:
-					self.callbacksQueue.put((self.callbacks.index(callback),packet))
+					callback.run(packet)
+			else:
+				self.callbacksQueue.put((callback,packet))
+
+	def enableCallbacksExecutor(self,workers=4,maxSize=1000,ordered=True):
+		'''
+		This method allows to run the background callbacks in a bounded pool of threads (``mirage.libs.wireless_utils.callbacks.CallbackExecutor``) instead of the device thread.
+		It prevents the slow callbacks from blocking the reception of packets.
+
+		:param workers: number of threads running the callbacks
+		:type workers: int
+		:param maxSize: maximal number of pending executions
+		:type maxSize: int
+		:param ordered: boolean indicating if the executions of a given callback are sequential and follow the order of reception
+		:type ordered: bool
+
+		:Example:
+
+			>>> receiver.enableCallbacksExecutor(workers=2)
+
+		'''
+		self.disableCallbacksExecutor()
+		self.callbacksExecutor = CallbackExecutor(workers=workers,maxSize=maxSize,ordered=ordered)
+
+	def disableCallbacksExecutor(self):
+		'''
+		This method stops the pool of threads running the background callbacks : they are run again in the device thread.
+
+		:Example:
+
+			>>> receiver.disableCallbacksExecutor()
+
+		'''
+		if self.callbacksExecutor is not None:
+			executor = self.callbacksExecutor
+			self.callbacksExecutor = None
+			executor.stop()
+
+	def getCallbacksExecutorStatistics(self):
+		'''
+		This method returns some statistics about the pool of threads running the background callbacks (queue depth, latency, ...).
+		If no pool is in use, it returns `None`.
+
+		:return: dictionary of statistics
+		:rtype: dict
+
+		:Example:
+
+			>>> receiver.getCallbacksExecutorStatistics()
+			{'submitted': 120, 'executed': 118, 'errors': 0, 'highWatermark': 5, 'size': 2, 'averageLatency': 0.0004, 'maxLatency': 0.0021}
+
+		'''
+		if self.callbacksExecutor is not None:
+			return self.callbacksExecutor.getStatistics()
+		return None
 
 	def stopListeningCallbacks(self):
 		'''
@@ -389,20 +632,28 @@ class Receiver(PacketQueue):
 		'''
 		self.callbacksActiveListening = True
 		while self.callbacksActiveListening:
-			if not self.callbacksQueue.empty():
-				index,packet = self.callbacksQueue.get()
-				self.callbacks[index].run(packet)
+			try:
+				callback,packet = self.callbacksQueue.get(timeout=self.BLOCKING_TIMEOUT)
+			except Empty:
+				continue
+			callback.run(packet)
 
 	def removeCallbacks(self):
 		'''
 		Remove the callbacks attached to the Receiver.
 		'''
 		self.callbacks = []
+		self.callbacksTable = {}
 
 	def stop(self):
 		'''
 		Stops the Receiver and the associated device
 		'''
 		super().stop()
+		self.disableCallbacksExecutor()
+		if self.selector is not None:
+			self.selector.close()
+			self.selector = None
+			self.selectedFileno = None
 		if self.isDeviceUp():
 			self.device.close()
@@ -1,4 +1,6 @@
-import importlib
+import time,threading,traceback
+from collections import deque
+import mirage.libs.io as io
 
 class Callback:
 	'''
@@ -37,6 +39,20 @@ class Callback:
 		self.runnable = False
 
 
+	def matches(self, packetClass):
+		'''
+		This method indicates if the callback may be triggered by a packet of the provided class.
+		An "instanceof" callback matches a class if its event is the name of this class or the name of one of its parent classes (Method Resolution Order), a "npackets" callback matches every class.
+
+		:param packetClass: class of the packet
+		:type packetClass: type
+		:return: boolean indicating if the callback matches the provided class
+		:rtype: bool
+		'''
+		if self.eventType == "npackets":
+			return True
+		return any(cls.__name__ == self.instance for cls in packetClass.__mro__)
+
 	def update(self, packet):
 		'''
 		This method allows to update the callback's internal state by providing the current packet.
@@ -50,9 +66,7 @@ class Callback:
 					self.count = self.every
 					self.runnable = True
 			elif self.eventType == "instanceof":
-				m = importlib.import_module(packet.__module__)
-				if isinstance(packet, getattr(m, self.instance)):
-					self.runnable = True
+				self.runnable = self.matches(type(packet))
 
 
 	def run(self,packet):
@@ -63,4 +77,161 @@ class Callback:
 		kwargs = self.parameters["kwargs"]
 		self.function(*args, **kwargs)
 
+class CallbackExecutor:
+	'''
+	This class implements a bounded pool of threads, allowing to run the background callbacks (``mirage.libs.wireless_utils.callbacks.Callback``) of a Receiver outside of its device thread.
+	It prevents a slow callback (e.g. writing a file or performing some cryptographic operations) from blocking the reception of the packets.
+
+	Some parameters may be passed to the constructor :
+	  * workers : number of threads running the callbacks
+	  * maxSize : maximal number of pending executions (if the pool is full, the device thread waits until an execution is started)
+	  * ordered : boolean indicating if the executions of a given callback are run sequentially, in the order of reception of the packets (FIFO)
+
+	The threads are started during the first call to ``submit``, and some statistics about the pool can be obtained using the ``getStatistics`` method.
+	'''
+	def __init__(self,workers=4,maxSize=1000,ordered=True):
+		self.workers = workers
+		self.maxSize = maxSize
+		self.ordered = ordered
+		self.condition = threading.Condition()
+		self.ready = deque()
+		self.pending = {}
+		self.size = 0
+		self.threads = []
+		self.started = False
+		self.resetStatistics()
+
+	def resetStatistics(self):
+		'''
+		This method resets the statistics of the pool.
+		'''
+		self.statistics = {"submitted":0,"executed":0,"errors":0,"highWatermark":0,"totalLatency":0.0,"maxLatency":0.0}
+
+	def getStatistics(self):
+		'''
+		This method returns some statistics about the pool : the number of submitted and executed callbacks, the number of callbacks raising an exception, the current number of pending executions, its maximal value (high watermark), and the average and maximal latency (in seconds) between the reception of a packet and the execution of the callback.
+
+		:return: dictionary of statistics
+		:rtype: dict
+
+		:Example:
+
+			>>> executor.getStatistics()
+			{'submitted': 120, 'executed': 118, 'errors': 0, 'highWatermark': 5, 'size': 2, 'averageLatency': 0.0004, 'maxLatency': 0.0021}
+
+		'''
+		with self.condition:
+			statistics = dict(self.statistics)
+			statistics["size"] = self.size
+		totalLatency = statistics.pop("totalLatency")
+		statistics["averageLatency"] = totalLatency / statistics["executed"] if statistics["executed"] > 0 else 0.0
+		return statistics
+
+	def start(self):
+		'''
+		This method starts the threads of the pool.
+		'''
+		with self.condition:
+			if self.started:
+				return
+			self.started = True
+			self.threads = [threading.Thread(target=self._worker,daemon=True) for _ in range(self.workers)]
+		for thread in self.threads:
+			thread.start()
+
+	def stop(self):
+		'''
+		This method stops the threads of the pool. The pending executions are discarded.
+		'''
+		with self.condition:
+			if not self.started:
+				return
+			self.started = False
+			self.ready.clear()
+			self.pending = {}
+			self.size = 0
+			self.condition.notify_all()
+		for thread in self.threads:
+			if thread is not threading.current_thread():
+				thread.join(timeout=1.0)
+		self.threads = []
+
+	def submit(self,callback,packet):
+		'''
+		This method schedules the execution of a callback for a given packet.
+
+		:param callback: callback to execute
+		:type callback: mirage.libs.wireless_utils.callbacks.Callback
+		:param packet: packet provided to the callback
+		:type packet: mirage.libs.wireless_utils.packets.Packet
+		'''
+		if not self.started:
+			self.start()
+		with self.condition:
+			while self.size >= self.maxSize and self.started:
+				self.condition.wait(timeout=0.1)
+			timestamp = time.time()
+			if self.ordered:
+				# a callback is present at most once in the ready queue, its packets are stored in its own FIFO
+				if callback not in self.pending:
+					self.pending[callback] = deque()
+					self.ready.append(callback)
+				self.pending[callback].append((packet,timestamp))
+			else:
+				self.ready.append((callback,packet,timestamp))
+			self.size += 1
+			self.statistics["submitted"] += 1
+			if self.size > self.statistics["highWatermark"]:
+				self.statistics["highWatermark"] = self.size
+			self.condition.notify_all()
+
+	def _next(self):
+		with self.condition:
+			while len(self.ready) == 0:
+				if not self.started:
+					return None
+				self.condition.wait(timeout=0.1)
+			if self.ordered:
+				callback = self.ready.popleft()
+				packet,timestamp = self.pending[callback].popleft()
+			else:
+				callback,packet,timestamp = self.ready.popleft()
+			self.size -= 1
+			latency = time.time() - timestamp
+			self.statistics["totalLatency"] += latency
+			if latency > self.statistics["maxLatency"]:
+				self.statistics["maxLatency"] = latency
+			self.condition.notify_all()
+			return (callback,packet)
+
+	def _done(self,callback,success):
+		with self.condition:
+			self.statistics["executed"] += 1
+			if not success:
+				self.statistics["errors"] += 1
+			if self.ordered and callback in self.pending:
+				if len(self.pending[callback]) > 0:
+					self.ready.append(callback)
+					self.condition.notify_all()
+				else:
+					del self.pending[callback]
+
+	def _worker(self):
+		while self.started:
+			task = self._next()
+			if task is None:
+				break
+			callback,packet = task
+			try:
+				callback.run(packet)
+				success = True
+			except Exception as e:
+				success = False
+				self._report(callback,e)
+			self._done(callback,success)
 
+	def _report(self,callback,exception):
+		from mirage.core import app
+		io.fail("An error occured in the callback "+getattr(callback.function,"__name__",str(callback.function))+" : "+repr(exception))
+		if app.App.Instance is not None and app.App.Instance.debugMode:
+			traceback.print_exception(type(exception), exception, exception.__traceback__)
@@ -12,6 +12,8 @@ class Device:
 	  * ``recv()`` : this method allows to receive data (as a raw representation)
 	  * ``close()`` : this method closes the communication with the hardware component
 
+	A device may also implement the ``sendMany(dataList)`` method, allowing to send multiple packets using a single operation, and the ``fileno()`` method, returning the file descriptor used to receive datas : the corresponding Receiver will then wait for incoming datas instead of continuously polling the ``recv()`` method.
+
 	Every device is unique and identified by an interface name : this is a string stored in the ``interface`` attribute.
 	Some devices may provide some additional features, such as address configuration, multiple modes, etc. In order to implement this specific behaviours, some additional methods can be implemented in the child classes, and their name may be appended to the class attribute ``sharedMethods`` (list of strings). Every shared method will be callable by user using the corresponding Emitter (``mirage.libs.wireless.Emitter``) and/or the corresponding Receiver (``mirage.libs.wireless.Receiver``) : they will expose these additional methods thanks to the Proxy design pattern.
 
@@ -23,20 +25,28 @@ class Device:
 	'''
 	instances = {}
 
+	@classmethod
+	def getInstanceKey(cls, interface):
+		'''
+		This class method returns the key identifying a device in the register (see ``get``). By default, a device is identified by its interface.
+		'''
+		return interface
+
 	@classmethod
 	def get(cls, interface):
 		'''
 		This class method implements the Register device pattern.
 		According to the interface parameter, only one instance of a given specific device will be instanciated if multiple Emitters and/or Receivers tries to access it.
 		'''
-		if interface not in cls.instances:
-			cls.instances[interface] = cls(interface)
-			cls.instances[interface].init()
-		if not cls.instances[interface].isUp():
+		key = cls.getInstanceKey(interface)
+		if key not in cls.instances:
+			cls.instances[key] = cls(interface)
+			cls.instances[key].init()
+		if not cls.instances[key].isUp():
 			io.fail("An error occured during device initialization (interface : "+str(interface)+")")
 			exitMirage()
 			return None
-		return cls.instances[interface]
+		return cls.instances[key]
 
 	def __init__(self,interface):
 		self.capabilities = []
@@ -123,6 +133,17 @@ class Device:
 		'''
 		pass
 
+	def sendMany(self,dataList):
+		'''
+		This method sends multiple datas at once.
+		By default, it calls the ``send`` method for each data : a Device able to transmit multiple packets using a single operation (e.g. a bulk USB, serial or file write) should overload it.
+
+		:param dataList: list of raw representations of the datas to send
+		:type dataList: list
+		'''
+		for data in dataList:
+			self.send(data)
+
 	def recv(self):
 		'''
 		This method receives some datas.
@@ -132,6 +153,17 @@ class Device:
 		'''
 		pass
 
+	def fileno(self):
+		'''
+		This method returns the file descriptor used by the device to receive datas (e.g. a socket or a serial port), if any.
+		If a file descriptor is provided, the corresponding Receiver waits for it to become readable (using ``selectors``) instead of polling the ``recv`` method.
+		If no file descriptor is available, this method returns `None`.
+
+		:return: file descriptor
+		:rtype: int
+		'''
+		return None
+
 
 class SDRDevice(Device):
 	'''
@@ -153,14 +185,15 @@ class SDRDevice(Device):
 		"TX_GAIN":(["sink"],"setTXGain",int),
 		"BANDWIDTH":(["source","sink"],"setBandwidth",int),
 		"SAMPLE_RATE":(["source","sink"],"setSampleRate",int),
-		"EXPERIMENTAL_DEMODULATOR":(["device"],"setExperimentalDemodulator",booleanArg)
+		"EXPERIMENTAL_DEMODULATOR":(["device"],"setExperimentalDemodulator",booleanArg),
+		"SOURCE_RATE":(["device"],"setSourceRate",str)
 	}
 
 	def __init__(self,interface,sdrConfig={},sdrMode="HALF_DUPLEX"):
 		self.capabilities = []
 		self.interface = interface
 		self.subscribers = []
-		self.sdrConfig = sdrConfig
+		self.sdrConfig = dict(sdrConfig)
 		self.sdrMode = sdrMode
 		self.receivePipeline = self.buildReceivePipeline(interface)
 		self.transmitPipeline = self.buildTransmitPipeline(interface)
@@ -205,6 +238,7 @@ class SDRDevice(Device):
 		  * **BANDWIDTH**: Bandwidth (integer value)
 		  * **SAMPLE_RATE**: Sample Rate (integer value)
 		  * **EXPERIMENTAL_DEMODULATOR**: Use the experimental demodulator if available (boolean value)
+		  * **SOURCE_RATE**: Rate of an IQ file source, "max" or "realtime" (string value)
 
 		:param sdrConfig: dictionary describing the SDR parameters name and their value as string
 		:type sdrConfig: dict
@@ -25,6 +25,37 @@ class StoppableThread(threading.Thread):
 		'''
 		self.signal = False
 
+class QueueOverflowPolicy:
+	'''
+	This class defines the policies applied by a Receiver (``mirage.libs.wireless.Receiver``) if its queue is full :
+
+	  * DROP_OLDEST : the oldest packet stored in the queue is removed in order to store the new one
+	  * DROP_NEWEST : the new packet is dropped
+	  * BLOCK : the device thread is blocked until some space is available in the queue
+	'''
+	DROP_OLDEST	= 0x0
+	DROP_NEWEST	= 0x1
+	BLOCK		= 0x2
+
+	@classmethod
+	def fromName(cls,name):
+		'''
+		This class method returns the policy corresponding to the provided name (e.g. "drop_oldest", "drop_newest" or "block", case insensitive).
+
+		:param name: name of the policy
+		:type name: str
+		:return: policy (or None if the name is unknown)
+		:rtype: int
+
+		:Example:
+
+			>>> QueueOverflowPolicy.fromName("block")
+			2
+
+		'''
+		name = name.upper().replace("-","_")
+		return getattr(cls,name) if name in ("DROP_OLDEST","DROP_NEWEST","BLOCK") else None
+
 class PacketQueue:
 	'''
 	This class implements a Packet (``mirage.libs.wireless_utils.packets.Packet``) queue, and provides an API to manipulate it.
@@ -35,7 +66,11 @@ class PacketQueue:
 	Some parameters may be passed to the constructor :
 	  * waitEmpty : it indicates if the queue should wait for an empty queue before stopping
 	  * autoStart : it indicates if the queue shoud start immediatly after the instanciation of the class
+
+	The watchdog is expected to block (on the queue or on the device) instead of polling : the class attribute *BLOCKING_TIMEOUT* defines the maximal time (in seconds) a watchdog call may block, allowing the thread to check regularly if it has been stopped.
 	'''
+	BLOCKING_TIMEOUT = 0.1
+
 	def __init__(self, waitEmpty = False, autoStart = True):
 		self.waitEmpty = waitEmpty
 		self.autoStart = autoStart
@@ -79,7 +114,11 @@ class PacketQueue:
 			if self.waitEmpty:
 				while not self.isEmpty():
 					time.sleep(0.05) # necessary ?
-			self.daemonThread.stop()
+			thread = self.daemonThread
+			thread.stop()
+			# waits for the current watchdog call to return, in order to avoid two watchdogs running concurrently after a restart
+			if thread is not threading.current_thread():
+				thread.join(timeout=2*self.BLOCKING_TIMEOUT)
 			self.daemonThread = None
 			self.isStarted = False
 
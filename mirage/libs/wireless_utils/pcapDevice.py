@@ -1,8 +1,10 @@
 from mirage.libs import io,utils
 from mirage.libs.wireless_utils.device import Device
+from mirage.libs.wireless_utils.pcapReader import PCAPReader
+from mirage.libs.wireless_utils.pcapWriter import PCAPWriter
 from os.path import isfile
-from struct import unpack,pack
-import time
+from threading import Event
+import time,errno
 
 class PCAPDevice(Device):
 	'''
@@ -11,47 +13,68 @@ class PCAPDevice(Device):
 	  * If the provided interface is an existing file, the PCAPDevice is set in "reading mode".
 	  * If the provided interface is a non existing file, the PCAPDevice is set in "writing mode".
 
+	In writing mode, the packets are written using a buffered writer (``mirage.libs.wireless_utils.pcapWriter.PCAPWriter``), which can be configured using the ``setWriterOptions`` method (file format, nanosecond timestamps, rotation ...).
+	The PCAP Devices of different technologies (i.e. different DLTs) can write in the same file if the PCAPNG format is selected.
+
 	Every child classes of PCAPDevice should provide :
 
 	  * the *DLT* class attribute, defining the DLT of the PCAP file
 	  * the *SCAPY_LAYER* class attribute (optional), defining a scapy layer automatically used to encapsulate the packets
 
 	The ``send`` and ``recv`` methods uses the timestamp in order to write and read the pcap "in real time".
-	The ``putPacket``, ``getPacket`` and ``getAllPackets`` methods allow to manipulate directly the packets without taking into account the timestamp values.
+	The replay speed of the ``recv`` method can be modified using the ``setReplaySpeed`` method (e.g. in order to analyse a capture as fast as possible).
+	The ``putPacket``, ``getPacket``, ``iterPackets`` and ``getAllPackets`` methods allow to manipulate directly the packets without taking into account the timestamp values.
+	In reading mode, the file is accessed using a memory-mapped reader (``mirage.libs.wireless_utils.pcapReader.PCAPReader``) : the ``seekPacket`` and ``seekTimestamp`` methods allow to move directly to a given packet.
+	The PCAPNG files can also be read : only the packets of the DLT of the device are returned.
 	'''
 	DLT = 0
 	SCAPY_LAYER = None
+	STORE_INDEX = True
+	'''
+	This class attribute indicates if the index of the records built by the reader (reading mode) is stored in a sidecar file (``<filename>.idx``) : it can be disabled in order to avoid writing next to the capture.
+	'''
 
-	sharedMethods = ["putPacket", "getPacket", "getAllPackets","startReading","stopReading","getMode"] 
+	sharedMethods = ["putPacket", "getPacket", "getAllPackets","iterPackets","startReading","stopReading","getMode","setReplaySpeed","getReplaySpeed","seekPacket","seekTimestamp","getPacketsCount","setIndexStorage","setWriterOptions"]
+
+	@classmethod
+	def getInstanceKey(cls, interface):
+		'''
+		This class method returns the key identifying a PCAP Device in the register : a PCAP Device is identified by its filename and its DLT.
+		'''
+		return (interface,cls.DLT)
 
 	def __init__(self,interface):
 		super().__init__(interface=interface)
 		self.filename = interface
-		self.file = None
+		self.writer = None
+		self.interfaceId = None
+		self.reader = None
 		self.ready = False
 		self.reading = False
+		self.readingEvent = Event()
 		self.initialTimestamp = None
 		self.beginningTimestamp = None
+		self.replaySpeed = 1.0
 		self.mode = None
 		if interface[-5:] == ".pcap":
 			self.openFile()
 
 		else:
-			self.file = None
 			self.ready = False
 
 	def openFile(self):
-		if isfile(self.filename):
+		if isfile(self.filename) and not PCAPWriter.isOpened(self.filename):
 			try:
 				self.mode = "read"
-				self.file = open(self.filename,"rb")
+				self.reader = PCAPReader(self.filename,self.DLT,storeIndex=self.STORE_INDEX)
 
 			except IOError as e:
 				if e.errno == errno.EACCES:
 					io.fail("You don't have permissions to access this file !")
 		else:
 			self.mode = "write"
-			self.file = open(self.filename,"wb")
+			self.writer = PCAPWriter.open(self.filename)
+
 	def getMode(self):
 		'''
 		This method returns the mode used by this PCAP Device.
@@ -71,46 +94,101 @@ class PCAPDevice(Device):
 
 		return self.mode
 
+	def setReplaySpeed(self,speed=1.0):
+		'''
+		This method sets the replay speed used by the reading mode.
+
+		:param speed: replay speed, as a float or a string (1.0 : real time, N : N times faster than real time, 0 or "max" : as fast as possible)
+		:type speed: float or str
+
+		:Example:
+
+			>>> device.setReplaySpeed(10)
+			>>> device.setReplaySpeed("max")
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+		'''
+		if isinstance(speed,str):
+			speed = 0.0 if speed.lower() == "max" else utils.floatArg(speed)
+		if speed is None or speed < 0:
+			io.fail("Incorrect replay speed, real time is used !")
+			speed = 1.0
+		self.replaySpeed = speed
+		# the timing reference is reset, the next packet is returned immediately
+		self.initialTimestamp = None
+
+	def getReplaySpeed(self):
+		'''
+		This method returns the replay speed used by the reading mode (0 indicates that the packets are read as fast as possible).
+
+		:return: replay speed
+		:rtype: float
+
+		:Example:
+
+			>>> device.getReplaySpeed()
+			1.0
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+		'''
+		return self.replaySpeed
+
 	def startReading(self):
 		'''
 		This method starts the reading mode.
 		'''
 		self.reading = True
+		self.readingEvent.set()
 
 	def stopReading(self):
 		'''
 		This method stops the reading mode.
 		'''
 		self.reading = False
+		self.readingEvent.clear()
 
 	def _readHeader(self):
-		try:
-			header = self.file.read(24)
-			magic,*others,dlt =  unpack('<IHHIIII',header)
-			return (magic,dlt, True)
-		except Exception as e:
-			print(e)
+		if self.reader is None:
 			return (-1,-1, False)
+		return (self.reader.magic, self.reader.dlt, self.reader.isValid())
 
 	def _addHeader(self):
-		dlt = self.DLT
-		magic = 0xa1b2c3d4
-		header = pack('<IHHIIII',
-			magic,
-			2,
-			4,
-			0,
-			0,
-			65535,
-			dlt
-		)
-		try:
-			self.file.write(header)
-			return (magic,dlt,True)
-		except Exception as e:
-			print(e)
-			return (-1,-1,False)
-		
+		self.interfaceId = self.writer.addInterface(self.DLT)
+		return (self.writer.getMagic(),self.DLT,self.interfaceId is not None)
+
+	def setWriterOptions(self,fileFormat=None,rotateSize=None,rotateTime=None,bufferSize=None,flushInterval=None):
+		'''
+		This method configures the PCAP writer (writing mode only).
+
+		:param fileFormat: file format ("pcap" : microsecond timestamps, "pcap-ns" : nanosecond timestamps, "pcapng" : nanosecond timestamps and multiple DLTs)
+		:type fileFormat: str
+		:param rotateSize: maximal size of a file in bytes (0 disables the size-based rotation)
+		:type rotateSize: int
+		:param rotateTime: maximal age of a file in seconds (0 disables the time-based rotation)
+		:type rotateTime: float
+		:param bufferSize: size of the write buffer in bytes
+		:type bufferSize: int
+		:param flushInterval: maximal time in seconds before a buffered packet is written in the file
+		:type flushInterval: float
+		:return: boolean indicating if the configuration has been applied
+		:rtype: bool
+
+		:Example:
+
+			>>> device.setWriterOptions(fileFormat="pcapng")
+			>>> device.setWriterOptions(rotateSize=100*1024*1024, rotateTime=3600)
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+		'''
+		if self.mode == "write" and self.writer is not None:
+			return self.writer.configure(fileFormat=fileFormat,rotateSize=rotateSize,rotateTime=rotateTime,bufferSize=bufferSize,flushInterval=flushInterval)
+		return False
 	
 	def send(self,packet):
 		'''
@@ -125,7 +203,12 @@ class PCAPDevice(Device):
 			self.putPacket(packet)
 
 	def close(self):
-		self.file.close()
+		if self.reader is not None:
+			self.reader.close()
+			self.reader = None
+		if self.writer is not None:
+			self.writer.close()
+			self.writer = None
 
 	def isUp(self):
 		return self.ready
@@ -140,10 +223,12 @@ class PCAPDevice(Device):
 			initFunction = self._addHeader
 
 		self.magic, self.dlt, success = initFunction()
-		if success and self.magic == 0xa1b2c3d4 and self.DLT == self.dlt:
+		if success and self.magic in (0xa1b2c3d4,0xa1b23c4d,0x0a0d0d0a) and self.DLT == self.dlt:
 			io.success("PCAP file successfully loaded (DLT : "+str(self.dlt)+") ! ")
 			self.ready = True
 		else:
+			if self.mode == "read" and success:
+				io.fail("The PCAP file doesn't contain packets of DLT "+str(self.DLT)+" (DLT : "+str(self.dlt)+") !")
 			self.ready = False
 
 	def putPacket(self,data,timestamp = None):
@@ -158,19 +243,7 @@ class PCAPDevice(Device):
 		:rtype: bool
 		'''
 		try:
-			if timestamp is None:
-				timestamp = time.time()
-			ts_sec = int(timestamp)
-			ts_usec = int((timestamp - ts_sec)*1000000)
-			header = pack(
-			'<IIII',
-			ts_sec,
-			ts_usec,
-			len(data),
-			len(data)
-			)
-			self.file.write(header)
-			self.file.write(data)
+			self.writer.write(data,timestamp,self.interfaceId)
 			return True
 		except Exception as e:
 			print(e)
@@ -183,34 +256,106 @@ class PCAPDevice(Device):
 		:return: tuple composed of a boolean indicating if the packet exists and a tuple of (timestamp, packet)
 		:rtype: tuple of (bool,tuple of (float,bytes))
 		'''
-		try:
-			header = self.file.read(16)
-			ts_sec, ts_usec, length1, length2 = unpack('<IIII',header)
-			
-			packet = self.file.read(length1)
-
-			return (True,(ts_sec + ts_usec/1000000,packet))
-		except:
+		data = self.reader.next() if self.reader is not None else None
+		if data is None:
 			return (False,None)
+		timestamp,packet = data
+		return (True,(timestamp,bytes(packet)))
 
-	def getAllPackets(self):
+	def iterPackets(self):
 		'''
-		This method gets all packets stored in the PCAP file asynchronously and returns them.
+		This method provides a generator allowing to iterate lazily on the remaining packets stored in the PCAP file.
 	
-		:return: list of packets (tuple of (timestamp, packet))
-		:rtype: list of tuple of (timestamp, packet)
+		:return: generator of packets (tuple of (timestamp, packet))
+		:rtype: generator of tuple of (timestamp, packet)
 		'''
 		if self.mode == "read":
-			packetList = []
 			while True:
 				success,data = self.getPacket()
 				if not success:
 					break
-				else:
-					timestamp,packet = data
-					packetList.append((timestamp,self.buildPacket(packet, timestamp)))
+				timestamp,packet = data
+				yield (timestamp,self.buildPacket(packet, timestamp))
+
+	def getAllPackets(self):
+		'''
+		This method gets all packets stored in the PCAP file asynchronously and returns them.
+	
+		:return: list of packets (tuple of (timestamp, packet))
+		:rtype: list of tuple of (timestamp, packet)
+		'''
+		if self.mode == "read":
+			return list(self.iterPackets())
+
+	def setIndexStorage(self,enable=True):
+		'''
+		This method indicates if the index of the records (built during the first random access, e.g. ``seekPacket`` or ``getPacketsCount``) is stored in a sidecar file (``<filename>.idx``) or only kept in memory (reading mode only).
 
-			return packetList
+		:param enable: boolean indicating if the index is stored in a sidecar file
+		:type enable: bool
+
+		:Example:
+
+			>>> device.setIndexStorage(False)
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+		'''
+		if self.mode == "read" and self.reader is not None:
+			self.reader.storeIndex = enable
+
+	def getPacketsCount(self):
+		'''
+		This method returns the number of packets stored in the PCAP file (reading mode only).
+
+		:return: number of packets
+		:rtype: int
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+		'''
+		if self.mode == "read" and self.reader is not None:
+			return len(self.reader)
+
+	def seekPacket(self,index):
+		'''
+		This method moves the reading cursor to the packet corresponding to the provided index (reading mode only).
+
+		:param index: index of the packet
+		:type index: int
+
+		:Example:
+
+			>>> device.seekPacket(1000)
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+		'''
+		if self.mode == "read" and self.reader is not None:
+			self.reader.seek(index)
+			self.initialTimestamp = None
+
+	def seekTimestamp(self,timestamp):
+		'''
+		This method moves the reading cursor to the first packet captured at or after the provided timestamp (reading mode only).
+
+		:param timestamp: timestamp
+		:type timestamp: float
+
+		:Example:
+
+			>>> device.seekTimestamp(1589299362.5)
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+		'''
+		if self.mode == "read" and self.reader is not None:
+			self.reader.seekTimestamp(timestamp)
+			self.initialTimestamp = None
 
 
 	def buildPacket(self,packet,timestamp):
@@ -226,17 +371,20 @@ class PCAPDevice(Device):
 		This method gets the packets from the PCAP file asynchronously.
 		'''
 		if self.mode == "read":
-			while not self.reading:
-				utils.wait(seconds=0.00001)
+			# the reading mode is awaited for a bounded time, allowing the Receiver to be stopped
+			if not self.readingEvent.wait(timeout=0.1):
+				return None
 			success,data = self.getPacket()
 			if success:
 				timestamp,packet = data
-				if self.initialTimestamp is None:
-					self.initialTimestamp = timestamp
-					self.beginningTimestamp = utils.now()
-				else:
-					while timestamp - self.initialTimestamp > (utils.now() - self.beginningTimestamp):
-						utils.wait(seconds=0.00001)
+				if self.replaySpeed > 0:
+					if self.initialTimestamp is None:
+						self.initialTimestamp = timestamp
+						self.beginningTimestamp = utils.now()
+					else:
+						delay = (timestamp - self.initialTimestamp) / self.replaySpeed - (utils.now() - self.beginningTimestamp)
+						if delay > 0:
+							utils.wait(seconds=delay)
 				return self.buildPacket(packet,timestamp)
 			else:
 				self.publish("stop")
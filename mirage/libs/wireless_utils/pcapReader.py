@@ -0,0 +1,322 @@
+from mirage.libs import io
+from struct import Struct,pack,unpack_from
+from array import array
+from bisect import bisect_left
+from os.path import getsize,getmtime
+import mmap
+
+class PCAPReader:
+	'''
+	This class provides a memory-mapped reader for PCAP files.
+
+	The file is mapped in memory (``mmap``), and the packets are returned lazily as ``memoryview`` slices of the mapping : no data is copied or stored by the reader, allowing to manipulate very large captures using a constant amount of memory.
+	An index of the records (offset and timestamp of every packet) is built during the first random access (``seek``, ``seekTimestamp``, ``getPacket`` or ``len``), and stored in a sidecar file (``<filename>.idx``) in order to be reused later. If the sidecar file can't be written, or if the *storeIndex* parameter is False, the index is only kept in memory.
+
+	The classic PCAP formats (little or big endian, microsecond or nanosecond timestamps) and the PCAP Next Generation format are supported.
+	A PCAPNG file may contain packets of multiple DLTs (one Interface Description Block per DLT) : only the Enhanced Packet Blocks linked to an interface of the provided DLT (or of the DLT of the first interface, if no DLT is provided) are returned. Only the first section of a PCAPNG file is read.
+
+	:Example:
+
+		>>> reader = PCAPReader("capture.pcap")
+		>>> reader.dlt
+		256
+		>>> timestamp,packet = reader.next()
+		>>> reader.seekTimestamp(1589299362.5)
+		>>> len(reader)
+		152342
+
+	'''
+	MAGICS = {
+		b"\xd4\xc3\xb2\xa1":("<",1000000),
+		b"\xa1\xb2\xc3\xd4":(">",1000000),
+		b"\x4d\x3c\xb2\xa1":("<",1000000000),
+		b"\xa1\xb2\x3c\x4d":(">",1000000000)
+	}
+	'''
+	This class attribute links the first bytes of a PCAP file to its byte order and its timestamps resolution.
+	'''
+
+	PCAPNG_MAGIC = b"\x0a\x0d\x0d\x0a"
+	PCAPNG_BYTE_ORDERS = {
+		b"\x4d\x3c\x2b\x1a":"<",
+		b"\x1a\x2b\x3c\x4d":">"
+	}
+	'''
+	This class attribute links the byte order magic of a PCAPNG Section Header Block to the byte order of the section.
+	'''
+
+	INDEX_MAGIC = b"MIRAGEIDX2"
+	INDEX_HEADER = Struct("<10sQQQi")
+
+	def __init__(self,filename,dlt=None,storeIndex=True):
+		self.filename = filename
+		self.requestedDlt = dlt
+		self.storeIndex = storeIndex
+		self.file = open(filename,"rb")
+		self.size = getsize(filename)
+		self.mapping = mmap.mmap(self.file.fileno(),0,access=mmap.ACCESS_READ) if self.size > 0 else b""
+		self.data = memoryview(self.mapping)
+		self.offsets = None
+		self.timestamps = None
+		self.indexMapping = None
+		self.pcapng = False
+		self.valid = self._parseHeader()
+		self.cursor = self.firstRecord
+
+	def _parseHeader(self):
+		self.magic,self.dlt,self.firstRecord = -1,-1,self.size
+		if self.size >= 28 and bytes(self.data[:4]) == self.PCAPNG_MAGIC:
+			return self._parseSectionHeader()
+		if self.size < 24 or bytes(self.data[:4]) not in self.MAGICS:
+			return False
+		self.byteOrder,self.resolution = self.MAGICS[bytes(self.data[:4])]
+		self.recordHeader = Struct(self.byteOrder+"IIII")
+		self.magic,*_,self.dlt = unpack_from(self.byteOrder+"IHHIIII",self.data,0)
+		self.firstRecord = 24
+		return True
+
+	def _parseSectionHeader(self):
+		if bytes(self.data[8:12]) not in self.PCAPNG_BYTE_ORDERS:
+			return False
+		self.pcapng = True
+		self.byteOrder = self.PCAPNG_BYTE_ORDERS[bytes(self.data[8:12])]
+		self.blockHeader = Struct(self.byteOrder+"II")
+		self.packetHeader = Struct(self.byteOrder+"IIIII")
+		self.magic = 0x0a0d0d0a
+		self.firstRecord = self.blockHeader.unpack_from(self.data,0)[1]
+		# the Interface Description Blocks are collected lazily, scanOffset is the offset of the first block not scanned yet
+		self.interfaces = []
+		self.scanOffset = self.firstRecord
+		interface = self._scanInterfaces(linktype=self.requestedDlt)
+		if interface is None and len(self.interfaces) > 0:
+			interface = self.interfaces[0]
+		if interface is None:
+			return False
+		self.dlt,self.resolution = interface
+		return True
+
+	def _parseInterface(self,offset,length):
+		linktype = unpack_from(self.byteOrder+"H",self.data,offset+8)[0]
+		resolution = 1000000
+		optionOffset = offset + 16
+		while optionOffset + 4 <= offset + length - 4:
+			code,optionLength = unpack_from(self.byteOrder+"HH",self.data,optionOffset)
+			if code == 0:
+				break
+			# if_tsresol option : negative power of 10 (or of 2 if the most significant bit is set)
+			if code == 9 and optionLength >= 1:
+				value = self.data[optionOffset+4]
+				resolution = 2**(value & 0x7f) if value & 0x80 else 10**value
+			optionOffset += 4 + optionLength + (4 - optionLength % 4) % 4
+		return (linktype,resolution)
+
+	def _scanInterfaces(self,until=None,linktype=None):
+		# scans the blocks from scanOffset (up to the offset until), and stops after the first interface of the provided linktype
+		while self.scanOffset + 12 <= self.size and (until is None or self.scanOffset < until):
+			blockType,blockLength = self.blockHeader.unpack_from(self.data,self.scanOffset)
+			if blockLength < 12 or self.scanOffset + blockLength > self.size or blockType == 0x0a0d0d0a:
+				break
+			offset = self.scanOffset
+			self.scanOffset += blockLength
+			if blockType == 0x00000001:
+				self.interfaces.append(self._parseInterface(offset,blockLength))
+				if linktype is None or self.interfaces[-1][0] == linktype:
+					return self.interfaces[-1]
+		return None
+
+	def isValid(self):
+		'''
+		This method indicates if the file is a valid PCAP file.
+
+		:return: boolean indicating if the file is valid
+		:rtype: bool
+		'''
+		return self.valid
+
+	def isNanosecond(self):
+		'''
+		This method indicates if the timestamps of the file are stored with a nanosecond resolution.
+
+		:return: boolean indicating if the timestamps use a nanosecond resolution
+		:rtype: bool
+		'''
+		return self.valid and self.resolution == 1000000000
+
+	def _readRecord(self,offset):
+		# returns the timestamp, the offset and the length of the packet, and the offset of the next record
+		if self.pcapng:
+			return self._readBlock(offset)
+		if offset + 16 > self.size:
+			return None
+		ts_sec,ts_frac,length,_ = self.recordHeader.unpack_from(self.data,offset)
+		if offset + 16 + length > self.size:
+			return None
+		return (ts_sec + ts_frac/self.resolution, offset + 16, length, offset + 16 + length)
+
+	def _readBlock(self,offset):
+		# skips the blocks until the next Enhanced Packet Block of the selected DLT
+		while offset + 12 <= self.size:
+			blockType,blockLength = self.blockHeader.unpack_from(self.data,offset)
+			if blockLength < 12 or offset + blockLength > self.size or blockType == 0x0a0d0d0a:
+				return None
+			if blockType == 0x00000006 and blockLength >= 32:
+				interface,timestampHigh,timestampLow,length,_ = self.packetHeader.unpack_from(self.data,offset+8)
+				if interface >= len(self.interfaces):
+					self._scanInterfaces(until=offset)
+				if interface < len(self.interfaces) and self.interfaces[interface][0] == self.dlt and 32 + length <= blockLength:
+					return (((timestampHigh << 32) | timestampLow)/self.interfaces[interface][1], offset + 28, length, offset + blockLength)
+			offset += blockLength
+		return None
+
+	def next(self):
+		'''
+		This method returns the next packet of the file, and moves the cursor to the following one.
+
+		:return: tuple of (timestamp, packet as memoryview), or None if the end of file is reached
+		:rtype: tuple of (float, memoryview)
+		'''
+		if not self.valid:
+			return None
+		record = self._readRecord(self.cursor)
+		if record is None:
+			return None
+		timestamp,start,length,self.cursor = record
+		return (timestamp,self.data[start:start+length])
+
+	def __iter__(self):
+		while True:
+			packet = self.next()
+			if packet is None:
+				break
+			yield packet
+
+	def _indexFilename(self):
+		return self.filename + ".idx"
+
+	def _loadIndex(self):
+		try:
+			with open(self._indexFilename(),"rb") as indexFile:
+				if getsize(self._indexFilename()) < self.INDEX_HEADER.size:
+					return False
+				self.indexMapping = mmap.mmap(indexFile.fileno(),0,access=mmap.ACCESS_READ)
+			magic,size,mtime,count,dlt = self.INDEX_HEADER.unpack_from(self.indexMapping,0)
+			if (magic != self.INDEX_MAGIC or size != self.size or mtime != int(getmtime(self.filename)) or dlt != self.dlt or
+				len(self.indexMapping) != self.INDEX_HEADER.size + 16*count):
+				self._closeIndex()
+				return False
+			view = memoryview(self.indexMapping)
+			start = self.INDEX_HEADER.size
+			self.offsets = view[start:start+8*count].cast("Q")
+			self.timestamps = view[start+8*count:start+16*count].cast("d")
+			return True
+		except (IOError,OSError,ValueError):
+			self._closeIndex()
+			return False
+
+	def _buildIndex(self):
+		offsets = array("Q")
+		timestamps = array("d")
+		offset = self.firstRecord
+		record = self._readRecord(offset) if self.valid else None
+		while record is not None:
+			timestamp,start,length,nextOffset = record
+			# in a PCAPNG file, the record may be stored after some skipped blocks
+			offsets.append(start - 28 if self.pcapng else offset)
+			timestamps.append(timestamp)
+			offset = nextOffset
+			record = self._readRecord(offset)
+		self.offsets = offsets
+		self.timestamps = timestamps
+		if not self.storeIndex:
+			return
+		try:
+			with open(self._indexFilename(),"wb") as indexFile:
+				indexFile.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC,self.size,int(getmtime(self.filename)),len(offsets),self.dlt))
+				offsets.tofile(indexFile)
+				timestamps.tofile(indexFile)
+			io.info("Index of "+self.filename+" stored in "+self._indexFilename())
+		except (IOError,OSError):
+			io.warning("Index of "+self.filename+" can't be stored, it is kept in memory.")
+
+	def buildIndex(self):
+		'''
+		This method loads the index of the records from the sidecar file (if it exists and matches the PCAP file) or builds it.
+		It is automatically called during the first random access.
+		'''
+		if self.offsets is None and not (self.storeIndex and self._loadIndex()):
+			self._buildIndex()
+
+	def __len__(self):
+		self.buildIndex()
+		return len(self.offsets)
+
+	def getPacket(self,index):
+		'''
+		This method returns the packet corresponding to the provided index, without moving the cursor.
+
+		:param index: index of the packet
+		:type index: int
+		:return: tuple of (timestamp, packet as memoryview)
+		:rtype: tuple of (float, memoryview)
+		'''
+		self.buildIndex()
+		timestamp,start,length,_ = self._readRecord(self.offsets[index])
+		return (timestamp,self.data[start:start+length])
+
+	def tell(self):
+		'''
+		This method returns the index of the packet pointed by the cursor.
+
+		:return: index of the next packet
+		:rtype: int
+		'''
+		self.buildIndex()
+		return bisect_left(self.offsets,self.cursor)
+
+	def seek(self,index):
+		'''
+		This method moves the cursor to the packet corresponding to the provided index.
+
+		:param index: index of the packet
+		:type index: int
+		'''
+		self.buildIndex()
+		if index >= len(self.offsets):
+			self.cursor = self.size
+		else:
+			self.cursor = self.offsets[max(0,index)]
+
+	def seekTimestamp(self,timestamp):
+		'''
+		This method moves the cursor to the first packet whose timestamp is greater or equal to the provided timestamp.
+		The packets are expected to be stored in chronological order.
+
+		:param timestamp: timestamp
+		:type timestamp: float
+		'''
+		self.buildIndex()
+		self.seek(bisect_left(self.timestamps,timestamp))
+
+	def _closeIndex(self):
+		self.offsets = None
+		self.timestamps = None
+		if self.indexMapping is not None:
+			try:
+				self.indexMapping.close()
+			except BufferError:
+				pass
+			self.indexMapping = None
+
+	def close(self):
+		'''
+		This method closes the file and the associated mappings.
+		The mappings are kept alive while some packets returned by the reader are still in use.
+		'''
+		self._closeIndex()
+		self.data.release()
+		if isinstance(self.mapping,mmap.mmap):
+			try:
+				self.mapping.close()
+			except BufferError:
+				pass
+		self.file.close()
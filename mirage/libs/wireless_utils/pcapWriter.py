@@ -0,0 +1,273 @@
+from mirage.libs import io
+from struct import pack
+from os.path import splitext
+from threading import RLock,Timer
+import time
+
+class PCAPFormat:
+	'''
+	This class defines the file formats supported by the PCAP writer (``mirage.libs.wireless_utils.pcapWriter.PCAPWriter``) :
+
+	  * PCAP : classic PCAP format, microsecond timestamps, single DLT
+	  * PCAP_NS : classic PCAP format, nanosecond timestamps, single DLT
+	  * PCAPNG : PCAP Next Generation format, nanosecond timestamps, multiple DLTs (one Interface Description Block per DLT)
+	'''
+	PCAP	= "pcap"
+	PCAP_NS	= "pcap-ns"
+	PCAPNG	= "pcapng"
+
+class PCAPWriter:
+	'''
+	This class provides a buffered PCAP writer.
+
+	The packets are stored in a memory buffer, written in the file if the buffer is full (*bufferSize* bytes) or periodically (every *flushInterval* seconds).
+	The output file can be rotated according to its size (*rotateSize*, in bytes) or to its age (*rotateTime*, in seconds) : if the filename contains a format specifier (e.g. "out-%05d.pcap"), it is used to generate the successive filenames, otherwise a suffix is inserted before the extension ("out.pcap" becomes "out-00000.pcap", "out-00001.pcap", ...).
+
+	A writer is shared by every user opening the same filename (``PCAPWriter.open``) : each user registers its DLT using the ``addInterface`` method. In the PCAPNG format, multiple DLTs can be stored in the same file.
+
+	The file and its header are created when the first packet is written, allowing to configure the writer (``configure``) after its opening.
+
+	:Example:
+
+		>>> writer = PCAPWriter.open("out.pcap")
+		>>> writer.configure(fileFormat=PCAPFormat.PCAPNG, rotateSize=100*1024*1024)
+		>>> bleInterface = writer.addInterface(256)
+		>>> esbInterface = writer.addInterface(148)
+		>>> writer.write(b"...", interface=bleInterface)
+		>>> writer.close()
+
+	'''
+	writers = {}
+	lock = RLock()
+
+	@classmethod
+	def open(cls,filename):
+		'''
+		This class method returns the writer linked to the provided filename, and instantiates it if needed.
+
+		:param filename: name of the file
+		:type filename: str
+		:return: writer instance
+		:rtype: PCAPWriter
+		'''
+		with cls.lock:
+			if filename not in cls.writers:
+				cls.writers[filename] = cls(filename)
+			writer = cls.writers[filename]
+			writer.users += 1
+			return writer
+
+	@classmethod
+	def isOpened(cls,filename):
+		'''
+		This class method indicates if a writer is currently linked to the provided filename.
+
+		:param filename: name of the file
+		:type filename: str
+		:return: boolean indicating if a writer uses this filename
+		:rtype: bool
+		'''
+		return filename in cls.writers
+
+	def __init__(self,filename):
+		self.filename = filename
+		self.users = 0
+		self.interfaces = []
+		self.fileFormat = PCAPFormat.PCAP
+		self.bufferSize = 1024*1024
+		self.flushInterval = 1.0
+		self.rotateSize = 0
+		self.rotateTime = 0
+		self.file = None
+		self.fileIndex = 0
+		self.fileSize = 0
+		self.fileCreation = None
+		self.buffer = bytearray()
+		self.flushTimer = None
+		self.writtenInterfaces = 0
+
+	def configure(self,fileFormat=None,bufferSize=None,flushInterval=None,rotateSize=None,rotateTime=None):
+		'''
+		This method configures the writer. The format can only be modified before the first packet is written.
+
+		:param fileFormat: file format (``PCAPFormat.PCAP``, ``PCAPFormat.PCAP_NS`` or ``PCAPFormat.PCAPNG``)
+		:type fileFormat: str
+		:param bufferSize: size of the buffer (in bytes)
+		:type bufferSize: int
+		:param flushInterval: maximal time (in seconds) before a buffered packet is written in the file
+		:type flushInterval: float
+		:param rotateSize: maximal size of a file (in bytes), 0 disables the size-based rotation
+		:type rotateSize: int
+		:param rotateTime: maximal age of a file (in seconds), 0 disables the time-based rotation
+		:type rotateTime: float
+		:return: boolean indicating if the configuration has been applied
+		:rtype: bool
+		'''
+		with PCAPWriter.lock:
+			if fileFormat is not None and fileFormat != self.fileFormat:
+				if self.file is not None:
+					io.fail("The format of "+self.filename+" can't be modified after the first packet !")
+					return False
+				if fileFormat not in (PCAPFormat.PCAP,PCAPFormat.PCAP_NS,PCAPFormat.PCAPNG):
+					io.fail("Unknown PCAP format : "+str(fileFormat))
+					return False
+				if fileFormat != PCAPFormat.PCAPNG and len(set(self.interfaces)) > 1:
+					io.fail("Multiple DLTs can only be stored in the PCAPNG format !")
+					return False
+				self.fileFormat = fileFormat
+			if bufferSize is not None:
+				self.bufferSize = bufferSize
+			if flushInterval is not None:
+				self.flushInterval = flushInterval
+			if rotateSize is not None:
+				self.rotateSize = rotateSize
+			if rotateTime is not None:
+				self.rotateTime = rotateTime
+			return True
+
+	def getMagic(self):
+		'''
+		This method returns the magic number of the format in use.
+
+		:return: magic number
+		:rtype: int
+		'''
+		if self.fileFormat == PCAPFormat.PCAPNG:
+			return 0x0a0d0d0a
+		elif self.fileFormat == PCAPFormat.PCAP_NS:
+			return 0xa1b23c4d
+		return 0xa1b2c3d4
+
+	def addInterface(self,dlt):
+		'''
+		This method registers a DLT and returns the corresponding interface identifier.
+		If the DLT is already registered, its identifier is returned.
+
+		:param dlt: DLT of the packets
+		:type dlt: int
+		:return: interface identifier (or None if the DLT can't be stored in the file)
+		:rtype: int
+		'''
+		with PCAPWriter.lock:
+			if dlt in self.interfaces:
+				return self.interfaces.index(dlt)
+			if len(self.interfaces) > 0 and self.fileFormat != PCAPFormat.PCAPNG:
+				io.fail("Multiple DLTs can only be stored in the PCAPNG format !")
+				return None
+			self.interfaces.append(dlt)
+			return len(self.interfaces) - 1
+
+	def getCurrentFilename(self):
+		'''
+		This method returns the name of the file currently written.
+
+		:return: filename
+		:rtype: str
+		'''
+		if "%" in self.filename:
+			return self.filename % self.fileIndex
+		elif self.rotateSize > 0 or self.rotateTime > 0:
+			base,extension = splitext(self.filename)
+			return base + "-%05d" % self.fileIndex + extension
+		return self.filename
+
+	def _header(self):
+		if self.fileFormat == PCAPFormat.PCAPNG:
+			return pack('<IIIHHqI',0x0a0d0d0a,28,0x1a2b3c4d,1,0,-1,28)
+		return pack('<IHHIIII',self.getMagic(),2,4,0,0,65535,self.interfaces[0] if len(self.interfaces) > 0 else 0)
+
+	def _interfaceBlock(self,dlt):
+		# the if_tsresol option indicates nanosecond timestamps
+		return pack('<IIHHIHHBxxxHHI',0x00000001,32,dlt,0,65535,9,1,9,0,0,32)
+
+	def _openFile(self):
+		self.file = open(self.getCurrentFilename(),"wb")
+		self.fileSize = 0
+		self.fileCreation = time.time()
+		self.writtenInterfaces = 0
+		self.buffer += self._header()
+
+	def _writeInterfaces(self):
+		while self.writtenInterfaces < len(self.interfaces):
+			self.buffer += self._interfaceBlock(self.interfaces[self.writtenInterfaces])
+			self.writtenInterfaces += 1
+
+	def _rotate(self):
+		self._flush()
+		self.file.close()
+		self.fileIndex += 1
+		self._openFile()
+
+	def _record(self,data,timestamp,interface):
+		if self.fileFormat == PCAPFormat.PCAPNG:
+			padding = (4 - len(data) % 4) % 4
+			length = 32 + len(data) + padding
+			return (pack('<IIIIIII',0x00000006,length,interface,timestamp >> 32,timestamp & 0xffffffff,len(data),len(data)) +
+				data + b"\x00"*padding + pack('<I',length))
+		elif self.fileFormat == PCAPFormat.PCAP_NS:
+			return pack('<IIII',timestamp // 1000000000,timestamp % 1000000000,len(data),len(data)) + data
+		return pack('<IIII',timestamp // 1000000000,(timestamp % 1000000000) // 1000,len(data),len(data)) + data
+
+	def write(self,data,timestamp=None,interface=0):
+		'''
+		This method writes a packet in the buffer.
+
+		:param data: packet to write
+		:type data: bytes
+		:param timestamp: timestamp of the packet in seconds (optional, the current time is used by default)
+		:type timestamp: float
+		:param interface: interface identifier returned by ``addInterface``
+		:type interface: int
+		'''
+		timestamp = time.time_ns() if timestamp is None else int(round(timestamp * 1000000000))
+		with PCAPWriter.lock:
+			if self.file is None:
+				self._openFile()
+			elif ((self.rotateSize > 0 and self.fileSize + len(self.buffer) >= self.rotateSize) or
+				(self.rotateTime > 0 and time.time() - self.fileCreation >= self.rotateTime)):
+				self._rotate()
+			if self.fileFormat == PCAPFormat.PCAPNG:
+				self._writeInterfaces()
+			self.buffer += self._record(bytes(data),timestamp,interface)
+			if len(self.buffer) >= self.bufferSize:
+				self._flush()
+			elif self.flushTimer is None:
+				self.flushTimer = Timer(self.flushInterval,self.flush)
+				self.flushTimer.daemon = True
+				self.flushTimer.start()
+
+	def _flush(self):
+		if self.file is not None and len(self.buffer) > 0:
+			self.file.write(self.buffer)
+			self.file.flush()
+			self.fileSize += len(self.buffer)
+			self.buffer = bytearray()
+
+	def flush(self):
+		'''
+		This method writes the content of the buffer in the file.
+		'''
+		with PCAPWriter.lock:
+			self.flushTimer = None
+			self._flush()
+
+	def close(self):
+		'''
+		This method unregisters an user of the writer. If it is the last one, the buffer is flushed and the file is closed.
+		'''
+		with PCAPWriter.lock:
+			self.users -= 1
+			if self.users > 0:
+				return
+			if self.flushTimer is not None:
+				self.flushTimer.cancel()
+				self.flushTimer = None
+			if self.file is None:
+				self._openFile()
+				if self.fileFormat == PCAPFormat.PCAPNG:
+					self._writeInterfaces()
+			self._flush()
+			self.file.close()
+			self.file = None
+			if PCAPWriter.writers.get(self.filename) is self:
+				del PCAPWriter.writers[self.filename]
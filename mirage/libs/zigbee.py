@@ -1,5 +1,6 @@
 from mirage.libs.zigbee_utils.rzusbstick import *
 from mirage.libs.zigbee_utils.hackrf import *
+from mirage.libs.common.sdr.sources import FileSource
 from mirage.libs.zigbee_utils.packets import *
 from mirage.libs.zigbee_utils.helpers import *
 from mirage.libs.zigbee_utils.pcap import *
@@ -13,7 +14,7 @@ class ZigbeeEmitter(wireless.Emitter):
 		deviceClass = None
 		if "rzusbstick" in interface:
 			deviceClass = RZUSBStickDevice
-		elif "hackrf" in interface:
+		elif "hackrf" in interface or FileSource.isIQFile(interface):
 			deviceClass = ZigbeeHackRFDevice
 		elif interface[-5:] == ".pcap":
 			deviceClass = ZigbeePCAPDevice
@@ -137,7 +138,7 @@ class ZigbeeReceiver(wireless.Receiver):
 		deviceClass = None
 		if "rzusbstick" in interface:
 			deviceClass = RZUSBStickDevice
-		elif "hackrf" in interface:
+		elif "hackrf" in interface or FileSource.isIQFile(interface):
 			deviceClass = ZigbeeHackRFDevice
 		elif interface[-5:] == ".pcap":
 			deviceClass = ZigbeePCAPDevice
@@ -146,7 +147,7 @@ class ZigbeeReceiver(wireless.Receiver):
 	def convert(self,packet):
 		if "rzusbstick" in self.interface:
 			(channel,rssi,validCrc,linkQualityIndicator,frame) = packet
-		elif "hackrf" in self.interface:
+		elif "hackrf" in self.interface or FileSource.isIQFile(self.interface):
 			(channel,validCrc,iqSamples,frame) = packet
 		else:
 			frame = packet
@@ -257,7 +258,7 @@ class ZigbeeReceiver(wireless.Receiver):
 										validCrc = validCrc,
 										channel = channel
 									)
-		elif "hackrf" in self.interface:
+		elif "hackrf" in self.interface or FileSource.isIQFile(self.interface):
 			new.additionalInformations = ZigbeeSniffingParameters(
 										rssi = None,
 										linkQualityIndicator = None,
@@ -1,6 +1,8 @@
 '''
 This file allows to manipulate Zigbee chips.
 '''
+import numpy as np
+
 SYMBOL_TO_CHIP_MAPPING = [
 	{"symbols":"0000", "chip_values":"11011001110000110101001000101110","msk_values":"1100000011101111010111001101100"},
 	{"symbols":"1000", "chip_values":"11101101100111000011010100100010","msk_values":"1001110000001110111101011100110"},
@@ -21,6 +23,22 @@ SYMBOL_TO_CHIP_MAPPING = [
 ]
 
 
+def _packChipValues(subtype):
+	return np.array([int(i[subtype].ljust(32,"0"),2) for i in SYMBOL_TO_CHIP_MAPPING],dtype=np.uint32)
+
+PACKED_CHIP_VALUES = {
+	"chip_values":_packChipValues("chip_values"),
+	"msk_values":_packChipValues("msk_values")
+}
+'''
+This dictionary contains the sequences of SYMBOL_TO_CHIP_MAPPING packed as 32 bits integers (MSB first, the 31 bits MSK sequences are padded with a null bit), indexed by the symbol value.
+'''
+
+HAMMING_WEIGHTS = np.array([bin(i).count("1") for i in range(1 << 16)],dtype=np.uint8)
+'''
+This lookup table contains the hamming weight of every 16 bits integer.
+'''
+
 def OQPSKtoMSKsymbols(pn,order=["11","01","00","10"]):
 	'''
 	This function allows to convert a given O-QPSK binary string to its equivalent MSK binary string.
@@ -102,3 +120,53 @@ def checkBestMatch(sequence,subtype="msk_values"):
 			min_hamming = current
 			best_match = i["symbols"]
 	return (best_match,min_hamming)
+
+def packChips(sequence,subtype="msk_values"):
+	'''
+	This function splits a binary string into consecutive 32 chips sequences, packed as 32 bits integers.
+	If the MSK values are used, only the first 31 chips of every sequence are kept (the last one is set to zero).
+
+	:param sequence: binary string to pack
+	:type sequence: str
+	:param subtype: string indicating if the sequence contains MSK values or OQPSK values ("msk_values" or "chip_values")
+	:type subtype: str
+	:return: packed chips sequences (incomplete sequences are ignored)
+	:rtype: numpy array of uint32
+
+	:Example:
+
+		>>> [hex(i) for i in packChips("11011001110000110101001000101110", "chip_values")]
+		['0xd9c3522e']
+
+	'''
+	width = 31 if subtype == "msk_values" else 32
+	count = (len(sequence) + 32 - width) // 32
+	chips = np.frombuffer(sequence[:count*32].ljust(count*32,"0").encode(),dtype=np.uint8).reshape(count,32) - ord("0")
+	if width == 31:
+		chips[:,31] = 0
+	return np.packbits(chips,axis=1).view(">u4").ravel().astype(np.uint32)
+
+def checkBestMatches(sequence,subtype="msk_values"):
+	'''
+	This function returns the best match (i.e. the symbol with the lowest hamming distance) of every chips sequence included in the provided binary string.
+	The hamming distances of all the sequences are computed at once, using the packed representation of the chips (see ``packChips``) and a lookup table.
+
+	:param sequence: binary string to analyze, or packed chips sequences
+	:type sequence: str or numpy array of uint32
+	:param subtype: string indicating if the comparison must be performed using MSK values or OQPSK values ("msk_values" or "chip_values")
+	:type subtype: str
+	:return: tuple composed of the best symbols values and the corresponding hamming distances
+	:rtype: (numpy array of int, numpy array of int)
+
+	:Example:
+
+		>>> checkBestMatches("1100000011101111010111001101100" + "0" + "1001110000001110111101011100110" + "1")
+		(array([0, 1]), array([0, 0]))
+
+	'''
+	packed = packChips(sequence,subtype) if isinstance(sequence,str) else sequence
+	distances = packed[:,None] ^ PACKED_CHIP_VALUES[subtype][None,:]
+	distances = HAMMING_WEIGHTS[distances & 0xFFFF].astype(np.int64) + HAMMING_WEIGHTS[distances >> 16]
+	# in case of equality, the last symbol is selected (as in checkBestMatch)
+	symbols = len(SYMBOL_TO_CHIP_MAPPING) - 1 - np.argmin(distances[:,::-1],axis=1)
+	return (symbols,distances[np.arange(len(packed)),symbols])
@@ -1,6 +1,7 @@
 from mirage.libs.common.sdr.decoders import SDRDecoder
 from mirage.libs.zigbee_utils.chip_tables import *
 from mirage.libs.zigbee_utils.helpers import *
+import numpy as np
 
 class ZigbeeDecoder(SDRDecoder):
 	'''
@@ -28,22 +29,23 @@ class ZigbeeDecoder(SDRDecoder):
 		self.crcChecking = enable
 
 	def decode(self,demodulatedData,iqSamples):
-		hamming = 0
-		zigbeeFrame = ""
-		for i in range(0,len(demodulatedData),32):
-			value,hamming = checkBestMatch(demodulatedData[i:i+31])
-			if hamming > self.hammingThresold:
-				endOfFrame = i-1
-				break
-			else:
-				zigbeeFrame += value
+		symbols,distances = checkBestMatches(demodulatedData)
+		invalid = np.flatnonzero(distances > self.hammingThresold)
+		if len(invalid) > 0:
+			symbols = symbols[:invalid[0]]
+			endOfFrame = 32*invalid[0]-1
+		else:
+			endOfFrame = len(demodulatedData)
 
 		newIqSamples = iqSamples[:self.samplesBefore+self.samplesPerSymbol*(len(demodulatedData[:endOfFrame]))+self.samplesPerSymbol+self.samplesAfter]
-		zigbeeValidFrame = zigbeeFrame
 
-		while "0000"*8 != zigbeeValidFrame[:4*8]:
-			zigbeeValidFrame = "0000"+zigbeeValidFrame
-		packet = bits2bytes(zigbeeValidFrame)
+		# the frame must start with 8 null symbols (preamble)
+		leadingZeros = len(symbols) if np.all(symbols[:8] == 0) else np.argmax(symbols != 0)
+		symbols = np.concatenate((np.zeros(max(0,8-leadingZeros),dtype=symbols.dtype),symbols))
+		if len(symbols) % 2 == 1:
+			symbols = np.append(symbols,0)
+		# the least significant symbol of every byte is transmitted first
+		packet = (symbols[0::2] | (symbols[1::2] << 4)).astype(np.uint8).tobytes()
 
 		if self.crcChecking:
 			if (fcs(packet[6:-2]) == packet[-2:]):
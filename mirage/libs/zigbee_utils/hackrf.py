@@ -1,7 +1,7 @@
 from scapy.all import *
 from mirage.libs import wireless,io,utils
 from mirage.libs.zigbee_utils.constants import *
-from mirage.libs.common.sdr import sources,demodulators,decoders,sinks,modulators
+from mirage.libs.common.sdr import sources,demodulators,decoders,sinks,modulators,channelizers
 from mirage.libs.zigbee_utils.decoders import ZigbeeDecoder
 from mirage.libs.zigbee_utils.encoders import ZigbeeEncoder
 from mirage.libs.zigbee_utils.helpers import *
@@ -9,7 +9,13 @@ from mirage.libs.zigbee_utils.helpers import *
 class ZigbeeHackRFDevice(wireless.SDRDevice):
 	'''
 	This device allows to communicate with a HackRF in order to interact with the Zigbee protocol.
-	HackRF support is **experimental**, the demodulator is slow !
+	HackRF support is **experimental** !
+
+	The corresponding interfaces are : ``hackrfX`` (e.g. "hackrf0")
+
+	A raw IQ recording (e.g. "capture.iq", see ``mirage.libs.common.sdr.sources.FileSource``) can also be provided as interface : the received samples are then read from the file, and the transmitted samples are written in "<name>-tx.iq".
+
+	Multiple channels included in a 20 MHz band (e.g. channels 11 to 14) can be sniffed simultaneously using the ``setChannels`` method : the HackRF captures the whole band and a channelizer (``mirage.libs.common.sdr.channelizers.FFTChannelizer``) provides every channel to its own demodulator.
 
 	The following capabilities are actually supported :
 
@@ -34,6 +40,11 @@ class ZigbeeHackRFDevice(wireless.SDRDevice):
 	sharedMethods = [
 			"getChannel",
 			"setChannel",
+			"getChannels",
+			"setChannels",
+
+			"setSourceRate",
+			"getSourceStatistics",
 
 			"getFirmwareVersion",
 			"getSerial",
@@ -44,7 +55,7 @@ class ZigbeeHackRFDevice(wireless.SDRDevice):
 			]
 
 	def buildReceivePipeline(self,interface):
-		self.source = sources.HackRFSource(interface)
+		self.source = sources.FileSource(interface) if sources.FileSource.isIQFile(interface) else sources.HackRFSource(interface)
 		if self.source.isReady():
 			self.source.setFrequency(channelToFrequency(self.channel) * 1000 * 1000)
 			self.source.setSampleRate(2 * 1000 * 1000)
@@ -71,7 +82,7 @@ class ZigbeeHackRFDevice(wireless.SDRDevice):
 
 	def setExperimentalDemodulator(self,enable=True):
 		self.experimentalDemodulatorEnabled = enable
-		if enable and self.receivePipeline is not None:
+		if enable and self.receivePipeline is not None and len(self.channels) == 1:
 			started = self.receivePipeline.isStarted()
 			if started:
 				self.receivePipeline.stop()
@@ -80,7 +91,7 @@ class ZigbeeHackRFDevice(wireless.SDRDevice):
 				self.receivePipeline.start()
 
 	def buildTransmitPipeline(self,interface):
-		self.sink = sinks.HackRFSink(interface)
+		self.sink = sinks.FileSink.fromRecording(interface) if sources.FileSource.isIQFile(interface) else sinks.HackRFSink(interface)
 		if self.sink.isReady():
 			self.sink.setFrequency(2410 * 1000 * 1000)
 			self.sink.setSampleRate(2 * 1000 * 1000)
@@ -96,6 +107,7 @@ class ZigbeeHackRFDevice(wireless.SDRDevice):
 	def __init__(self,interface):
 		self.ready = False
 		self.channel = 12
+		self.channels = [12]
 		self.experimentalDemodulatorEnabled = False
 		super().__init__(interface=interface)
 		self.receivePipeline.start()
@@ -103,7 +115,8 @@ class ZigbeeHackRFDevice(wireless.SDRDevice):
 	def recv(self):
 		packet = self.receivePipeline.getOutput()
 		if packet is not None:
-			return (self.channel,fcs(packet[0][6:-2]) == packet[0][-2:],packet[1],Dot15d4(packet[0][5:-2]))
+			channel = packet[2] if len(packet) == 3 else self.channel
+			return (channel,fcs(packet[0][6:-2]) == packet[0][-2:],packet[1],Dot15d4(packet[0][5:-2]))
 		else:
 			return None
 
@@ -135,10 +148,17 @@ class ZigbeeHackRFDevice(wireless.SDRDevice):
 				self.receivePipeline.stop()
 			if transmitPipelineStarted:
 				self.transmitPipeline.stop()
+			if len(self.channels) > 1:
+				# back to the single channel reception
+				self.source.setSampleRate(2 * 1000 * 1000)
+				self.source.setBandwidth(1 * 1000 * 1000)
+				self.demodulator = self._getDemodulator()
+				self.receivePipeline = self.source >> self.demodulator >> self.decoder
 			self.source.setFrequency(channelToFrequency(channel) * 1000 * 1000)
 			self.sink.setFrequency(channelToFrequency(channel) * 1000 * 1000)
 
 			self.channel = channel
+			self.channels = [channel]
 			if receivePipelineStarted:
 				self.receivePipeline.start()
 			if transmitPipelineStarted:
@@ -169,8 +189,123 @@ class ZigbeeHackRFDevice(wireless.SDRDevice):
 		return self.channel
 
 
+	def setChannels(self, channels):
+		'''
+		This method allows to sniff multiple channels simultaneously.
+		The HackRF captures a 20 MHz band (20 Msps), split by a channelizer : the provided channels must be included in this band (e.g. 4 consecutive channels).
+		The transmissions use the first channel of the list.
+
+		:param channels: list of channels
+		:type channels: list of int
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+
+		:Example:
+
+			>>> device.setChannels([11,12,13,14])
+			True
+			>>> device.getChannels()
+			[11, 12, 13, 14]
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+
+		'''
+		if len(channels) == 1:
+			return self.setChannel(channels[0])
+		if len(channels) == 0 or any(channel < 11 or channel > 26 for channel in channels):
+			return False
+		frequencies = [channelToFrequency(channel) * 1000 * 1000 for channel in channels]
+		sampleRate = 20 * 1000 * 1000
+		if max(frequencies) - min(frequencies) + 2 * 1000 * 1000 > sampleRate:
+			io.fail("The channels must be included in a 20 MHz band !")
+			return False
+		receivePipelineStarted = self.receivePipeline.isStarted()
+		if receivePipelineStarted:
+			self.receivePipeline.stop()
+		centerFrequency = (max(frequencies) + min(frequencies)) // 2
+		self.source.setFrequency(centerFrequency)
+		self.source.setSampleRate(sampleRate)
+		self.source.setBandwidth(sampleRate)
+		self.receivePipeline = self.source >> channelizers.FFTChannelizer(centerFrequency,sampleRate,2 * 1000 * 1000)
+		for channel,frequency in zip(channels,frequencies):
+			self.receivePipeline.addChannel(channel,frequency,self._getDemodulator(),ZigbeeDecoder(samplesPerSymbol=1))
+		self.channel = channels[0]
+		self.channels = list(channels)
+		self.sink.setFrequency(channelToFrequency(self.channel) * 1000 * 1000)
+		if receivePipelineStarted:
+			self.receivePipeline.start()
+		return True
+
+	def getChannels(self):
+		'''
+		This method returns the list of channels actually sniffed.
+
+		:return: list of channels
+		:rtype: list of int
+
+		:Example:
+
+			>>> device.getChannels()
+			[11, 12, 13, 14]
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+
+		'''
+		return self.channels
+
+	def setSourceRate(self,rate):
+		'''
+		This method sets the rate used to provide the samples if the device reads an IQ file : "max" (as fast as possible, by default) or "realtime" (according to the sample rate).
+		The "max" rate allows to measure the throughput of the demodulator (see ``getSourceStatistics``) without losing samples.
+
+		:param rate: rate ("realtime" or "max")
+		:type rate: str
+		:return: boolean indicating if the operation was successful
+		:rtype: bool
+
+		:Example:
+
+			>>> device.setSourceRate("realtime")
+			True
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+
+		'''
+		if not isinstance(self.source,sources.FileSource):
+			io.fail("The rate can only be modified if the device reads an IQ file !")
+			return False
+		return self.source.setRate(rate)
+
+	def getSourceStatistics(self):
+		'''
+		This method returns the statistics of the IQ file read by the device : number of samples processed by the demodulator, duration (in seconds), throughput (in samples per second) and number of samples lost.
+		It returns None if the device doesn't read an IQ file.
+
+		:return: dictionary of statistics
+		:rtype: dict
+
+		:Example:
+
+			>>> device.getSourceStatistics()
+			{'samples': 40000000, 'duration': 4.13, 'samplesPerSecond': 9685230.02, 'overflows': 0}
+
+		.. note::
+
+			This method is a **shared method** and can be called from the corresponding Emitters / Receivers.
+
+		'''
+		if not isinstance(self.source,sources.FileSource):
+			return None
+		return self.source.getStatistics()
+
 	def isUp(self):
-		return self.sink.isReady() and self.sink.isReady()
+		return self.source.isReady() and self.sink.isReady()
 
 	def init(self):
 		if self.source.isReady() and self.sink.isReady():
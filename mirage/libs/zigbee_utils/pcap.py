@@ -36,7 +36,7 @@ class ZigbeePCAPDevice(wireless.PCAPDevice):
 	'''
 	DLT = 195
 	SCAPY_LAYER = Dot15d4
-	sharedMethods = ["generateStream","setChannel","getChannel","getMode"]
+	sharedMethods = ["generateStream","setChannel","getChannel","getMode","setReplaySpeed","getReplaySpeed","seekPacket","seekTimestamp","getPacketsCount","setIndexStorage","setWriterOptions"]
 
 	def init(self):
 		super().init()
@@ -75,7 +75,7 @@ class ZigbeePCAPDevice(wireless.PCAPDevice):
 		
 		stream = []
 		currentTimestamp = None
-		for timestamp,packet in self.getAllPackets():
+		for timestamp,packet in self.iterPackets():
 			if currentTimestamp is None:
 				currentTimestamp = timestamp
 			else:
@@ -16,7 +16,8 @@ class ble_crack(module.WirelessModule):
 				"RESPONDER_ADDRESS":"11:22:33:44:55:66", 
 				"RESPONDER_ADDRESS_TYPE":"public", 
 				"MASTER_CONFIRM":"", 
-				"SLAVE_CONFIRM":""
+				"SLAVE_CONFIRM":"",
+				"BENCHMARK":"no"
 				
 			}
 
@@ -36,7 +37,17 @@ class ble_crack(module.WirelessModule):
 		payloads = (self.args["PAIRING_REQUEST"] != "" and self.args["PAIRING_RESPONSE"] != "")
 		return couple and addresses and payloads
 
+	def displayStatistics(self,statistics):
+		io.info("Keys tested : "+str(statistics["keys"])+" ("+"{:.1f}".format(statistics["duration"])+" seconds)")
+		io.info("Speed : "+str(int(statistics["keysPerSecond"]))+" keys/s ("+str(int(statistics["keysPerSecondPerCore"]))+" keys/s per core)")
+
 	def run(self):
+		if utils.booleanArg(self.args["BENCHMARK"]):
+			io.info("Running benchmark ...")
+			statistics = ble.BLETemporaryKeyCracker.getInstance().benchmark()
+			self.displayStatistics(statistics)
+			return self.ok({"KEYS_PER_SECOND":str(int(statistics["keysPerSecond"])),"KEYS_PER_SECOND_PER_CORE":str(int(statistics["keysPerSecondPerCore"]))})
+
 		if self.checkParametersValidity():
 			self.mRand = bytes.fromhex(self.args["MASTER_RAND"])
 			self.sRand = bytes.fromhex(self.args["SLAVE_RAND"])
@@ -53,25 +64,31 @@ class ble_crack(module.WirelessModule):
 			self.mConfirm = bytes.fromhex(self.args["MASTER_CONFIRM"])
 			self.sConfirm = bytes.fromhex(self.args["SLAVE_CONFIRM"])
 
-			rand = self.mRand if self.mRand != b"" and self.mConfirm != b"" else self.sRand
-			confirm = self.mConfirm if self.mRand != b"" and self.mConfirm != b"" else self.sConfirm
+			io.info("Cracking TK ...")
 
-			
+			cracker = ble.BLETemporaryKeyCracker.getInstance()
+			cracker.clear()
+			cracker.addPairing(
+						self.pReq,
+						self.pRes,
+						self.initiatorAddressType,
+						self.initiatorAddress,
+						self.responderAddressType,
+						self.responderAddress,
+						masterRand=self.mRand,
+						masterConfirm=self.mConfirm,
+						slaveRand=self.sRand,
+						slaveConfirm=self.sConfirm
+						)
+			pin = cracker.crack(progress=lambda count,total:io.progress(count,total=total,suffix=str(count)+"/"+str(total)+" keys"))[0]
+			io.progress(1,total=1,suffix="Done")
+			self.displayStatistics(cracker.getStatistics())
+			if pin is None:
+				io.fail("Temporary Key not found, the provided values are probably corrupted.")
+				return self.nok()
 
-			io.info("Cracking TK ...")
-			
-			pin = ble.BLECrypto.crackTemporaryKey(
-								rand,
-								self.pReq,
-								self.pRes,
-								self.initiatorAddressType,
-								self.initiatorAddress,
-								self.responderAddressType,
-								self.responderAddress,
-								confirm
-								)
 			io.success("Pin found : "+str(pin))
-			self.temporaryKey = bytes.fromhex((32-len(hex(pin)[2:]))*"0"+hex(pin)[2:])
+			self.temporaryKey = ble.BLECrypto.temporaryKey(pin)
 			io.success("Temporary Key found : "+self.temporaryKey.hex())
 
 			if self.mRand != b"" and self.sRand != b"":
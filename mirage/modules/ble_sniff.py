@@ -14,6 +14,12 @@ class ble_sniff(module.WirelessModule):
 				"TARGET":"",
 				"CHANNEL":"37",
 				"PCAP_FILE":"",
+				"REPLAY_SPEED":"1",
+				"QUEUE_SIZE":"1000", # 0 : unbounded
+				"QUEUE_POLICY":"drop_oldest", # drop_newest, block
+				"PCAP_FORMAT":"pcap", # pcap-ns, pcapng
+				"PCAP_ROTATE_SIZE":"0",
+				"PCAP_ROTATE_TIME":"0",
 				"HIJACKING_MASTER":"no",
 				"HIJACKING_SLAVE":"no",
 				"MITMING":"no",
@@ -212,6 +218,13 @@ class ble_sniff(module.WirelessModule):
 			interfaceb  = self.args["INTERFACEB"]
 			self.emitters.append(self.getEmitter(interface=interfaceb))
 			self.receivers.append(self.getReceiver(interface=interfaceb))
+		# the packets are handled by callbacks : the queues are bounded in order to keep a constant memory usage
+		success = True
+		for receiver in self.receivers:
+			success = receiver.setQueueSize(utils.integerArg(self.args["QUEUE_SIZE"]),self.args["QUEUE_POLICY"]) and success
+			if receiver.interface[-5:] == ".pcap":
+				receiver.setReplaySpeed(self.args["REPLAY_SPEED"])
+		return success
 
 	def displayConnection(self,index=0):
 		aa = "0x{:8x}".format(self.receivers[index].getAccessAddress())
@@ -358,9 +371,15 @@ class ble_sniff(module.WirelessModule):
 	def run(self):
 		if self.args["PCAP_FILE"] != "":
 			self.pcap = self.getEmitter(self.args["PCAP_FILE"])
+			self.pcap.setWriterOptions(
+				fileFormat=self.args["PCAP_FORMAT"],
+				rotateSize=utils.integerArg(self.args["PCAP_ROTATE_SIZE"]),
+				rotateTime=utils.floatArg(self.args["PCAP_ROTATE_TIME"])
+			)
 		else:
 			self.pcap = None
-		self.initEmittersAndReceivers()
+		if not self.initEmittersAndReceivers():
+			return self.nok()
 
 		if self.args["LTK"] != "":
 			ble.BLELinkLayerCrypto.provideLTK(bytes.fromhex(self.args["LTK"]))
@@ -12,6 +12,12 @@ class esb_sniff(module.WirelessModule):
 				"TARGET":"",
 				"MOUSE_FILE":"",
 				"PCAP_FILE":"",
+				"REPLAY_SPEED":"1",
+				"QUEUE_SIZE":"1000", # 0 : unbounded
+				"QUEUE_POLICY":"drop_oldest", # drop_newest, block
+				"PCAP_FORMAT":"pcap", # pcap-ns, pcapng
+				"PCAP_ROTATE_SIZE":"0",
+				"PCAP_ROTATE_TIME":"0",
 				"TIME":"20",
 				"ACK_PACKETS":"no",
 				"CHANNELS":"all",
@@ -98,6 +104,10 @@ class esb_sniff(module.WirelessModule):
 	def run(self):
 		self.pcap = None
 		self.receiver = self.getReceiver(interface=self.args["INTERFACE"])
+		if not self.receiver.setQueueSize(utils.integerArg(self.args["QUEUE_SIZE"]),self.args["QUEUE_POLICY"]):
+			return self.nok()
+		if self.args["INTERFACE"][-5:] == ".pcap":
+			self.receiver.setReplaySpeed(self.args["REPLAY_SPEED"])
 		self.receiver.onEvent("*",callback=self.show)
 		self.receiver.onEvent("ESBLogitechMousePacket",callback=self.addMouseData)
 		self.target = "FF:FF:FF:FF:FF" if self.args["TARGET"] == "" else self.args["TARGET"].upper()
@@ -126,6 +136,11 @@ class esb_sniff(module.WirelessModule):
 
 		if self.args["PCAP_FILE"] != "":
 			self.pcap = self.getEmitter(interface=self.args["PCAP_FILE"])
+			self.pcap.setWriterOptions(
+				fileFormat=self.args["PCAP_FORMAT"],
+				rotateSize=utils.integerArg(self.args["PCAP_ROTATE_SIZE"]),
+				rotateTime=utils.floatArg(self.args["PCAP_ROTATE_TIME"])
+			)
 
 		channelsTimeout = float(self.args["CHANNEL_TIMEOUT"]) if self.args["CHANNEL_TIMEOUT"] != "" else None
 
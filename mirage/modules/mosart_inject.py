@@ -43,12 +43,9 @@ class mosart_inject(module.WirelessModule):
 			io.success("Packet stream successfully extracted !")
 
 			io.info("Injecting ...")
-			self.emitter.sendp(*stream)
+			done = self.emitter.sendBatch(stream)
 
-			while not self.emitter.isTransmitting():
-				utils.wait(seconds=0.1)
-
-			while self.emitter.isTransmitting():
+			while not done.is_set():
 				utils.wait(seconds=0.1)
 			io.success("Injection done !")
 			return self.ok()
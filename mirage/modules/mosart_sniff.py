@@ -14,7 +14,9 @@ class mosart_sniff(module.WirelessModule):
 				"TIME":"10",
 				"DONGLE_PACKETS":"no",
 				"PCAP_FILE":"",
-				"MOUSE_FILE":""
+				"MOUSE_FILE":"",
+				"QUEUE_SIZE":"1000", # 0 : unbounded
+				"QUEUE_POLICY":"drop_oldest" # drop_newest, block
 			}
 
 		self.pcap = None
@@ -63,6 +65,8 @@ class mosart_sniff(module.WirelessModule):
 
 	def run(self):
 		self.receiver = self.getReceiver(interface=self.args["INTERFACE"])
+		if not self.receiver.setQueueSize(utils.integerArg(self.args["QUEUE_SIZE"]),self.args["QUEUE_POLICY"]):
+			return self.nok()
 		if self.checkSniffingCapabilities():
 			self.target = "FF:FF:FF:FF" if self.args["TARGET"] == "" else self.args["TARGET"].upper()
 			if self.target == "FF:FF:FF:FF":
@@ -13,7 +13,13 @@ class zigbee_sniff(module.WirelessModule):
 				"TARGET_PANID":"",
 				"TARGET":"",
 				"TIME":"20",
-				"PCAP_FILE":""
+				"PCAP_FILE":"",
+				"REPLAY_SPEED":"1",
+				"QUEUE_SIZE":"1000", # 0 : unbounded
+				"QUEUE_POLICY":"drop_oldest", # drop_newest, block
+				"PCAP_FORMAT":"pcap", # pcap-ns, pcapng
+				"PCAP_ROTATE_SIZE":"0",
+				"PCAP_ROTATE_TIME":"0"
 
 			}
 
@@ -32,6 +38,10 @@ class zigbee_sniff(module.WirelessModule):
 	def run(self):
 
 		self.receiver = self.getReceiver(interface=self.args["INTERFACE"])
+		if not self.receiver.setQueueSize(utils.integerArg(self.args["QUEUE_SIZE"]),self.args["QUEUE_POLICY"]):
+			return self.nok()
+		if self.args["INTERFACE"][-5:] == ".pcap":
+			self.receiver.setReplaySpeed(self.args["REPLAY_SPEED"])
 
 		if self.checkCapabilities():
 			if utils.isNumber(self.args["CHANNEL"]):
@@ -55,6 +65,11 @@ class zigbee_sniff(module.WirelessModule):
 
 			if self.args["PCAP_FILE"] != "":
 				self.pcap = self.getEmitter(interface=self.args["PCAP_FILE"])
+				self.pcap.setWriterOptions(
+					fileFormat=self.args["PCAP_FORMAT"],
+					rotateSize=utils.integerArg(self.args["PCAP_ROTATE_SIZE"]),
+					rotateTime=utils.floatArg(self.args["PCAP_ROTATE_TIME"])
+				)
 			else:
 				self.pcap = None
 			self.receiver.onEvent("*",callback=self.show)	